@@ -0,0 +1,179 @@
+import concurrent.futures
+import contextlib
+import os
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from django.db import transaction
+
+from . import change_detectors, dependency_graph, exceptions, utils
+from .compilers import BaseCompiler
+
+CompileTask = Tuple[BaseCompiler, str]
+
+# Number of compiled source files whose dependencies are saved in a single transaction
+SAVE_BATCH_SIZE = 100
+
+
+class BuildPlanner:
+    """Decide which source files should be compiled during a bulk build.
+    `BaseCompiler.should_compile` queries the database for the dependencies of each source file separately.
+    The planner uses the preloaded dependency graph, or loads the whole graph with a single query instead.
+    The modification times of the partials shared by many source files are fetched only once thanks to
+    the per-process cache in `mtime` module.
+    """
+
+    def __init__(self) -> None:
+        self.graph: Optional[dependency_graph.DependencyGraph] = None
+
+    def get_dependencies(self, source_path: str) -> List[str]:
+        """Get the saved dependencies for the given source file.
+
+        :param source_path: relative path to a source file
+        :returns: list of paths to the dependencies
+        """
+        if self.graph is None:
+            self.graph = dependency_graph.get_graph() or dependency_graph.DependencyGraph.load()
+        return self.graph.get_dependencies(source_path)
+
+    def should_compile(self, compiler: BaseCompiler, source_path: str) -> bool:
+        """Return True iff provided source file should be compiled.
+            Same as `compiler.should_compile(source_path, from_management=True)`.
+
+        :param compiler: compiler
+        :param source_path: relative path to a source file
+        :returns: whether the source file should be compiled
+        """
+        if compiler.custom_should_compile:
+            # The compiler has its own logic
+            return compiler.should_compile(source_path, from_management=True)
+
+        if compiler.is_partial(source_path):
+            return False
+
+        compiled_mtime = compiler.get_output_mtime(source_path)
+
+        if compiled_mtime is None:
+            return True
+
+        try:
+            return change_detectors.get_change_detector().is_changed(
+                compiler, source_path, compiled_mtime, self.get_dependencies
+            )
+        except ValueError:
+            # One of the dependencies has been removed, the source file must be compiled to update its dependencies
+            return True
+
+    def plan(self, tasks: Iterable[CompileTask]) -> Tuple[List[CompileTask], Set[str]]:
+        """Split the tasks into stale source files and up-to-date compiled files.
+            The errors are reported and the source files that caused them are skipped.
+
+        :param tasks: pairs of compiler and relative path to a source file
+        :returns: tasks to compile the stale source files and relative paths to the up-to-date compiled files
+        """
+        stale_tasks = []
+        up_to_date_files = set()
+        for compiler, path in tasks:
+            try:
+                if self.should_compile(compiler, path):
+                    stale_tasks.append((compiler, path))
+                else:
+                    up_to_date_files.update((compiler.get_output_path(path), compiler.get_compiled_path(path)))
+            except (exceptions.StaticCompilationError, ValueError) as e:
+                print(e)
+        return stale_tasks, up_to_date_files
+
+
+def get_default_jobs() -> int:
+    return os.cpu_count() or 1
+
+
+def split_tasks(tasks: Iterable[CompileTask], jobs: int) -> List[Tuple[BaseCompiler, List[str]]]:
+    """Group the tasks by compiler. The compilers that can compile many files at once get their files split into
+    `jobs` chunks, the other compilers get a chunk per file.
+
+    :param tasks: pairs of compiler and relative path to a source file
+    :param jobs: number of files to compile in parallel
+    :returns: pairs of compiler and relative paths to the source files to compile at once
+    """
+    paths_by_compiler: Dict[BaseCompiler, List[str]] = {}
+    for compiler, path in tasks:
+        paths_by_compiler.setdefault(compiler, []).append(path)
+
+    chunks = []
+    for compiler, paths in paths_by_compiler.items():
+        chunk_size = -(-len(paths) // jobs) if compiler.supports_batch else 1
+        for i in range(0, len(paths), chunk_size):
+            chunks.append((compiler, paths[i : i + chunk_size]))
+    return chunks
+
+
+def save_dependencies(
+    results: List[Tuple[BaseCompiler, str, Union[Tuple[str, List[str]], Exception]]],
+) -> None:
+    """Save the dependencies of the compiled source files in a single transaction, or in the preloaded dependency
+    graph if there is one.
+
+    :param results: compiler, relative path to a source file and the result of `BaseCompiler.build_many` for it
+    """
+    updates = [
+        (compiler, path, result[1])
+        for compiler, path, result in results
+        if not isinstance(result, Exception) and compiler.supports_dependencies
+    ]
+    if not updates:
+        return
+    with transaction.atomic() if dependency_graph.get_graph() is None else contextlib.nullcontext():
+        for compiler, path, dependencies in updates:
+            compiler.update_dependencies(path, dependencies)
+
+
+def compile_paths(tasks: Iterable[CompileTask], jobs: Optional[int] = None, verbosity: int = 0) -> Set[str]:
+    """Compile the stale source files using a pool of worker threads.
+        Compilers spend most of the time waiting for external processes, so threads are enough to keep all CPUs busy.
+        Workers only compile the files and find their dependencies. The database is accessed and the results are
+        reported from the calling thread, in the same order as the tasks are given. The dependencies are saved in
+        batches of `SAVE_BATCH_SIZE` files, each batch in a single transaction.
+
+    :param tasks: pairs of compiler and relative path to a source file
+    :param jobs: number of files to compile in parallel
+    :param verbosity: verbosity level
+    :returns: relative paths to the compiled files, including the ones that are up-to-date and the copies
+        with hashed names
+    """
+    jobs = jobs or get_default_jobs()
+    stale_tasks, compiled_files = BuildPlanner().plan(tasks)
+
+    with change_detectors.get_change_detector().batch(), concurrent.futures.ThreadPoolExecutor(
+        max_workers=jobs
+    ) as executor:
+        futures: Dict[CompileTask, concurrent.futures.Future[Dict[str, Union[Tuple[str, List[str]], Exception]]]] = {}
+        # The compiled files that end up with the same modification time haven't been rewritten
+        output_mtimes = {
+            (compiler, path): utils.get_mtime_ns(compiler.get_full_output_path(path)) for compiler, path in stale_tasks
+        }
+        for compiler, paths in split_tasks(stale_tasks, jobs):
+            future = executor.submit(compiler.build_many, paths)
+            for path in paths:
+                futures[(compiler, path)] = future
+
+        for i in range(0, len(stale_tasks), SAVE_BATCH_SIZE):
+            batch = [
+                (compiler, path, futures[(compiler, path)].result()[path])
+                for compiler, path in stale_tasks[i : i + SAVE_BATCH_SIZE]
+            ]
+            save_dependencies(batch)
+
+            for compiler, path, result in batch:
+                if isinstance(result, Exception):
+                    print(result)
+                    continue
+
+                compiled_path, _dependencies = result
+                # The compiled file is kept along with its copy served under a hashed name
+                compiled_files.update((compiler.get_output_path(path), compiled_path))
+                output_mtime = output_mtimes[(compiler, path)]
+                full_output_path = compiler.get_full_output_path(path)
+                changed = output_mtime is None or utils.get_mtime_ns(full_output_path) != output_mtime
+                compiler.log_compiled(path, compiled_path, from_management=True, verbosity=verbosity, changed=changed)
+
+    return compiled_files
@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+import threading
+from typing import TYPE_CHECKING, List, Optional
+
+import django.core.exceptions
+from django.core.files import base, storage
+from django.utils import module_loading
+
+from . import exceptions, settings, utils
+
+if TYPE_CHECKING:
+    from .compilers import BaseCompiler
+
+__all__ = (
+    "BuildCache",
+    "get_build_cache",
+)
+
+# Name of the file that lists the stored outputs of a build, it's saved last so only complete builds are restored
+INDEX_FILENAME = "index.json"
+
+build_cache: Optional["BuildCache"] = None
+build_cache_lock = threading.Lock()
+
+
+class BuildCache:
+    """Store the compiled files in a storage shared between hosts, keyed by the digest of everything they are built
+    from, and restore them instead of running the compiler again.
+    """
+
+    def __init__(self, cache_storage: storage.Storage) -> None:
+        self.storage = cache_storage
+
+    # noinspection PyMethodMayBeStatic
+    def get_key(self, compiler: "BaseCompiler", source_path: str) -> Optional[str]:
+        """Return the key of the compiled files, or None if the dependencies of the source file can't be resolved.
+
+        :param compiler: compiler
+        :param source_path: relative path to a source file
+        :returns: SHA-256 hex digest
+        """
+        try:
+            dependencies = compiler.find_dependencies(source_path) if compiler.supports_dependencies else []
+            source_digest = compiler.get_source_digest(source_path, dependencies)
+        except (exceptions.StaticCompilationError, ValueError, OSError):
+            return None
+        # The compiled files refer to the static URL and to the source files relative to the output directory
+        return hashlib.sha256(f"{source_digest}\0{settings.STATIC_URL}\0{settings.OUTPUT_DIR}".encode()).hexdigest()
+
+    # noinspection PyMethodMayBeStatic
+    def get_entry_path(self, key: str, filename: str) -> str:
+        return f"{key[:2]}/{key}/{filename}"
+
+    def restore(self, key: str, compiler: "BaseCompiler", source_path: str) -> bool:
+        """Write the stored compiled files to the output directory.
+
+        :param key: key of the compiled files
+        :param compiler: compiler
+        :param source_path: relative path to a source file
+        :returns: whether the compiled files were found in the cache
+        """
+        try:
+            with self.storage.open(self.get_entry_path(key, INDEX_FILENAME)) as index_file:
+                filenames: List[str] = json.loads(index_file.read())
+            contents = []
+            for filename in filenames:
+                with self.storage.open(self.get_entry_path(key, filename)) as entry_file:
+                    contents.append(entry_file.read())
+        except (OSError, ValueError):
+            return False
+
+        output_dir = os.path.dirname(compiler.get_full_output_path(source_path))
+        os.makedirs(output_dir, exist_ok=True)
+        for filename, content in zip(filenames, contents):
+            utils.write_binary_file(content, os.path.join(output_dir, filename))
+        return True
+
+    def store(self, key: str, compiler: "BaseCompiler", source_path: str) -> None:
+        """Save the compiled files to the cache.
+
+        :param key: key of the compiled files
+        :param compiler: compiler
+        :param source_path: relative path to a source file
+        """
+        index_path = self.get_entry_path(key, INDEX_FILENAME)
+        if self.storage.exists(index_path):
+            return
+        filenames = []
+        for output_path in compiler.get_output_paths(source_path):
+            filename = os.path.basename(output_path)
+            full_output_path = os.path.join(settings.ROOT, utils.normalize_path(output_path))
+            entry_path = self.get_entry_path(key, filename)
+            # The entries are never modified, another process may have saved the same file already
+            if not self.storage.exists(entry_path):
+                with open(full_output_path, "rb") as output_file:
+                    self.storage.save(entry_path, base.ContentFile(output_file.read()))
+            filenames.append(filename)
+        if not self.storage.exists(index_path):
+            self.storage.save(index_path, base.ContentFile(json.dumps(filenames).encode()))
+
+
+def get_build_cache() -> Optional[BuildCache]:
+    """Return the build cache, or None if it isn't configured."""
+    global build_cache
+    if build_cache is None and (settings.BUILD_CACHE_STORAGE or settings.BUILD_CACHE_DIR):
+        with build_cache_lock:
+            if build_cache is None:
+                build_cache = BuildCache(build_cache_storage())
+    return build_cache
+
+
+def build_cache_storage() -> storage.Storage:
+    if settings.BUILD_CACHE_STORAGE:
+        try:
+            storage_class = module_loading.import_string(settings.BUILD_CACHE_STORAGE)
+        except ImportError as e:
+            raise django.core.exceptions.ImproperlyConfigured(
+                f'Error importing build cache storage {settings.BUILD_CACHE_STORAGE}: "{e}"'
+            ) from None
+        return storage_class(**settings.BUILD_CACHE_STORAGE_OPTIONS)
+    return storage.FileSystemStorage(location=settings.BUILD_CACHE_DIR)
@@ -1,8 +1,13 @@
+import contextlib
+import functools
 import hashlib
+import os
 import socket
-from typing import Optional
+import time
+from typing import Dict, Optional, Tuple
 
 import django.core.cache
+from django.db import transaction
 
 from . import settings
 
@@ -13,8 +18,50 @@ def get_cache() -> django.core.cache.BaseCache:
     return django.core.cache.cache  # type: ignore
 
 
+@functools.lru_cache(maxsize=None)
+def get_cache_key_prefix() -> str:
+    return f"static_precompiler.{socket.gethostname()}."
+
+
 def get_cache_key(key: str) -> str:
-    return f"static_precompiler.{socket.gethostname()}.{key}"
+    return f"{get_cache_key_prefix()}{key}"
+
+
+# Key of the generation of the saved dependencies. The dependencies are saved in the database shared by all hosts, so
+# the key isn't prefixed with the host name. Every change of the saved dependencies bumps the generation, so the lists
+# cached by any process under the previous one aren't used anymore.
+DEPENDENCIES_GENERATION_KEY = "static_precompiler.dependencies_generation"
+
+
+def get_dependencies_generation() -> int:
+    cache = get_cache()
+    generation: Optional[int] = cache.get(DEPENDENCIES_GENERATION_KEY)
+    if generation is None:
+        # Start from the current time, so the generation evicted from the cache isn't repeated
+        cache.add(DEPENDENCIES_GENERATION_KEY, time.time_ns(), None)
+        generation = cache.get(DEPENDENCIES_GENERATION_KEY, 0)
+    return generation
+
+
+def bump_dependencies_generation() -> None:
+    # If the generation has been evicted, a new one is started on the next lookup
+    with contextlib.suppress(ValueError):
+        get_cache().incr(DEPENDENCIES_GENERATION_KEY)
+
+
+def invalidate_dependencies() -> None:
+    """Bump the generation of the saved dependencies after they are changed. Inside a transaction it's bumped once more
+    when the transaction is committed, so the lists read by other processes before the commit aren't used either.
+    """
+    bump_dependencies_generation()
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(bump_dependencies_generation)
+
+
+def get_dependencies_cache_key(source_path: str, generation: Optional[int] = None) -> str:
+    if generation is None:
+        generation = get_dependencies_generation()
+    return f"static_precompiler.dependencies.{generation}.{get_hexdigest(source_path)}"
 
 
 def get_hexdigest(plaintext: str, length: Optional[int] = None) -> str:
@@ -22,3 +69,22 @@ def get_hexdigest(plaintext: str, length: Optional[int] = None) -> str:
     if length:
         return digest[:length]
     return digest
+
+
+# Digests of the file contents by full path, along with the file's modification time and size
+file_hexdigests: Dict[str, Tuple[Tuple[int, int], str]] = {}
+
+
+def get_file_hexdigest(full_path: str) -> str:
+    """Return SHA-256 digest of the file contents. The digest is cached in the process memory until the file is
+    modified.
+    """
+    stat = os.stat(full_path)
+    file_key = (stat.st_mtime_ns, stat.st_size)
+    cached = file_hexdigests.get(full_path)
+    if cached is not None and cached[0] == file_key:
+        return cached[1]
+    with open(full_path, "rb") as file_object:
+        digest = hashlib.sha256(file_object.read()).hexdigest()
+    file_hexdigests[full_path] = (file_key, digest)
+    return digest
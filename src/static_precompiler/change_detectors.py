@@ -0,0 +1,220 @@
+import contextlib
+import importlib
+import json
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import django.core.exceptions
+
+from . import caching, settings
+
+if TYPE_CHECKING:
+    from .compilers import BaseCompiler
+
+__all__ = (
+    "ChangeDetector",
+    "MtimeChangeDetector",
+    "HashChangeDetector",
+    "get_change_detector",
+)
+
+# Name of the file in `OUTPUT_DIR` where `HashChangeDetector` keeps the digests of the compiled source files
+HASHES_FILENAME = ".hashes.json"
+
+change_detector: Optional["ChangeDetector"] = None
+
+
+class ChangeDetector:
+    """Tell whether a source file has changed since it was compiled."""
+
+    def is_changed(
+        self,
+        compiler: "BaseCompiler",
+        source_path: str,
+        compiled_mtime: float,
+        get_dependencies: Callable[[str], List[str]],
+    ) -> bool:
+        """Return True iff the source file or its dependencies have changed since the file was compiled.
+            May raise ValueError if one of the files can't be found.
+
+        :param compiler: compiler
+        :param source_path: relative path to a source file
+        :param compiled_mtime: modification time of the compiled file
+        :param get_dependencies: function that returns the saved dependencies for a source file
+        :returns: whether the source file should be compiled
+        """
+        raise NotImplementedError
+
+    def record(self, compiler: "BaseCompiler", source_path: str, dependencies: List[str]) -> None:
+        """Remember the state of the source file after it has been compiled.
+
+        :param compiler: compiler
+        :param source_path: relative path to a source file
+        :param dependencies: list of paths to the dependencies
+        """
+
+    @contextlib.contextmanager
+    def batch(self) -> Iterator[None]:
+        """Postpone saving the recorded state until all files in the batch are compiled."""
+        yield
+
+
+class MtimeChangeDetector(ChangeDetector):
+    """Compare the modification time of the compiled file with the modification times of the source file and its
+    dependencies.
+    The compiled file isn't rewritten if its content stays the same, so the time of the compilation is saved to
+    the Django cache along with the modification time of the compiled file at that moment. The other processes on
+    the host see it too, the file is compiled once more if the entry is evicted.
+    """
+
+    # noinspection PyMethodMayBeStatic
+    def get_compiled_at_cache_key(self, source_path: str) -> str:
+        return caching.get_cache_key(f"compiled_at.{caching.get_hexdigest(source_path)}")
+
+    def is_changed(
+        self,
+        compiler: "BaseCompiler",
+        source_path: str,
+        compiled_mtime: float,
+        get_dependencies: Callable[[str], List[str]],
+    ) -> bool:
+        source_paths = [source_path]
+        if compiler.supports_dependencies:
+            source_paths += get_dependencies(source_path)
+        # Check the source file along with its dependencies, so their modification times are fetched at once
+        source_mtimes = compiler.get_source_mtimes(source_paths)
+        if not any(compiled_mtime <= source_mtime for source_mtime in source_mtimes):
+            return False
+        compiled_at: Optional[Tuple[Optional[float], float]] = caching.get_cache().get(
+            self.get_compiled_at_cache_key(source_path)
+        )
+        if compiled_at is None or compiled_at[0] != compiled_mtime:
+            return True
+        return any(compiled_at[1] <= source_mtime for source_mtime in source_mtimes)
+
+    def record(self, compiler: "BaseCompiler", source_path: str, dependencies: List[str]) -> None:
+        caching.get_cache().set(
+            self.get_compiled_at_cache_key(source_path),
+            (compiler.get_output_mtime(source_path), time.time()),
+            settings.CACHE_TIMEOUT,
+        )
+
+
+class HashChangeDetector(ChangeDetector):
+    """Compare the digest of the contents of the source file, its dependencies and the compiler options with the one
+    recorded when the file was compiled. Unlike `MtimeChangeDetector` it isn't affected by the modification times
+    being reset, e.g. by a fresh checkout or when the files are copied into a container image.
+    The digests and the dependencies are saved to a file in `STATIC_PRECOMPILER_OUTPUT_DIR`.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.RLock()
+        self.hashes: Dict[str, Dict[str, Any]] = {}
+        self.hashes_mtime: Optional[int] = None
+        self.pending: Dict[str, Dict[str, Any]] = {}
+        self.batch_depth = 0
+
+    # noinspection PyMethodMayBeStatic
+    def get_hashes_path(self) -> str:
+        return os.path.join(settings.ROOT, settings.OUTPUT_DIR, HASHES_FILENAME)
+
+    def load(self) -> None:
+        """Load the saved digests, unless they are already loaded and the file hasn't changed."""
+        hashes_path = self.get_hashes_path()
+        try:
+            hashes_mtime: Optional[int] = os.stat(hashes_path).st_mtime_ns
+        except OSError:
+            hashes_mtime = None
+        if hashes_mtime == self.hashes_mtime:
+            return
+        hashes = {}
+        if hashes_mtime is not None:
+            try:
+                with open(hashes_path, encoding="utf-8") as file_object:
+                    hashes = json.load(file_object)
+            except ValueError:
+                # The file is broken, the source files will be compiled again
+                pass
+        self.hashes = hashes
+        self.hashes_mtime = hashes_mtime
+
+    def save(self) -> None:
+        """Save the recorded digests, merging them with the ones saved by other processes."""
+        self.load()
+        self.hashes.update(self.pending)
+        self.pending = {}
+        hashes_path = self.get_hashes_path()
+        os.makedirs(os.path.dirname(hashes_path), exist_ok=True)
+        temp_path = f"{hashes_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file_object:
+            json.dump(self.hashes, file_object, sort_keys=True)
+        os.replace(temp_path, hashes_path)
+        self.hashes_mtime = os.stat(hashes_path).st_mtime_ns
+
+    def is_changed(
+        self,
+        compiler: "BaseCompiler",
+        source_path: str,
+        compiled_mtime: float,
+        get_dependencies: Callable[[str], List[str]],
+    ) -> bool:
+        with self.lock:
+            self.load()
+            saved = self.pending.get(source_path) or self.hashes.get(source_path)
+        if saved is None:
+            return True
+        try:
+            return compiler.get_source_digest(source_path, saved["dependencies"]) != saved["digest"]
+        except (ValueError, OSError):
+            # One of the recorded dependencies has been removed, the source file must be compiled to update them
+            return True
+
+    def record(self, compiler: "BaseCompiler", source_path: str, dependencies: List[str]) -> None:
+        digest = compiler.get_source_digest(source_path, dependencies)
+        with self.lock:
+            self.pending[source_path] = {"digest": digest, "dependencies": list(dependencies)}
+            if not self.batch_depth:
+                self.save()
+
+    @contextlib.contextmanager
+    def batch(self) -> Iterator[None]:
+        with self.lock:
+            self.batch_depth += 1
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.batch_depth -= 1
+                if not self.batch_depth and self.pending:
+                    self.save()
+
+
+def get_change_detector() -> ChangeDetector:
+    global change_detector
+    if change_detector is None:
+        change_detector = build_change_detector()
+    return change_detector
+
+
+def build_change_detector() -> ChangeDetector:
+    try:
+        detector_module, detector_classname = settings.CHANGE_DETECTOR.rsplit(".", 1)
+    except ValueError:
+        raise django.core.exceptions.ImproperlyConfigured(
+            f"{settings.CHANGE_DETECTOR} isn't a change detector class"
+        ) from None
+    try:
+        mod = importlib.import_module(detector_module)
+    except ImportError as e:
+        raise django.core.exceptions.ImproperlyConfigured(
+            f'Error importing change detector {detector_module}: "{e}"'
+        ) from None
+    try:
+        detector_class = getattr(mod, detector_classname)
+    except AttributeError:
+        raise django.core.exceptions.ImproperlyConfigured(
+            f'Change detector module "{detector_module}" does not define a "{detector_classname}" class'
+        ) from None
+    return detector_class()
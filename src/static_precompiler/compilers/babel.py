@@ -1,8 +1,9 @@
 import os
+import tempfile
 import warnings
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
-from .. import exceptions, utils
+from .. import exceptions, node_worker, utils
 from . import base
 
 __all__ = ("Babel",)
@@ -20,6 +21,7 @@ class Babel(base.BaseCompiler):
         modules: Optional[str] = None,
         plugins: Optional[str] = None,
         presets: Optional[str] = None,
+        use_worker: bool = False,
     ):
         self.executable = executable
         self.is_sourcemap_enabled = sourcemap_enabled
@@ -30,6 +32,7 @@ class Babel(base.BaseCompiler):
         self.modules = modules
         self.plugins = plugins
         self.presets = presets
+        self.use_worker = use_worker
         super().__init__()
 
     def get_extra_args(self) -> List[str]:
@@ -46,31 +49,48 @@ class Babel(base.BaseCompiler):
 
         return args
 
+    def get_worker_params(self, source: str) -> Dict[str, Any]:
+        return {
+            "source": source,
+            "plugins": self.plugins.split(",") if self.plugins else None,
+            "presets": self.presets.split(",") if self.presets else None,
+        }
+
     def compile_file(self, source_path: str) -> str:
+        full_output_path = self.get_full_output_path(source_path)
+
+        if self.use_worker:
+            params = self.get_worker_params(self.get_source(source_path))
+            params["filename"] = self.get_full_source_path(source_path)
+            if self.is_sourcemap_enabled:
+                params["sourceMapUrl"] = os.path.basename(full_output_path) + ".map"
+            result = node_worker.get_pool().run("babel", params)
+            self.write_output(source_path, result["code"], result.get("map"))
+            return self.get_output_path(source_path)
+
         args = [self.executable, *self.get_extra_args()]
 
         if self.is_sourcemap_enabled:
             args.append("-s")
 
-        full_output_path = self.get_full_output_path(source_path)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # The compiled file is published with `write_output`, the name is kept for the sourcemap reference
+            temp_output_path = os.path.join(temp_dir, os.path.basename(full_output_path))
+            args.extend(["-o", temp_output_path])
+            args.append(self.get_full_source_path(source_path))
 
-        full_output_dirname = os.path.dirname(full_output_path)
-        if not os.path.exists(full_output_dirname):
-            os.makedirs(full_output_dirname)
+            return_code, out, errors = utils.run_command(args)
+            if return_code:
+                raise exceptions.StaticCompilationError(errors)
 
-        args.extend(["-o", full_output_path])
-        args.append(self.get_full_source_path(source_path))
-
-        return_code, out, errors = utils.run_command(args)
-        if return_code:
-            raise exceptions.StaticCompilationError(errors)
-
-        if self.is_sourcemap_enabled:
-            utils.fix_sourcemap(full_output_path + ".map", source_path, full_output_path)
+            self.write_temp_output(source_path, temp_output_path)
 
         return self.get_output_path(source_path)
 
     def compile_source(self, source: str) -> str:
+        if self.use_worker:
+            return node_worker.get_pool().run("babel", self.get_worker_params(source))["code"]
+
         args = [self.executable, *self.get_extra_args()]
 
         return_code, out, errors = utils.run_command(args, input=source)
@@ -1,18 +1,35 @@
-import contextlib
+import hashlib
+import json
 import logging
 import os
 import posixpath
-from typing import List, Optional
+from typing import Dict, List, Optional, Set, Tuple, Union
 
-import django.core.exceptions
-from django.contrib.staticfiles import finders
 from django.utils import encoding, functional
 
-from .. import models, mtime, settings, utils
+from .. import (
+    build_cache,
+    caching,
+    change_detectors,
+    compression,
+    dependency_graph,
+    exceptions,
+    failures,
+    file_index,
+    locks,
+    models,
+    mtime,
+    settings,
+    url_converter,
+    utils,
+)
 from ..types import StrCollection
 
 logger = logging.getLogger("static_precompiler")
 
+# Number of characters of the content digest in the names of the compiled files, see `get_compiled_path`
+HASHED_FILENAME_DIGEST_LENGTH = 12
+
 
 __all__ = ("BaseCompiler",)
 
@@ -22,13 +39,69 @@ class BaseCompiler:
     supports_dependencies: bool = False
     input_extension: str = ""
     output_extension: str = ""
+    # Set to True by the compilers that override `should_compile`: `compilestatic` calls it for every source file
+    # instead of checking the source files against the preloaded dependency graph
+    custom_should_compile: bool = False
+    # Set to True by the compilers that override `compile_many` to compile many files at once: `compilestatic` passes
+    # the files to them in batches instead of one by one
+    supports_batch: bool = False
+    # Set to False by the compilers that override `is_supported` to tell the source files by something other than
+    # the extension: they are checked one by one instead of being looked up by extension
+    matches_by_extension: bool = True
+
+    def __init__(self) -> None:
+        # Imports found in the source code by source path, along with the modification time of the source file
+        self._imports_cache: Dict[str, Tuple[int, List[str]]] = {}
+
+    def get_input_extensions(self) -> Tuple[str, ...]:
+        """Return the extensions (without the leading dot) of the source files supported by this precompiler.
+        The registry looks up the compilers by these extensions, unless `is_supported` is overridden.
+        """
+        return (self.input_extension,) if self.input_extension else ()
+
+    def get_dependency_extensions(self) -> Tuple[str, ...]:
+        """Return the extensions (without the leading dot) of the files the source files may depend on.
+        Watch mode ignores the changes of the files with the other extensions.
+        """
+        return self.get_input_extensions()
 
     def is_supported(self, source_path: str) -> bool:
         """Return True iff provided source file type is supported by this precompiler.
 
         :param source_path: relative path to a source file
         """
-        return os.path.splitext(source_path)[1].lstrip(".") == self.input_extension if self.input_extension else False
+        return os.path.splitext(source_path)[1].lstrip(".") in self.get_input_extensions()
+
+    def get_options_digest(self) -> str:
+        """Return the digest of the compiler class and its options, i.e. everything but the source files that affects
+        the compiled output.
+        """
+        options = {key: value for key, value in vars(self).items() if not key.startswith("_")}
+        compiler_class = f"{self.__class__.__module__}.{self.__class__.__qualname__}"
+        return caching.get_hexdigest(json.dumps([compiler_class, options], sort_keys=True, default=repr))
+
+    def get_source_digest(self, source_path: str, dependencies: List[str]) -> str:
+        """Return the digest of everything the compiled file is built from: the compiler options, the paths and the
+            contents of the source file and its dependencies.
+            May raise ValueError if one of the files can't be found.
+
+        :param source_path: relative path to a source file
+        :param dependencies: list of paths to the dependencies
+        :returns: SHA-256 hex digest
+        """
+        digest = hashlib.sha256(self.get_options_digest().encode())
+        for path in [source_path, *dependencies]:
+            digest.update(f"\0{path}\0{caching.get_file_hexdigest(self.get_full_source_path(path))}".encode())
+        return digest.hexdigest()
+
+    # noinspection PyMethodMayBeStatic
+    def is_partial(self, source_path: str) -> bool:
+        """Return True iff provided source file is a partial, i.e. it's meant to be imported by other source files
+            and isn't compiled on its own by the management command.
+
+        :param source_path: relative path to a source file
+        """
+        return False
 
     # noinspection PyMethodMayBeStatic
     def get_full_source_path(self, source_path: str) -> str:
@@ -40,23 +113,24 @@ class BaseCompiler:
         :returns: full path to the source file (OS-dependent)
         :raises: ValueError
         """
-        norm_source_path = utils.normalize_path(source_path.lstrip("/"))
-
-        full_path: Optional[str] = None
-
-        if settings.STATIC_ROOT:
-            full_path = os.path.join(settings.STATIC_ROOT, norm_source_path)
-            if os.path.exists(full_path):
-                return full_path
-
-        with contextlib.suppress(django.core.exceptions.SuspiciousOperation):
-            full_path = finders.find(norm_source_path)
+        full_path = file_index.find(source_path)
 
         if full_path is None:
             raise ValueError(f"Can't find staticfile named: {source_path}")
 
         return full_path
 
+    def is_located(self, source_path: str) -> bool:
+        """Return True iff the given source file can be located.
+
+        :param source_path: relative path to a source file
+        """
+        try:
+            self.get_full_source_path(source_path)
+        except ValueError:
+            return False
+        return True
+
     def get_output_filename(self, source_filename: str) -> str:
         """Return the name of compiled file based on the name of source file.
 
@@ -77,6 +151,46 @@ class BaseCompiler:
         output_filename = self.get_output_filename(source_filename)
         return posixpath.join(settings.OUTPUT_DIR, source_dir, output_filename)
 
+    def get_output_paths(self, source_path: str) -> List[str]:
+        """Get relative paths to all files produced by compiling the given source file, i.e. the compiled file and
+            its sourcemap if it's enabled.
+
+        :param source_path: relative path to a source file
+        :returns: relative paths to the compiled files (in posix format)
+        """
+        output_path = self.get_output_path(source_path)
+        if getattr(self, "is_sourcemap_enabled", False):
+            return [output_path, output_path + ".map"]
+        return [output_path]
+
+    def get_compiled_path(self, source_path: str) -> str:
+        """Get relative path to the file served for the given source file, i.e. the compiled file, or its copy named
+            with the digest of its content if `STATIC_PRECOMPILER_HASHED_FILENAMES` is enabled.
+            The copy is made if it doesn't exist yet. The returned path is in posix format.
+
+        :param source_path: relative path to a source file
+        :returns: relative path to the served file (in posix format)
+        """
+        output_path = self.get_output_path(source_path)
+        if not settings.HASHED_FILENAMES:
+            return output_path
+
+        full_output_path = self.get_full_output_path(source_path)
+        try:
+            digest = caching.get_file_hexdigest(full_output_path)
+        except OSError:
+            # The file hasn't been compiled yet
+            return output_path
+
+        root, extension = posixpath.splitext(output_path)
+        hashed_path = f"{root}.{digest[:HASHED_FILENAME_DIGEST_LENGTH]}{extension}"
+        full_hashed_path = os.path.join(settings.ROOT, utils.normalize_path(hashed_path))
+        # The name tells the content, so an existing copy is never outdated
+        if not os.path.exists(full_hashed_path):
+            with open(full_output_path, "rb") as output_file:
+                utils.write_binary_file(output_file.read(), full_hashed_path)
+        return hashed_path
+
     def get_full_output_path(self, source_path: str) -> str:
         """Get full path to compiled file based for the given source file.
             The returned path is OS-dependent.
@@ -94,6 +208,14 @@ class BaseCompiler:
         """
         return mtime.get_mtime(self.get_full_source_path(source_path))
 
+    def get_source_mtimes(self, source_paths: List[str]) -> List[float]:
+        """Get the modification times of multiple source files at once.
+
+        :param source_paths: relative paths to source files
+        :returns: modification times of the source files, in the same order
+        """
+        return mtime.get_mtimes([self.get_full_source_path(source_path) for source_path in source_paths])
+
     def get_output_mtime(self, source_path: str) -> Optional[float]:
         """Get the modification time of the compiled file.
             Return None of compiled file does not exist.
@@ -116,21 +238,18 @@ class BaseCompiler:
         if settings.DISABLE_AUTO_COMPILE and not from_management:
             return False
 
+        # Do not compile the partials if run from management
+        if from_management and self.is_partial(source_path):
+            return False
+
         compiled_mtime = self.get_output_mtime(source_path)
 
         if compiled_mtime is None:
             return True
 
-        if compiled_mtime <= self.get_source_mtime(source_path):
-            return True
-
-        if self.supports_dependencies:
-            for dependency in self.get_dependencies(source_path):
-                dependency_mtime = self.get_source_mtime(dependency)
-                if compiled_mtime <= dependency_mtime:
-                    return True
-
-        return False
+        return change_detectors.get_change_detector().is_changed(
+            self, source_path, compiled_mtime, self.get_dependencies
+        )
 
     def get_source(self, source_path: str) -> str:
         """Get the source code to be compiled.
@@ -152,22 +271,151 @@ class BaseCompiler:
         if not self.is_supported(source_path):
             raise ValueError(f"'{source_path}' file type is not supported by '{self.__class__.__name__}'")
 
-        compiled_path = self.get_output_path(source_path)
-
         if self.should_compile(source_path, from_management=from_management):
-            compiled_path = self.compile_file(source_path)
+            # A file that fails to compile on request isn't compiled again until its inputs change or the backoff
+            # passes, the management command compiles it anyway
+            cache_failures = bool(settings.FAILURE_BACKOFF) and not from_management
+            failure = failures.check(self, source_path) if cache_failures else None
+
+            full_output_path = self.get_full_output_path(source_path)
+            output_mtime = utils.get_mtime_ns(full_output_path)
+
+            # Make sure that concurrent requests don't compile the same file at once. If another process is
+            # compiling it, the previously compiled file is used meanwhile, the request waits only if there is none
+            lock_timeout = 0 if output_mtime is not None else None
+            with locks.acquire(self.get_output_path(source_path), timeout=lock_timeout) as acquired:
+                current_output_mtime = utils.get_mtime_ns(full_output_path)
+                if current_output_mtime is not None and (not acquired or current_output_mtime != output_mtime):
+                    # Another process has compiled the file while we were waiting, or it's still compiling it
+                    return self.get_compiled_path(source_path)
+                if not acquired:
+                    raise exceptions.StaticCompilationError(
+                        f"'{source_path}' is being compiled by another process for longer than "
+                        f"{settings.LOCK_TIMEOUT} seconds"
+                    )
+
+                try:
+                    compiled_path, dependencies = self.build(source_path)
+                except exceptions.StaticCompilationError as e:
+                    if cache_failures:
+                        failures.record(self, source_path, e, failure)
+                    raise
+                if failure is not None:
+                    failures.forget(source_path)
+
+                if self.supports_dependencies:
+                    self.update_dependencies(source_path, dependencies)
+
+            self.log_compiled(
+                source_path,
+                compiled_path,
+                from_management=from_management,
+                verbosity=verbosity,
+                changed=output_mtime is None or utils.get_mtime_ns(full_output_path) != output_mtime,
+            )
+
+            return compiled_path
+
+        return self.get_compiled_path(source_path)
+
+    def build(self, source_path: str) -> Tuple[str, List[str]]:
+        """Compile the source file and find its dependencies.
+            The compiled files are restored from the build cache if it's configured and the sources haven't changed.
+            Unlike `compile` it doesn't check whether the file should be compiled and doesn't access the database,
+            so it's safe to call it from worker threads.
+            May raise a StaticCompilationError if something goes wrong with compilation.
 
-            if self.supports_dependencies:
-                self.update_dependencies(source_path, self.find_dependencies(source_path))
+        :param source_path: relative path to a source file
+        :returns: path to the compiled file and the list of paths to the dependencies
+        """
+        result = self.build_many([source_path])[source_path]
+        if isinstance(result, Exception):
+            raise result
+        return result
 
-            message = f"Compiled '{source_path}' to '{compiled_path}'"
+    def build_many(self, source_paths: List[str]) -> Dict[str, Union[Tuple[str, List[str]], Exception]]:
+        """Same as `build`, for many source files at once. The files that aren't restored from the build cache are
+            compiled with `compile_many`.
 
-            if from_management and verbosity >= 1:
-                print(message)
-            else:
-                logging.info(message)
+        :param source_paths: relative paths to source files
+        :returns: path to the compiled file and the list of paths to the dependencies, or the error, by source path
+        """
+        cache = build_cache.get_build_cache()
+        cache_keys: Dict[str, str] = {}
+        compiled_paths: Dict[str, Union[str, Exception]] = {}
+        stale_paths = []
+        for source_path in source_paths:
+            cache_key = cache.get_key(self, source_path) if cache is not None else None
+            if cache is not None and cache_key is not None and cache.restore(cache_key, self, source_path):
+                compiled_paths[source_path] = self.get_output_path(source_path)
+                continue
+            if cache_key is not None:
+                cache_keys[source_path] = cache_key
+            stale_paths.append(source_path)
+        if stale_paths:
+            compiled_paths.update(self.compile_many(stale_paths))
+
+        detector = change_detectors.get_change_detector()
+        results: Dict[str, Union[Tuple[str, List[str]], Exception]] = {}
+        for source_path in source_paths:
+            compiled_path = compiled_paths[source_path]
+            if isinstance(compiled_path, Exception):
+                results[source_path] = compiled_path
+                continue
+            try:
+                if cache is not None and source_path in cache_keys:
+                    cache.store(cache_keys[source_path], self, source_path)
+                dependencies = self.find_dependencies(source_path) if self.supports_dependencies else []
+                detector.record(self, source_path, dependencies)
+                if settings.HASHED_FILENAMES:
+                    compiled_path = self.get_compiled_path(source_path)
+                if settings.PRECOMPRESS:
+                    self.compress_output(source_path)
+            except (exceptions.StaticCompilationError, ValueError) as e:
+                results[source_path] = e
+                continue
+            results[source_path] = (compiled_path, dependencies)
+        return results
+
+    def compress_output(self, source_path: str) -> None:
+        """Write the gzip (and brotli) compressed copies of the compiled files next to them.
+            The copies are written only if the compiled files have changed since the copies were made.
 
-        return compiled_path
+        :param source_path: relative path to a source file
+        """
+        output_paths = self.get_output_paths(source_path)
+        compiled_path = self.get_compiled_path(source_path)
+        if compiled_path not in output_paths:
+            output_paths.append(compiled_path)
+        for output_path in output_paths:
+            compression.compress_file(os.path.join(settings.ROOT, utils.normalize_path(output_path)))
+
+    # noinspection PyMethodMayBeStatic
+    def log_compiled(
+        self,
+        source_path: str,
+        compiled_path: str,
+        from_management: bool = False,
+        verbosity: int = 0,
+        changed: bool = True,
+    ) -> None:
+        """Report that the source file has been compiled.
+
+        :param source_path: relative path to a source file
+        :param compiled_path: relative path to the compiled file
+        :param from_management: whether the file was compiled from management command
+        :param verbosity: verbosity level
+        :param changed: whether the compiled file has been rewritten, it's left untouched if its content is the same
+        """
+        if changed:
+            message = f"Compiled '{source_path}' to '{compiled_path}'"
+        else:
+            message = f"Compiled '{source_path}', '{compiled_path}' is unchanged"
+
+        if from_management and verbosity >= 1:
+            print(message)
+        else:
+            logging.info(message)
 
     def compile_lazy(self, source_path: str) -> str:
         """Return a lazy object which, when translated to string, compiles the specified source path and returns
@@ -190,6 +438,57 @@ class BaseCompiler:
         """
         raise NotImplementedError
 
+    def compile_many(self, source_paths: List[str]) -> Dict[str, Union[str, Exception]]:
+        """Compile many source files. The errors are returned instead of being raised, so a broken file doesn't
+            prevent the other files from being compiled. Override it if the compiler can compile many files at once
+            faster than one by one.
+
+        :param source_paths: paths to the source files
+        :returns: path to the compiled file, or the error, by source path
+        """
+        results: Dict[str, Union[str, Exception]] = {}
+        for source_path in source_paths:
+            try:
+                results[source_path] = self.compile_file(source_path)
+            except (exceptions.StaticCompilationError, ValueError) as e:
+                results[source_path] = e
+        return results
+
+    def write_output(
+        self, source_path: str, compiled: str, sourcemap: Optional[str] = None, convert_urls: bool = False
+    ) -> None:
+        """Post-process the compiled code and its sourcemap in memory and write each of them once.
+            Files are replaced atomically, so concurrent readers never see a partially written file.
+            Files with the same content are left untouched, so their modification times are kept.
+
+        :param source_path: relative path to a source file
+        :param compiled: compiled code
+        :param sourcemap: sourcemap of the compiled code (if enabled)
+        :param convert_urls: whether to convert relative URLs in the compiled code
+        """
+        full_output_path = self.get_full_output_path(source_path)
+        os.makedirs(os.path.dirname(full_output_path), exist_ok=True)
+        if convert_urls:
+            compiled = url_converter.convert(compiled, source_path)
+        if sourcemap is not None:
+            # The sourcemap goes first, so it's in place when the compiled file referring to it appears
+            utils.write_file(
+                utils.fix_sourcemap_content(sourcemap, source_path, full_output_path), full_output_path + ".map"
+            )
+        utils.write_file(compiled, full_output_path)
+
+    def write_temp_output(self, source_path: str, temp_output_path: str, convert_urls: bool = False) -> None:
+        """Publish the file compiled into a temporary directory, along with its sourcemap if there is one,
+            with `write_output`.
+
+        :param source_path: relative path to a source file
+        :param temp_output_path: full path to the compiled file in the temporary directory
+        :param convert_urls: whether to convert relative URLs in the compiled code
+        """
+        compiled = utils.read_file(temp_output_path)
+        sourcemap = utils.read_file(temp_output_path + ".map") if os.path.exists(temp_output_path + ".map") else None
+        self.write_output(source_path, compiled, sourcemap, convert_urls=convert_urls)
+
     def compile_source(self, source: str) -> str:
         """Compile the source code. May raise a StaticCompilationError
             if something goes wrong with compilation.
@@ -199,65 +498,203 @@ class BaseCompiler:
         """
         raise NotImplementedError
 
+    # noinspection PyMethodMayBeStatic
+    def find_imports(self, source: str) -> List[str]:
+        """Find the imports in the source code, as they are written.
+
+        :param source: source code
+        :returns: list of the imported paths
+        """
+        return []
+
+    def get_imports(self, source_path: str) -> List[str]:
+        """Get the imports found in the given source file with `find_imports`.
+            The result is cached until the source file is modified. The imports aren't resolved to the files, so the
+            added and removed files are noticed by `find_imported_files`.
+
+        :param source_path: relative path to a source file
+        :returns: list of the imported paths
+        """
+        full_source_path = self.get_full_source_path(source_path)
+        try:
+            source_mtime = os.stat(full_source_path).st_mtime_ns
+        except OSError:
+            return self.find_imports(self.get_source(source_path))
+
+        cached = self._imports_cache.get(source_path)
+        if cached is not None and cached[0] == source_mtime:
+            return cached[1]
+
+        imports = self.find_imports(self.get_source(source_path))
+        self._imports_cache[source_path] = (source_mtime, imports)
+        return imports
+
+    def find_imported_files(self, source_path: str) -> List[str]:
+        """Find the files imported directly by the given source file. The imports are resolved to the files on every
+            call, use `get_imports` to get them.
+
+        :param source_path: relative path to a source file
+        :returns: list of paths to the imported files
+        """
+        return []
+
     def find_dependencies(self, source_path: str) -> List[str]:
-        """Find the dependencies for the given source file.
+        """Find the dependencies for the given source file, i.e. the files it imports directly or indirectly.
+            Each file in the import graph is visited only once, circular imports are logged and skipped.
 
         :param source_path: relative path to a source file
         :returns: list of paths to the dependencies
         """
-        return []
+        dependencies: Set[str] = set()
+        # Depth-first traversal, the stack holds the current chain of imports
+        stack = [(source_path, iter(self.find_imported_files(source_path)))]
+        chain = {source_path}
+
+        while stack:
+            path, imported_files = stack[-1]
+            imported_file = next(imported_files, None)
+
+            if imported_file is None:
+                stack.pop()
+                chain.discard(path)
+                continue
+
+            if imported_file in chain:
+                import_chain = " -> ".join([item[0] for item in stack] + [imported_file])
+                logger.warning(f"Circular import detected: {import_chain}")
+                continue
+
+            if imported_file in dependencies:
+                continue
+
+            dependencies.add(imported_file)
+            chain.add(imported_file)
+            stack.append((imported_file, iter(self.find_imported_files(imported_file))))
+
+        return sorted(dependencies)
 
     # noinspection PyMethodMayBeStatic
     def get_dependencies(self, source_path: str) -> List[str]:
         """Get the saved dependencies for the given source file.
+            The dependencies are cached until they are updated with `update_dependencies`, so the database is queried
+            only if they aren't cached or one of them can't be located anymore. The preloaded dependency graph is used
+            instead of the database if there is one, see `dependency_graph.preload`.
 
         :param source_path: relative path to a source file
         :returns: list of paths to the dependencies
         """
+        graph = dependency_graph.get_graph()
+        if graph is not None:
+            saved_dependencies = graph.get_dependencies(source_path)
+            dependencies = [dependency for dependency in saved_dependencies if self.is_located(dependency)]
+            if dependencies != saved_dependencies:
+                # Files referenced in the graph can't be located. Remove them.
+                graph.update(source_path, dependencies)
+            return dependencies
+
+        cache = caching.get_cache()
+        cache_key = caching.get_dependencies_cache_key(source_path)
+        cached: Optional[List[str]] = cache.get(cache_key)
+        if cached is not None:
+            try:
+                for dependency in cached:
+                    self.get_full_source_path(dependency)
+            except ValueError:
+                # One of the files has been removed, the saved dependencies are cleaned up below
+                pass
+            else:
+                return list(cached)
+
         dependencies = []
+        removed = False
         for dependency in models.Dependency.objects.filter(source=source_path).order_by("depends_on"):
             try:
                 self.get_full_source_path(dependency.depends_on)
             except ValueError:
                 # File referenced in Dependency can't be located. Remove the Dependency object.
                 dependency.delete()
+                removed = True
             else:
                 dependencies.append(dependency.depends_on)
+        if removed:
+            # The removal has bumped the generation of the saved dependencies
+            cache_key = caching.get_dependencies_cache_key(source_path)
+        cache.set(cache_key, dependencies, settings.CACHE_TIMEOUT)
         return dependencies
 
-    # noinspection PyMethodMayBeStatic
     def get_dependents(self, source_path: str) -> List[str]:
         """Get a list of files that depends on the given source file.
 
         :param source_path: relative path to a source file
         :returns: list of paths for the dependents
         """
-        dependents = []
-        for dependency in models.Dependency.objects.filter(depends_on=source_path).order_by("source"):
-            try:
-                self.get_full_source_path(dependency.source)
-            except ValueError:
-                # File referenced in Dependency can't be located. Remove the Dependency object.
-                dependency.delete()
+        return self.get_dependents_many([source_path])
+
+    # noinspection PyMethodMayBeStatic
+    def get_dependents_many(self, source_paths: StrCollection) -> List[str]:
+        """Get a list of files that depend on any of the given source files, directly or indirectly.
+            The saved dependencies of a source file include the indirect ones, so a single query is enough.
+
+        :param source_paths: relative paths to source files
+        :returns: list of paths for the dependents
+        """
+        graph = dependency_graph.get_graph()
+        if graph is not None:
+            dependents = []
+            for dependent in sorted({dependent for path in source_paths for dependent in graph.get_dependents(path)}):
+                if self.is_located(dependent):
+                    dependents.append(dependent)
+                else:
+                    # File referenced in the graph can't be located. Remove its dependencies.
+                    graph.update(dependent, [])
+            return dependents
+
+        dependents = set()
+        missing_dependents = set()
+        for dependent in models.Dependency.objects.filter(depends_on__in=list(source_paths)).values_list(
+            "source", flat=True
+        ):
+            if dependent in dependents or dependent in missing_dependents:
+                continue
+            if self.is_located(dependent):
+                dependents.add(dependent)
             else:
-                dependents.append(dependency.source)
-        return dependents
+                missing_dependents.add(dependent)
+        if missing_dependents:
+            # Files referenced in Dependency can't be located. Remove the Dependency objects.
+            models.Dependency.objects.filter(source__in=missing_dependents).delete()
+            caching.invalidate_dependencies()
+        return sorted(dependents)
 
     # noinspection PyMethodMayBeStatic
     def update_dependencies(self, source_path: str, dependencies: StrCollection) -> None:
         """Updates the saved dependencies for the given source file.
+            The saved dependencies are compared with the given ones, so at most three queries are made: one to fetch
+            the saved dependencies, one to delete the removed ones and one to insert the new ones.
 
         :param source_path: relative path to a source file
         :param dependencies: list of files that source file depends on
         """
-        if not dependencies:
-            models.Dependency.objects.filter(source=source_path).delete()
-        else:
-            models.Dependency.objects.filter(source=source_path).exclude(
-                depends_on__in=dependencies,
-            ).delete()
-            for dependency in dependencies:
-                models.Dependency.objects.get_or_create(
-                    source=source_path,
-                    depends_on=dependency,
-                )
+        graph = dependency_graph.get_graph()
+        if graph is not None:
+            graph.update(source_path, dependencies)
+            return
+
+        saved_dependencies = set(
+            models.Dependency.objects.filter(source=source_path).values_list("depends_on", flat=True)
+        )
+        removed_dependencies = saved_dependencies.difference(dependencies)
+        new_dependencies = set(dependencies).difference(saved_dependencies)
+        if removed_dependencies:
+            models.Dependency.objects.filter(source=source_path, depends_on__in=removed_dependencies).delete()
+        if new_dependencies:
+            # Another process may have saved the same dependencies meanwhile
+            models.Dependency.objects.bulk_create(
+                [
+                    models.Dependency(source=source_path, depends_on=dependency)
+                    for dependency in sorted(new_dependencies)
+                ],
+                ignore_conflicts=True,
+            )
+        if removed_dependencies or new_dependencies:
+            caching.invalidate_dependencies()
@@ -1,9 +1,11 @@
+import collections
 import os
 import posixpath
 import re
-from typing import List, Match, Optional
+import tempfile
+from typing import Dict, List, Match, Optional, Tuple, Union
 
-from .. import exceptions, url_converter, utils
+from .. import exceptions, utils
 from ..types import StrCollection
 from . import base
 
@@ -19,6 +21,7 @@ class SCSS(base.BaseCompiler):
     input_extension = "scss"
     output_extension = "css"
     import_extensions = ("scss", "sass")
+    supports_batch = True
 
     IMPORT_RE = re.compile(r"@import\s+(.+?)\s*;", re.DOTALL)
 
@@ -35,6 +38,9 @@ class SCSS(base.BaseCompiler):
         self.load_paths: StrCollection = load_paths or []
         super().__init__()
 
+    def get_dependency_extensions(self) -> Tuple[str, ...]:
+        return tuple(self.import_extensions)
+
     def get_extra_args(self) -> List[str]:
         args = []
 
@@ -46,48 +52,90 @@ class SCSS(base.BaseCompiler):
 
         return args
 
-    def should_compile(self, source_path: str, from_management: bool = False) -> bool:
-        # Do not compile the files that start with "_" if run from management
-        if from_management and os.path.basename(source_path).startswith("_"):
-            return False
-        return super().should_compile(source_path, from_management)
+    def is_partial(self, source_path: str) -> bool:
+        return os.path.basename(source_path).startswith("_")
+
+    def get_sourcemap_args(self) -> List[str]:
+        return ["--source-map"] if self.is_sourcemap_enabled else ["--no-source-map"]
+
+    # noinspection PyMethodMayBeStatic
+    def get_cwd(self, source_path: str, full_source_path: str) -> str:
+        """Get the directory containing `source_path`, compiler is run in this directory.
+        Ex: source_path = '1/2/3', full_source_path = '/abc/1/2/3' -> cwd = '/abc'
+        """
+        return os.path.normpath(os.path.join(full_source_path, *([".."] * len(source_path.split("/")))))
+
+    # noinspection PyMethodMayBeStatic
+    def get_temp_output_path(self, temp_dir: str, source_path: str) -> str:
+        """Get the path in the temporary directory where `sass` writes the compiled file before it's post-processed.
+        The path keeps the name of the compiled file, so the sourcemap is referred to by its final name.
+        """
+        temp_output_path = os.path.join(temp_dir, utils.normalize_path(self.get_output_path(source_path)))
+        os.makedirs(os.path.dirname(temp_output_path), exist_ok=True)
+        return temp_output_path
+
+    def write_temp_output(self, source_path: str, temp_output_path: str, convert_urls: bool = True) -> None:
+        super().write_temp_output(source_path, temp_output_path, convert_urls=convert_urls)
 
     def compile_file(self, source_path: str) -> str:
         full_source_path = self.get_full_source_path(source_path)
-        full_output_path = self.get_full_output_path(source_path)
-        args = [self.executable, *self.get_extra_args()]
-        if self.is_sourcemap_enabled:
-            args.append("--source-map")
-        else:
-            args.append("--no-source-map")
+        args = [self.executable, *self.get_extra_args(), *self.get_sourcemap_args()]
 
-        args.extend(
-            [
-                self.get_full_source_path(source_path),
-                full_output_path,
-            ]
-        )
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_output_path = self.get_temp_output_path(temp_dir, source_path)
+            args.extend(
+                [
+                    self.get_full_source_path(source_path),
+                    temp_output_path,
+                ]
+            )
 
-        full_output_dirname = os.path.dirname(full_output_path)
-        if not os.path.exists(full_output_dirname):
-            os.makedirs(full_output_dirname)
+            return_code, out, errors = utils.run_command(args, cwd=self.get_cwd(source_path, full_source_path))
 
-        # `cwd` is a directory containing `source_path`.
-        # Ex: source_path = '1/2/3', full_source_path = '/abc/1/2/3' -> cwd = '/abc'
-        cwd = os.path.normpath(os.path.join(full_source_path, *([".."] * len(source_path.split("/")))))
-        return_code, out, errors = utils.run_command(args, cwd=cwd)
+            if return_code:
+                raise exceptions.StaticCompilationError(errors)
 
-        if return_code:
-            if os.path.exists(full_output_path):
-                os.remove(full_output_path)
-            raise exceptions.StaticCompilationError(errors)
+            self.write_temp_output(source_path, temp_output_path)
 
-        url_converter.convert_urls(full_output_path, source_path)
+        return self.get_output_path(source_path)
 
-        if self.is_sourcemap_enabled:
-            utils.fix_sourcemap(full_output_path + ".map", source_path, full_output_path)
+    def compile_many(self, source_paths: List[str]) -> Dict[str, Union[str, Exception]]:
+        """Compile the source files with a single `sass` process for each source directory, passing
+        `source:output` pairs to it. If some of the files fail to compile, they are compiled again one by one
+        to tell which error belongs to which file.
+        """
+        if len(source_paths) < 2:
+            return super().compile_many(source_paths)
 
-        return self.get_output_path(source_path)
+        results: Dict[str, Union[str, Exception]] = {}
+        batches: Dict[str, List[Tuple[str, str]]] = collections.defaultdict(list)
+        for source_path in source_paths:
+            try:
+                full_source_path = self.get_full_source_path(source_path)
+            except ValueError as e:
+                results[source_path] = e
+                continue
+            batches[self.get_cwd(source_path, full_source_path)].append((source_path, full_source_path))
+
+        for cwd, batch in batches.items():
+            args = [self.executable, *self.get_extra_args(), *self.get_sourcemap_args(), "--no-error-css"]
+            with tempfile.TemporaryDirectory() as temp_dir:
+                temp_output_paths = {}
+                for source_path, full_source_path in batch:
+                    temp_output_paths[source_path] = self.get_temp_output_path(temp_dir, source_path)
+                    args.append(f"{full_source_path}:{temp_output_paths[source_path]}")
+
+                return_code, out, errors = utils.run_command(args, cwd=cwd)
+
+                for source_path, _ in batch:
+                    if return_code and not os.path.exists(temp_output_paths[source_path]):
+                        # The file hasn't been compiled, compile it on its own to get its error
+                        results.update(super().compile_many([source_path]))
+                        continue
+                    self.write_temp_output(source_path, temp_output_paths[source_path])
+                    results[source_path] = self.get_output_path(source_path)
+
+        return results
 
     def compile_source(self, source: str) -> str:
         args = [self.executable, "--stdin", "--no-indented", *self.get_extra_args()]
@@ -258,15 +306,11 @@ class SCSS(base.BaseCompiler):
 
         raise exceptions.StaticCompilationError(f"Can't locate the imported file: {import_path}")
 
-    def find_dependencies(self, source_path: str) -> List[str]:
-        source = self.get_source(source_path)
+    def find_imported_files(self, source_path: str) -> List[str]:
         source_dir = posixpath.dirname(source_path)
-        dependencies = set()
-        for import_path in self.find_imports(source):
-            import_path = self.locate_imported_file(source_dir, import_path)
-            dependencies.add(import_path)
-            dependencies.update(self.find_dependencies(import_path))
-        return sorted(dependencies)
+        return sorted(
+            {self.locate_imported_file(source_dir, import_path) for import_path in self.get_imports(source_path)}
+        )
 
 
 # noinspection PyAbstractClass
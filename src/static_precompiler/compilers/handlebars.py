@@ -1,7 +1,8 @@
 import os
-from typing import List, Optional
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
 
-from .. import exceptions, utils
+from .. import exceptions, node_worker, utils
 from ..types import StrCollection
 from . import base
 
@@ -16,8 +17,8 @@ class Handlebars(base.BaseCompiler):
     )
     output_extension = "js"
 
-    def is_supported(self, source_path: str) -> bool:
-        return os.path.splitext(source_path)[1].lstrip(".") in self.input_extensions
+    def get_input_extensions(self) -> Tuple[str, ...]:
+        return self.input_extensions
 
     def __init__(
         self,
@@ -26,12 +27,14 @@ class Handlebars(base.BaseCompiler):
         known_helpers: Optional[StrCollection] = None,
         namespace: Optional[str] = None,
         simple: bool = False,
+        use_worker: bool = False,
     ):
         self.executable = executable
         self.is_sourcemap_enabled = sourcemap_enabled
         self.known_helpers: StrCollection = known_helpers or []
         self.namespace = namespace
         self.simple = simple
+        self.use_worker = use_worker
         super().__init__()
 
     def get_extra_args(self) -> List[str]:
@@ -48,39 +51,52 @@ class Handlebars(base.BaseCompiler):
 
         return args
 
+    def get_worker_params(self) -> Dict[str, Any]:
+        return {"known": list(self.known_helpers), "namespace": self.namespace, "simple": self.simple}
+
     def compile_file(self, source_path: str) -> str:
         full_output_path = self.get_full_output_path(source_path)
-        output_dir = os.path.dirname(full_output_path)
-
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-
+        output_filename = os.path.basename(full_output_path)
         template_extension = os.path.splitext(source_path)[1].lstrip(".")
 
-        args = [
-            self.executable,
-            self.get_full_source_path(source_path),
-            "-e",
-            template_extension,
-            "-f",
-            full_output_path,
-            *self.get_extra_args(),
-        ]
-
-        if self.is_sourcemap_enabled:
-            args += ["--map", full_output_path + ".map"]
-
-        return_code, out, errors = utils.run_command(args)
-
-        if return_code:
-            raise exceptions.StaticCompilationError(errors)
-
-        if self.is_sourcemap_enabled:
-            utils.fix_sourcemap(full_output_path + ".map", source_path, full_output_path)
+        if self.use_worker:
+            params = self.get_worker_params()
+            params.update({"filename": self.get_full_source_path(source_path), "extension": template_extension})
+            if self.is_sourcemap_enabled:
+                params["sourceMapUrl"] = output_filename + ".map"
+            result = node_worker.get_pool().run("handlebars", params)
+            self.write_output(source_path, result["code"], result.get("map"))
+            return self.get_output_path(source_path)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # The compiled file is published with `write_output`. The tool refers to the sourcemap by the path it's
+            # written to, so it's run in the temporary directory and given the final names
+            args = [
+                self.executable,
+                self.get_full_source_path(source_path),
+                "-e",
+                template_extension,
+                "-f",
+                output_filename,
+                *self.get_extra_args(),
+            ]
+
+            if self.is_sourcemap_enabled:
+                args += ["--map", output_filename + ".map"]
+
+            return_code, out, errors = utils.run_command(args, cwd=temp_dir)
+
+            if return_code:
+                raise exceptions.StaticCompilationError(errors)
+
+            self.write_temp_output(source_path, os.path.join(temp_dir, output_filename))
 
         return self.get_output_path(source_path)
 
     def compile_source(self, source: str) -> str:
+        if self.use_worker:
+            return node_worker.get_pool().run("handlebars", {"source": source, **self.get_worker_params()})["code"]
+
         args = [self.executable, "-i", "-", *self.get_extra_args()]
 
         return_code, out, errors = utils.run_command(args, input=source)
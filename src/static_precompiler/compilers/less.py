@@ -1,9 +1,10 @@
 import os
 import posixpath
 import re
-from typing import Dict, List, Optional
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
 
-from .. import exceptions, url_converter, utils
+from .. import exceptions, node_worker, utils
 from ..types import StrCollection
 from . import base
 
@@ -26,6 +27,7 @@ class LESS(base.BaseCompiler):
         include_path: Optional[StrCollection] = None,
         clean_css: bool = False,
         global_vars: Optional[Dict[str, str]] = None,
+        use_worker: bool = False,
     ):
         self.executable = executable
         self.is_sourcemap_enabled = sourcemap_enabled
@@ -34,13 +36,11 @@ class LESS(base.BaseCompiler):
             self.include_path = ";".join(include_path)
         self.clean_css = clean_css
         self.global_vars = global_vars
+        self.use_worker = use_worker
         super().__init__()
 
-    def should_compile(self, source_path: str, from_management: bool = False) -> bool:
-        # Do not compile the files that start with "_" if run from management
-        if from_management and os.path.basename(source_path).startswith("_"):
-            return False
-        return super().should_compile(source_path, from_management)
+    def is_partial(self, source_path: str) -> bool:
+        return os.path.basename(source_path).startswith("_")
 
     def compile_file(self, source_path: str) -> str:
         full_source_path = self.get_full_source_path(source_path)
@@ -50,31 +50,63 @@ class LESS(base.BaseCompiler):
         # Ex: source_path = '1/2/3', full_source_path = '/abc/1/2/3' -> cwd = '/abc'
         cwd = os.path.normpath(os.path.join(full_source_path, *([".."] * len(source_path.split("/")))))
 
-        args = [self.executable]
-        if self.is_sourcemap_enabled:
-            args.append("--source-map")
-        if self.include_path:
-            args.append(f"--include-path={self.include_path}")
-        if self.clean_css:
-            args.append("--clean-css")
-        if self.global_vars:
-            for variable_name, variable_value in self.global_vars.items():
-                args.append(f"--global-var={variable_name}={variable_value}")
-
-        args.extend([self.get_full_source_path(source_path), full_output_path])
-        return_code, out, errors = utils.run_command(args, cwd=cwd)
-
-        if return_code:
-            raise exceptions.StaticCompilationError(errors)
+        if self.use_worker:
+            params = self.get_worker_params(self.get_source(source_path), cwd=cwd)
+            params.update(
+                {
+                    "filename": full_source_path,
+                    "cleanCss": self.clean_css,
+                    "globalVars": self.global_vars,
+                }
+            )
+            if self.is_sourcemap_enabled:
+                params["sourceMapUrl"] = os.path.basename(full_output_path) + ".map"
+            result = node_worker.get_pool().run("less", params)
+            compiled, sourcemap = result["code"], result.get("map")
+        else:
+            args = [self.executable]
+            if self.is_sourcemap_enabled:
+                args.append("--source-map")
+            if self.include_path:
+                args.append(f"--include-path={self.include_path}")
+            if self.clean_css:
+                args.append("--clean-css")
+            if self.global_vars:
+                for variable_name, variable_value in self.global_vars.items():
+                    args.append(f"--global-var={variable_name}={variable_value}")
+
+            with tempfile.TemporaryDirectory() as temp_dir:
+                # The compiled file is post-processed in memory, the name is kept for the sourcemap reference
+                temp_output_path = os.path.join(temp_dir, os.path.basename(full_output_path))
+                args.extend([self.get_full_source_path(source_path), temp_output_path])
+                return_code, out, errors = utils.run_command(args, cwd=cwd)
+
+                if return_code:
+                    raise exceptions.StaticCompilationError(errors)
+
+                compiled = utils.read_file(temp_output_path)
+                sourcemap = utils.read_file(temp_output_path + ".map") if self.is_sourcemap_enabled else None
+
+        self.write_output(source_path, compiled, sourcemap, convert_urls=True)
 
-        url_converter.convert_urls(full_output_path, source_path)
+        return self.get_output_path(source_path)
 
-        if self.is_sourcemap_enabled:
-            utils.fix_sourcemap(full_output_path + ".map", source_path, full_output_path)
+    def get_worker_params(self, source: str, cwd: Optional[str] = None) -> Dict[str, Any]:
+        """Get the parameters of the worker request.
 
-        return self.get_output_path(source_path)
+        :param source: source code
+        :param cwd: directory `lessc` is run in, the include paths are resolved relative to it (the current directory
+            by default)
+        """
+        paths = None
+        if self.include_path:
+            paths = [os.path.normpath(os.path.join(cwd or os.getcwd(), path)) for path in self.include_path.split(";")]
+        return {"source": source, "paths": paths}
 
     def compile_source(self, source: str) -> str:
+        if self.use_worker:
+            return node_worker.get_pool().run("less", self.get_worker_params(source))["code"]
+
         args = [self.executable, "-"]
         if self.include_path:
             args.append(f"--include-path={self.include_path}")
@@ -110,6 +142,10 @@ class LESS(base.BaseCompiler):
 
         return sorted(imports)
 
+    def get_dependency_extensions(self) -> Tuple[str, ...]:
+        # CSS files can be imported with "(inline)" option
+        return self.input_extension, "css"
+
     def locate_imported_file(self, source_dir: str, import_path: str) -> str:
         """Locate the imported file in the source directory.
             Return the relative path to the imported file in posix format.
@@ -145,12 +181,8 @@ class LESS(base.BaseCompiler):
 
         raise exceptions.StaticCompilationError(f"Can't locate the imported file: {import_path}")
 
-    def find_dependencies(self, source_path: str) -> List[str]:
-        source = self.get_source(source_path)
+    def find_imported_files(self, source_path: str) -> List[str]:
         source_dir = posixpath.dirname(source_path)
-        dependencies = set()
-        for import_path in self.find_imports(source):
-            import_path = self.locate_imported_file(source_dir, import_path)
-            dependencies.add(import_path)
-            dependencies.update(self.find_dependencies(import_path))
-        return sorted(dependencies)
+        return sorted(
+            {self.locate_imported_file(source_dir, import_path) for import_path in self.get_imports(source_path)}
+        )
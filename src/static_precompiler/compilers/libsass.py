@@ -1,13 +1,12 @@
-import os
 import re
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Union
 
 import sass  # type: ignore
 from django.utils import encoding
 
-from .. import exceptions, url_converter, utils
+from .. import exceptions
 from ..types import StrCollection
-from . import dart_sass
+from . import base, dart_sass
 
 __all__ = (
     "SCSS",
@@ -18,6 +17,8 @@ __all__ = (
 class SCSS(dart_sass.SCSS):
     IMPORT_RE = re.compile(r"@import\s+(.+?)\s*;", re.DOTALL)
     indented = False
+    # The files are compiled in the process, there is no `sass` executable to pass a batch to
+    supports_batch = False
 
     def __init__(
         self,
@@ -36,10 +37,6 @@ class SCSS(dart_sass.SCSS):
         full_source_path = self.get_full_source_path(source_path)
         full_output_path = self.get_full_output_path(source_path)
 
-        full_output_dirname = os.path.dirname(full_output_path)
-        if not os.path.exists(full_output_dirname):
-            os.makedirs(full_output_dirname)
-
         sourcemap_path = full_output_path + ".map"
         sourcemap = ""
 
@@ -69,16 +66,13 @@ class SCSS(dart_sass.SCSS):
         compiled = encoding.force_str(compiled)
         sourcemap = encoding.force_str(sourcemap)
 
-        utils.write_file(compiled, full_output_path)
-
-        url_converter.convert_urls(full_output_path, source_path)
-
-        if self.is_sourcemap_enabled:
-            utils.write_file(sourcemap, sourcemap_path)
-            utils.fix_sourcemap(sourcemap_path, source_path, full_output_path)
+        self.write_output(source_path, compiled, sourcemap if self.is_sourcemap_enabled else None, convert_urls=True)
 
         return self.get_output_path(source_path)
 
+    def compile_many(self, source_paths: List[str]) -> Dict[str, Union[str, Exception]]:
+        return base.BaseCompiler.compile_many(self, source_paths)
+
     def compile_source(self, source: str) -> str:
         try:
             compiled = sass.compile(string=source, indented=self.indented, include_paths=self.load_paths)
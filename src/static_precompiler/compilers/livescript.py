@@ -1,7 +1,8 @@
 import os
+import tempfile
 from typing import List
 
-from .. import exceptions, utils
+from .. import exceptions, node_worker, utils
 from . import base
 
 __all__ = ("LiveScript",)
@@ -12,9 +13,10 @@ class LiveScript(base.BaseCompiler):
     input_extension = "ls"
     output_extension = "js"
 
-    def __init__(self, executable: str = "lsc", sourcemap_enabled: bool = False):
+    def __init__(self, executable: str = "lsc", sourcemap_enabled: bool = False, use_worker: bool = False):
         self.executable = executable
         self.is_sourcemap_enabled = sourcemap_enabled
+        self.use_worker = use_worker
         super().__init__()
 
     def compile_file(self, source_path: str) -> str:
@@ -22,6 +24,18 @@ class LiveScript(base.BaseCompiler):
         # LiveScript bug with source map if the folder isn't already present
         if not os.path.exists(os.path.dirname(full_output_path)):
             os.makedirs(os.path.dirname(full_output_path))
+        if self.use_worker:
+            result = node_worker.get_pool().run(
+                "livescript",
+                {
+                    "source": self.get_source(source_path),
+                    "filename": self.get_full_source_path(source_path),
+                    "sourceMapUrl": os.path.basename(full_output_path) + ".map" if self.is_sourcemap_enabled else None,
+                },
+            )
+            self.write_output(source_path, result["code"], result.get("map"))
+            return self.get_output_path(source_path)
+
         args = [
             self.executable,
             "-c",
@@ -29,24 +43,28 @@ class LiveScript(base.BaseCompiler):
         if self.is_sourcemap_enabled:
             args.append("-m")
             args.append("linked")
-        args.extend(
-            [
-                "-o",
-                os.path.dirname(full_output_path),
-                self.get_full_source_path(source_path),
-            ]
-        )
-        return_code, out, errors = utils.run_command(args)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # The compiled file is published with `write_output`, the name is kept for the sourcemap reference
+            args.extend(
+                [
+                    "-o",
+                    temp_dir,
+                    self.get_full_source_path(source_path),
+                ]
+            )
+            return_code, out, errors = utils.run_command(args)
 
-        if return_code:
-            raise exceptions.StaticCompilationError(errors)
+            if return_code:
+                raise exceptions.StaticCompilationError(errors)
 
-        if self.is_sourcemap_enabled:
-            utils.fix_sourcemap(full_output_path + ".map", source_path, full_output_path)
+            self.write_temp_output(source_path, os.path.join(temp_dir, os.path.basename(full_output_path)))
 
         return self.get_output_path(source_path)
 
     def compile_source(self, source: str) -> str:
+        if self.use_worker:
+            return node_worker.get_pool().run("livescript", {"source": source})["code"]
+
         args = [
             self.executable,
             "-c",
@@ -1,9 +1,10 @@
 import os
 import posixpath
 import re
+import tempfile
 from typing import List
 
-from .. import exceptions, url_converter, utils
+from .. import exceptions, node_worker, utils
 from . import base
 
 __all__ = ("Stylus",)
@@ -17,12 +18,16 @@ class Stylus(base.BaseCompiler):
 
     IMPORT_RE = re.compile(r"@(?:import|require)\s+(.+?)\s*$", re.MULTILINE)
 
-    def __init__(self, executable: str = "stylus", sourcemap_enabled: bool = False):
+    def __init__(self, executable: str = "stylus", sourcemap_enabled: bool = False, use_worker: bool = False):
         self.executable = executable
         self.is_sourcemap_enabled = sourcemap_enabled
+        self.use_worker = use_worker
         super().__init__()
 
     def compile_source(self, source: str) -> str:
+        if self.use_worker:
+            return node_worker.get_pool().run("stylus", {"source": source})["code"]
+
         args = [
             self.executable,
             "-p",
@@ -37,35 +42,46 @@ class Stylus(base.BaseCompiler):
     def compile_file(self, source_path: str) -> str:
         full_source_path = self.get_full_source_path(source_path)
         full_output_path = self.get_full_output_path(source_path)
-        args = [
-            self.executable,
-        ]
-        if self.is_sourcemap_enabled:
-            args.append("-m")
-        args.extend(
-            [
-                full_source_path,
-                "-o",
-                os.path.dirname(full_output_path),
-            ]
-        )
-
-        full_output_dirname = os.path.dirname(full_output_path)
-        if not os.path.exists(full_output_dirname):
-            os.makedirs(full_output_dirname)
 
         # `cwd` is a directory containing `source_path`.
         # Ex: source_path = '1/2/3', full_source_path = '/abc/1/2/3' -> cwd = '/abc'
         cwd = os.path.normpath(os.path.join(full_source_path, *([".."] * len(source_path.split("/")))))
-        return_code, out, errors = utils.run_command(args, cwd=cwd)
 
-        if return_code:
-            raise exceptions.StaticCompilationError(errors)
+        if self.use_worker:
+            params = {
+                "source": self.get_source(source_path),
+                "filename": full_source_path,
+                "paths": [cwd],
+                "sourceMapUrl": os.path.basename(full_output_path) + ".map" if self.is_sourcemap_enabled else None,
+            }
+            result = node_worker.get_pool().run("stylus", params)
+            compiled, sourcemap = result["code"], result.get("map")
+        else:
+            args = [
+                self.executable,
+            ]
+            if self.is_sourcemap_enabled:
+                args.append("-m")
+            with tempfile.TemporaryDirectory() as temp_dir:
+                # The compiled file is post-processed in memory, the name is kept for the sourcemap reference
+                args.extend(
+                    [
+                        full_source_path,
+                        "-o",
+                        temp_dir,
+                    ]
+                )
 
-        url_converter.convert_urls(full_output_path, source_path)
+                return_code, out, errors = utils.run_command(args, cwd=cwd)
 
-        if self.is_sourcemap_enabled:
-            utils.fix_sourcemap(full_output_path + ".map", source_path, full_output_path)
+                if return_code:
+                    raise exceptions.StaticCompilationError(errors)
+
+                temp_output_path = os.path.join(temp_dir, os.path.basename(full_output_path))
+                compiled = utils.read_file(temp_output_path)
+                sourcemap = utils.read_file(temp_output_path + ".map") if self.is_sourcemap_enabled else None
+
+        self.write_output(source_path, compiled, sourcemap, convert_urls=True)
 
         return self.get_output_path(source_path)
 
@@ -103,12 +119,10 @@ class Stylus(base.BaseCompiler):
             raise exceptions.StaticCompilationError(f"Can't locate the imported file: {import_path}") from None
         return path
 
-    def find_dependencies(self, source_path: str) -> List[str]:
-        source = self.get_source(source_path)
+    def find_imported_files(self, source_path: str) -> List[str]:
         source_dir = posixpath.dirname(source_path)
-        dependencies = set()
         imported_files = set()
-        for import_path in self.find_imports(source):
+        for import_path in self.get_imports(source_path):
             if import_path.endswith(".styl"):
                 # @import "foo.styl"
                 imported_files.add(self.locate_imported_file(source_dir, import_path))
@@ -137,8 +151,4 @@ class Stylus(base.BaseCompiler):
                     # @import "foo" -> @import "foo.styl"
                     imported_files.add(self.locate_imported_file(source_dir, import_path + ".styl"))
 
-        dependencies.update(imported_files)
-        for imported_file in imported_files:
-            dependencies.update(self.find_dependencies(imported_file))
-
-        return sorted(dependencies)
+        return sorted(imported_files)
@@ -0,0 +1,65 @@
+import gzip
+from typing import Callable, List, Optional, Tuple
+
+from . import caching, settings, utils
+
+try:
+    import brotli  # type: ignore
+except ImportError:
+    brotli = None
+
+__all__ = (
+    "get_encoders",
+    "compress_file",
+)
+
+# Extensions of the compressed copies of the compiled files, see `get_encoders`
+EXTENSIONS = (".gz", ".br")
+
+
+def get_encoders() -> List[Tuple[str, Callable[[bytes], bytes]]]:
+    """Return the extensions of the compressed copies and the functions compressing the content.
+    Brotli is used if `brotli` package is installed.
+    """
+    # The compressed content doesn't depend on the time it's compressed at, so it's written only when it changes
+    encoders: List[Tuple[str, Callable[[bytes], bytes]]] = [
+        (".gz", lambda content: gzip.compress(content, compresslevel=9, mtime=0))
+    ]
+    if brotli is not None:
+        encoders.append((".br", brotli.compress))
+    return encoders
+
+
+def get_source_digest_cache_key(compressed_path: str) -> str:
+    return caching.get_cache_key(f"compressed.{caching.get_hexdigest(compressed_path)}")
+
+
+def compress_file(full_path: str) -> None:
+    """Write the compressed copies of the file next to it, unless they are newer than the file or they were made from
+    the same content. The digest of the content each copy is made from is saved to the Django cache.
+    Nothing is written if the file doesn't exist.
+
+    :param full_path: full path to the file
+    """
+    file_mtime = utils.get_mtime_ns(full_path)
+    if file_mtime is None:
+        return
+    cache = caching.get_cache()
+    digest: Optional[str] = None
+    content = None
+    for extension, compress in get_encoders():
+        compressed_path = full_path + extension
+        compressed_mtime = utils.get_mtime_ns(compressed_path)
+        if compressed_mtime is not None and compressed_mtime >= file_mtime:
+            continue
+        if digest is None:
+            digest = caching.get_file_hexdigest(full_path)
+        cache_key = get_source_digest_cache_key(compressed_path)
+        if compressed_mtime is not None and cache.get(cache_key) == digest:
+            # The file has been written again with the same content
+            continue
+        if content is None:
+            with open(full_path, "rb") as file_object:
+                content = file_object.read()
+        utils.write_binary_file(compress(content), compressed_path)
+        cache.set(cache_key, digest, settings.CACHE_TIMEOUT)
@@ -0,0 +1,195 @@
+import collections
+import contextlib
+import logging
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from django.db import connections, transaction
+
+from . import caching, models
+
+logger = logging.getLogger("static_precompiler")
+
+__all__ = (
+    "DependencyGraph",
+    "BackgroundSaver",
+    "get_graph",
+    "preload",
+    "flush",
+)
+
+# Maximum number of parameters in a single query, SQLite used to allow no more than 999
+QUERY_BATCH_SIZE = 500
+
+# The graph preloaded by `preload`, the compilers read and update the dependencies in it instead of the database
+graph: Optional["DependencyGraph"] = None
+
+
+class DependencyGraph:
+    """In-memory copy of the `Dependency` table. The updated dependencies are saved to the database by `flush`."""
+
+    def __init__(self, dependencies: Iterable[Tuple[str, str]] = ()) -> None:
+        """
+        :param dependencies: pairs of source path and the path to its dependency
+        """
+        self.lock = threading.RLock()
+        self.dependencies: Dict[str, Set[str]] = collections.defaultdict(set)
+        self.dependents: Dict[str, Set[str]] = collections.defaultdict(set)
+        # Source paths with the dependencies updated since the last flush
+        self.pending: Set[str] = set()
+        for source_path, dependency in dependencies:
+            self.dependencies[source_path].add(dependency)
+            self.dependents[dependency].add(source_path)
+
+    @classmethod
+    def load(cls) -> "DependencyGraph":
+        """Load the whole `Dependency` table with a single query."""
+        return cls(models.Dependency.objects.values_list("source", "depends_on"))
+
+    def get_dependencies(self, source_path: str) -> List[str]:
+        """Get the dependencies of the given source file.
+
+        :param source_path: relative path to a source file
+        :returns: list of paths to the dependencies
+        """
+        with self.lock:
+            return sorted(self.dependencies.get(source_path, ()))
+
+    def get_dependents(self, source_path: str) -> List[str]:
+        """Get the files that depend on the given source file.
+
+        :param source_path: relative path to a source file
+        :returns: list of paths to the dependents
+        """
+        with self.lock:
+            return sorted(self.dependents.get(source_path, ()))
+
+    def update(self, source_path: str, dependencies: Iterable[str]) -> None:
+        """Replace the dependencies of the given source file.
+
+        :param source_path: relative path to a source file
+        :param dependencies: list of files that source file depends on
+        """
+        dependencies = set(dependencies)
+        with self.lock:
+            saved_dependencies = self.dependencies.pop(source_path, set())
+            if saved_dependencies == dependencies:
+                if dependencies:
+                    self.dependencies[source_path] = dependencies
+                return
+            for dependency in saved_dependencies - dependencies:
+                self.dependents[dependency].discard(source_path)
+                if not self.dependents[dependency]:
+                    del self.dependents[dependency]
+            for dependency in dependencies - saved_dependencies:
+                self.dependents[dependency].add(source_path)
+            if dependencies:
+                self.dependencies[source_path] = dependencies
+            self.pending.add(source_path)
+
+    def flush(self) -> None:
+        """Save the updated dependencies to the database in a single transaction, with a query per
+        `QUERY_BATCH_SIZE` rows to fetch, delete and insert. If saving fails, the dependencies are saved by the next
+        flush.
+        """
+        with self.lock:
+            updates = {source_path: set(self.dependencies.get(source_path, ())) for source_path in self.pending}
+            self.pending = set()
+        if not updates:
+            return
+
+        try:
+            self.save(updates)
+        except BaseException:
+            with self.lock:
+                self.pending.update(updates)
+            raise
+
+    # noinspection PyMethodMayBeStatic
+    def save(self, updates: Dict[str, Set[str]]) -> None:
+        source_paths = sorted(updates)
+        with transaction.atomic():
+            removed_ids = []
+            saved: Dict[str, Set[str]] = collections.defaultdict(set)
+            for i in range(0, len(source_paths), QUERY_BATCH_SIZE):
+                for pk, source_path, dependency in models.Dependency.objects.filter(
+                    source__in=source_paths[i : i + QUERY_BATCH_SIZE]
+                ).values_list("pk", "source", "depends_on"):
+                    if dependency in updates[source_path]:
+                        saved[source_path].add(dependency)
+                    else:
+                        removed_ids.append(pk)
+            for i in range(0, len(removed_ids), QUERY_BATCH_SIZE):
+                models.Dependency.objects.filter(pk__in=removed_ids[i : i + QUERY_BATCH_SIZE]).delete()
+            models.Dependency.objects.bulk_create(
+                [
+                    models.Dependency(source=source_path, depends_on=dependency)
+                    for source_path in source_paths
+                    for dependency in sorted(updates[source_path] - saved[source_path])
+                ],
+                batch_size=QUERY_BATCH_SIZE,
+                ignore_conflicts=True,
+            )
+        caching.invalidate_dependencies()
+
+
+class BackgroundSaver:
+    """Flush the dependency graph to the database in a background thread, so the caller doesn't wait for the
+    database. The flushes requested while the previous one is running are merged into one.
+    """
+
+    def __init__(self, dependency_graph: DependencyGraph) -> None:
+        self.graph = dependency_graph
+        self.requested = threading.Event()
+        self.stopped = False
+        self.thread = threading.Thread(target=self.run, name="static_precompiler.BackgroundSaver", daemon=True)
+        self.thread.start()
+
+    def request(self) -> None:
+        """Flush the graph as soon as the running flush, if there is one, is done."""
+        self.requested.set()
+
+    def run(self) -> None:
+        while True:
+            self.requested.wait()
+            self.requested.clear()
+            if self.stopped:
+                break
+            try:
+                self.graph.flush()
+            except Exception:
+                logger.exception("Can't save the dependencies")
+            finally:
+                # The thread has its own database connections
+                connections.close_all()
+
+    def stop(self) -> None:
+        """Wait for the running flush to finish and stop the thread. The pending updates are flushed by the caller."""
+        self.stopped = True
+        self.requested.set()
+        self.thread.join()
+
+
+def get_graph() -> Optional[DependencyGraph]:
+    """Return the preloaded dependency graph, or None if the dependencies are read from the database."""
+    return graph
+
+
+@contextlib.contextmanager
+def preload() -> Iterator[DependencyGraph]:
+    """Load the whole `Dependency` table once and use it instead of the database for the duration of the block.
+    The updated dependencies are saved when the block exits.
+    """
+    global graph
+    graph = DependencyGraph.load()
+    try:
+        yield graph
+    finally:
+        graph.flush()
+        graph = None
+
+
+def flush() -> None:
+    """Save the dependencies updated in the preloaded graph, if there is one."""
+    if graph is not None:
+        graph.flush()
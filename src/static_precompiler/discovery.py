@@ -0,0 +1,134 @@
+import fnmatch
+import os
+import posixpath
+from typing import Collection, Iterator, Optional, Set, Tuple
+
+from . import registry, settings
+from .compilers import BaseCompiler
+from .types import StrCollection
+
+__all__ = (
+    "PathFilter",
+    "walk_files",
+    "find_source_files",
+)
+
+
+def normalize_full_path(full_path: str) -> str:
+    return os.path.normcase(os.path.abspath(full_path))
+
+
+class PathFilter:
+    """Tell which files and directories of a scanned directory are skipped: `OUTPUT_DIR`, the ones matching
+    `IGNORE_PATTERNS` setting and the files with the extensions no compiler is interested in.
+    """
+
+    def __init__(
+        self,
+        scanned_dir: str,
+        extensions: Optional[Collection[str]] = None,
+        ignore_patterns: Optional[Collection[str]] = None,
+    ) -> None:
+        """
+        :param scanned_dir: full path to the scanned directory
+        :param extensions: extensions (without the leading dot) of the files that aren't skipped, None for any
+        :param ignore_patterns: glob patterns of the skipped files and directories, `IGNORE_PATTERNS` by default
+        """
+        self.scanned_dir = normalize_full_path(scanned_dir)
+        self.extensions = None if extensions is None else frozenset(extensions)
+        self.ignore_patterns = settings.IGNORE_PATTERNS if ignore_patterns is None else list(ignore_patterns)
+        self.output_dir = normalize_full_path(os.path.join(settings.ROOT, settings.OUTPUT_DIR))
+
+    def is_ignored(self, full_path: str, path: Optional[str] = None) -> bool:
+        full_path = normalize_full_path(full_path)
+        if full_path == self.output_dir:
+            return True
+        if path is None:
+            path = os.path.relpath(full_path, self.scanned_dir).replace(os.sep, "/")
+            if path == ".":
+                return False
+        name = posixpath.basename(path)
+        return any(
+            fnmatch.fnmatchcase(name, pattern) or fnmatch.fnmatchcase(path, pattern) for pattern in self.ignore_patterns
+        )
+
+    def is_ignored_dir(self, full_path: str, path: Optional[str] = None) -> bool:
+        """Return True if the directory and everything in it is skipped. The parent directories aren't checked.
+
+        :param full_path: full path to a directory in the scanned directory
+        :param path: path to the directory relative to the scanned directory (in posix format), if it's known
+        """
+        return self.is_ignored(full_path, path)
+
+    def is_ignored_file(self, full_path: str, path: Optional[str] = None) -> bool:
+        """Return True if the file is skipped. The parent directories aren't checked.
+
+        :param full_path: full path to a file in the scanned directory
+        :param path: path to the file relative to the scanned directory (in posix format), if it's known
+        """
+        if self.extensions is not None and os.path.splitext(full_path)[1].lstrip(".") not in self.extensions:
+            return True
+        return self.is_ignored(full_path, path)
+
+    def is_ignored_path(self, full_path: str, is_directory: bool = False) -> bool:
+        """Return True if the file or directory, or one of its parent directories, is skipped.
+
+        :param full_path: full path to a file or directory in the scanned directory
+        :param is_directory: whether the path is a directory
+        """
+        if self.is_ignored_dir(full_path) if is_directory else self.is_ignored_file(full_path):
+            return True
+        parent_dir = os.path.dirname(normalize_full_path(full_path))
+        while parent_dir.startswith(self.scanned_dir + os.sep):
+            if self.is_ignored_dir(parent_dir):
+                return True
+            parent_dir = os.path.dirname(parent_dir)
+        return False
+
+
+def walk_files(scanned_dir: str, path_filter: PathFilter) -> Iterator[str]:
+    """Yield the files in the scanned directory that aren't skipped by the filter, the skipped directories aren't
+    entered. Symbolic links to directories aren't followed, same as in `os.walk`.
+
+    :param scanned_dir: full path to the scanned directory
+    :param path_filter: filter of the skipped files and directories
+    :returns: relative paths to the files (in posix format)
+    """
+    dirs = [(scanned_dir, "")]
+    while dirs:
+        full_dirname, dirname = dirs.pop()
+        try:
+            entries = os.scandir(full_dirname)
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                path = dirname + entry.name
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    if not entry.is_symlink() and not path_filter.is_ignored_dir(entry.path, path):
+                        dirs.append((entry.path, path + "/"))
+                elif not path_filter.is_ignored_file(entry.path, path):
+                    yield path
+
+
+def find_source_files(scanned_dirs: StrCollection) -> Iterator[Tuple[BaseCompiler, str]]:
+    """Yield the source files in the scanned directories along with their compilers. A file found in many directories
+    is yielded once, only the paths of the source files are kept in memory to tell that.
+
+    :param scanned_dirs: full paths to the scanned directories
+    :returns: pairs of compiler and relative path to a source file (in posix format)
+    """
+    extensions = registry.get_source_extensions()
+    found_paths: Set[str] = set()
+    for scanned_dir in scanned_dirs:
+        for path in walk_files(scanned_dir, PathFilter(scanned_dir, extensions)):
+            if path in found_paths:
+                continue
+            compiler = registry.find_compiler(path)
+            if compiler is not None:
+                found_paths.add(path)
+                yield compiler, path
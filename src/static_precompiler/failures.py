@@ -0,0 +1,104 @@
+import json
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from . import caching, exceptions, settings
+
+if TYPE_CHECKING:
+    from .compilers import BaseCompiler
+
+__all__ = (
+    "get_inputs_digest",
+    "check",
+    "record",
+    "forget",
+)
+
+
+def get_failure_cache_key(source_path: str) -> str:
+    return caching.get_cache_key(f"failure.{caching.get_hexdigest(source_path)}")
+
+
+def get_inputs_digest(compiler: "BaseCompiler", source_path: str) -> Optional[str]:
+    """Return the digest of the compiler options and the modification times of the source file and its dependencies,
+    or None if the source file can't be located. The dependencies are found in the current source code, not taken
+    from the last successful compilation, so a newly imported file is among them. The error of an import that can't
+    be located is included, so the digest changes once the imported file is added.
+
+    :param compiler: compiler of the source file
+    :param source_path: relative path to a source file
+    """
+    source_paths = [source_path]
+    import_error = None
+    if compiler.supports_dependencies:
+        try:
+            source_paths += compiler.find_dependencies(source_path)
+        except (exceptions.StaticCompilationError, ValueError, OSError) as e:
+            import_error = str(e)
+    try:
+        source_mtimes = compiler.get_source_mtimes(source_paths)
+    except (ValueError, OSError):
+        return None
+    return caching.get_hexdigest(json.dumps([compiler.get_options_digest(), source_paths, source_mtimes, import_error]))
+
+
+def get_backoff(attempts: int) -> float:
+    """Return the number of seconds to wait before compiling the file again after the given number of failures."""
+    return min(settings.FAILURE_BACKOFF * 2 ** (attempts - 1), settings.FAILURE_BACKOFF_MAX)
+
+
+def check(compiler: "BaseCompiler", source_path: str) -> Optional[Dict[str, Any]]:
+    """Raise the error of the previous compilation of the source file if it has failed with the same inputs and
+        the backoff hasn't passed yet. The inputs are checked only if there is a recorded failure.
+
+    :param compiler: compiler of the source file
+    :param source_path: relative path to a source file
+    :returns: the recorded failure, if there is one
+    :raises: StaticCompilationError
+    """
+    failure: Optional[Dict[str, Any]] = caching.get_cache().get(get_failure_cache_key(source_path))
+    if (
+        failure is not None
+        and time.time() < failure["retry_at"]
+        and failure["inputs"] == get_inputs_digest(compiler, source_path)
+    ):
+        raise exceptions.StaticCompilationError(failure["error"])
+    return failure
+
+
+def record(
+    compiler: "BaseCompiler",
+    source_path: str,
+    error: Exception,
+    previous_failure: Optional[Dict[str, Any]] = None,
+) -> None:
+    """Record the failed compilation of the source file, so it isn't compiled again until the inputs change or
+        the backoff passes. The backoff doubles with every failure with the same inputs.
+        Nothing is recorded if some of the inputs can't be located.
+
+    :param compiler: compiler of the source file
+    :param source_path: relative path to a source file
+    :param error: the compilation error
+    :param previous_failure: the failure returned by `check`
+    """
+    inputs_digest = get_inputs_digest(compiler, source_path)
+    if inputs_digest is None:
+        return
+    attempts = 1
+    if previous_failure is not None and previous_failure["inputs"] == inputs_digest:
+        attempts = previous_failure["attempts"] + 1
+    failure = {
+        "inputs": inputs_digest,
+        "error": str(error),
+        "attempts": attempts,
+        "retry_at": time.time() + get_backoff(attempts),
+    }
+    caching.get_cache().set(get_failure_cache_key(source_path), failure, settings.CACHE_TIMEOUT)
+
+
+def forget(source_path: str) -> None:
+    """Remove the recorded failure of the source file after it's compiled successfully.
+
+    :param source_path: relative path to a source file
+    """
+    caching.get_cache().delete(get_failure_cache_key(source_path))
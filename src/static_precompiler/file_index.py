@@ -0,0 +1,164 @@
+import contextlib
+import os
+import posixpath
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import django.core.exceptions
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.finders import BaseFinder
+from django.core.files import storage
+from django.utils._os import safe_join
+
+from . import settings, utils
+from .finders import StaticPrecompilerFinder
+
+# Index of the files located by static files finders, built once per process
+index: Optional["FileIndex"] = None
+index_lock = threading.Lock()
+
+
+class FileIndex:
+    """Files located by static files finders. Only the storages of `FileSystemFinder` and `AppDirectoriesFinder` can
+    be indexed, the index is authoritative for them: a file missing from it is looked up in their locations directly,
+    without the finders, and the miss is remembered for `MTIME_DELAY` seconds. Only the other finders are asked
+    for the files missing from the index.
+    """
+
+    def __init__(self) -> None:
+        # Full paths to static files by their relative paths (in posix format)
+        self.paths: Dict[str, str] = {}
+        # Prefixes and locations of the indexed storages, in the order of the finders
+        self.locations: List[Tuple[str, str]] = []
+        # Finders that can't be indexed
+        self.other_finders: List[BaseFinder] = []
+        # Expiration times of the misses by relative path
+        self.misses: Dict[str, float] = {}
+        self.lock = threading.Lock()
+
+    def add_finder(self, finder: BaseFinder) -> None:
+        if isinstance(finder, StaticPrecompilerFinder):
+            # The finder serves the compiled files only
+            return
+        if not isinstance(finder, (finders.FileSystemFinder, finders.AppDirectoriesFinder)) or not all(
+            isinstance(finder_storage, storage.FileSystemStorage) for finder_storage in finder.storages.values()
+        ):
+            self.other_finders.append(finder)
+            return
+        for finder_storage in finder.storages.values():
+            prefix = getattr(finder_storage, "prefix", None) or ""
+            location = finder_storage.location
+            self.locations.append((prefix, location))
+            for dirname, _dirnames, filenames in os.walk(location, followlinks=True):
+                relative_dirname = os.path.relpath(dirname, location).replace(os.sep, "/")
+                for filename in filenames:
+                    path = posixpath.normpath(posixpath.join(prefix, relative_dirname, filename))
+                    # The first finder wins, same as in `finders.find`
+                    self.paths.setdefault(path, os.path.join(dirname, filename))
+
+    def find_in_locations(self, path: str) -> Optional[str]:
+        for prefix, location in self.locations:
+            relative_path = path
+            if prefix:
+                if not path.startswith(prefix + "/"):
+                    continue
+                relative_path = path[len(prefix) + 1 :]
+            try:
+                full_path = safe_join(location, utils.normalize_path(relative_path))
+            except django.core.exceptions.SuspiciousFileOperation:
+                continue
+            if os.path.isfile(full_path):
+                return full_path
+        return None
+
+    def find_with_other_finders(self, path: str) -> Optional[str]:
+        norm_path = utils.normalize_path(path)
+        for finder in self.other_finders:
+            with contextlib.suppress(django.core.exceptions.SuspiciousOperation):
+                full_path = finder.find(norm_path)
+                if full_path:
+                    return full_path
+        return None
+
+    def find(self, path: str) -> Optional[str]:
+        """Return the full path to the given static file, or None if it can't be found.
+            The indexed files that don't exist anymore are looked up in the locations of the indexed storages again,
+            the same as the files missing from the index, e.g. the ones added after it's built.
+
+        :param path: normalized relative path to a static file (in posix format)
+        :returns: full path to the static file (OS-dependent)
+        """
+        full_path = self.paths.get(path)
+        if full_path is not None and os.path.exists(full_path):
+            return full_path
+
+        now = time.monotonic()
+        with self.lock:
+            miss_expires = self.misses.get(path)
+        if miss_expires is None or miss_expires <= now:
+            full_path = self.find_in_locations(path)
+            with self.lock:
+                if full_path is None:
+                    self.paths.pop(path, None)
+                    self.misses[path] = now + settings.MTIME_DELAY
+                else:
+                    self.paths[path] = full_path
+                    self.misses.pop(path, None)
+            if full_path is not None:
+                return full_path
+
+        return self.find_with_other_finders(path)
+
+
+def build_index() -> FileIndex:
+    """Build an index of the files that can be located by static files finders."""
+    file_index = FileIndex()
+    for finder in finders.get_finders():
+        file_index.add_finder(finder)
+    return file_index
+
+
+def get_index() -> FileIndex:
+    """Return the index of static files, build it on the first call."""
+    global index
+    if index is None:
+        with index_lock:
+            if index is None:
+                index = build_index()
+    return index
+
+
+def reset() -> None:
+    """Discard the index, it will be built again on the next lookup. The watcher resets the index when files are
+    added or removed, otherwise the added files are found once the misses expire.
+    """
+    global index
+    index = None
+
+
+def find(source_path: str) -> Optional[str]:
+    """Return the full path to the given static file, or None if it can't be found.
+        `STATIC_ROOT` is checked first, then the index of the files located by static files finders, see `FileIndex`.
+        The index is disabled when `MTIME_DELAY` is 0.
+
+    :param source_path: relative path to a static file
+    :returns: full path to the static file (OS-dependent)
+    """
+    norm_source_path = utils.normalize_path(source_path.lstrip("/"))
+
+    if settings.STATIC_ROOT:
+        full_path = os.path.join(settings.STATIC_ROOT, norm_source_path)
+        if os.path.exists(full_path):
+            return full_path
+
+    if not settings.MTIME_DELAY:
+        return find_with_finders(norm_source_path)
+
+    return get_index().find(posixpath.normpath(source_path.lstrip("/")))
+
+
+def find_with_finders(norm_source_path: str) -> Optional[str]:
+    with contextlib.suppress(django.core.exceptions.SuspiciousOperation):
+        return finders.find(norm_source_path)
+    return None
@@ -0,0 +1,149 @@
+import contextlib
+import os
+import time
+import uuid
+from typing import IO, Iterator, Optional
+
+import django.core.exceptions
+
+from . import caching, settings
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+__all__ = (
+    "Lock",
+    "FileLock",
+    "CacheLock",
+    "get_lock",
+    "acquire",
+)
+
+# Name of the directory in `OUTPUT_DIR` where `FileLock` keeps the lock files
+LOCKS_DIRNAME = ".locks"
+
+# Seconds between attempts to acquire a lock held by another process
+POLL_INTERVAL = 0.05
+
+# Seconds after which a lock held in the cache expires, in case the process holding it has died
+CACHE_LOCK_EXPIRE = 5 * 60
+
+
+class Lock:
+    """A lock shared between processes, identified by a name."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def try_acquire(self) -> bool:
+        """Acquire the lock if it's not held by anybody else.
+
+        :returns: whether the lock has been acquired
+        """
+        raise NotImplementedError
+
+    def release(self) -> None:
+        raise NotImplementedError
+
+    def acquire(self, timeout: float) -> bool:
+        """Acquire the lock, wait until it's released by another process for no more than `timeout` seconds.
+
+        :param timeout: seconds to wait
+        :returns: whether the lock has been acquired
+        """
+        deadline = time.monotonic() + timeout
+        while not self.try_acquire():
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(POLL_INTERVAL)
+        return True
+
+
+class FileLock(Lock):
+    """Lock a file in `STATIC_PRECOMPILER_OUTPUT_DIR`, works for the processes on the same host."""
+
+    def __init__(self, name: str) -> None:
+        super().__init__(name)
+        self.path = os.path.join(settings.ROOT, settings.OUTPUT_DIR, LOCKS_DIRNAME, caching.get_hexdigest(name))
+        self.file: Optional[IO[str]] = None
+
+    def try_acquire(self) -> bool:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        lock_file = open(self.path, "a+")  # noqa: SIM115 (kept open while the lock is held)
+        try:
+            if os.name == "nt":
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self.file = lock_file
+        return True
+
+    def release(self) -> None:
+        if self.file is None:
+            return
+        if os.name == "nt":
+            msvcrt.locking(self.file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+        self.file.close()
+        self.file = None
+
+
+class CacheLock(Lock):
+    """Add a key to the configured Django cache, works for the processes on all hosts sharing the cache."""
+
+    def __init__(self, name: str) -> None:
+        super().__init__(name)
+        # Unlike the other cache keys, the key must be the same on all hosts
+        self.key = f"static_precompiler.lock.{caching.get_hexdigest(name)}"
+        self.token = uuid.uuid4().hex
+
+    def try_acquire(self) -> bool:
+        return caching.get_cache().add(self.key, self.token, timeout=CACHE_LOCK_EXPIRE)
+
+    def release(self) -> None:
+        cache = caching.get_cache()
+        if cache.get(self.key) == self.token:
+            cache.delete(self.key)
+
+
+def get_lock(name: str) -> Optional[Lock]:
+    """Return a lock of the type set by `STATIC_PRECOMPILER_LOCK_BACKEND` setting, or None if locking is disabled.
+
+    :param name: name of the lock
+    """
+    if not settings.LOCK_BACKEND:
+        return None
+    if settings.LOCK_BACKEND == "file":
+        return FileLock(name)
+    if settings.LOCK_BACKEND == "cache":
+        return CacheLock(name)
+    raise django.core.exceptions.ImproperlyConfigured(
+        f'Unknown lock backend "{settings.LOCK_BACKEND}", the supported ones are "file" and "cache"'
+    )
+
+
+@contextlib.contextmanager
+def acquire(name: str, timeout: Optional[float] = None) -> Iterator[bool]:
+    """Hold the lock with the given name for the duration of the block.
+        Yield False if the lock is held by another process for longer than the timeout, the block must not touch
+        the shared resources then. Yield True if locking is disabled.
+
+    :param name: name of the lock
+    :param timeout: seconds to wait for the lock, `STATIC_PRECOMPILER_LOCK_TIMEOUT` by default
+    """
+    lock = get_lock(name)
+    if lock is None:
+        yield True
+        return
+    acquired = lock.acquire(settings.LOCK_TIMEOUT if timeout is None else timeout)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            lock.release()
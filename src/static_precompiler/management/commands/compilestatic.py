@@ -1,14 +1,26 @@
+import contextlib
 import os
 import sys
 from argparse import ArgumentParser
-from typing import Any, Iterable, List
+from typing import Any, List
 
 import django
 import django.contrib.staticfiles.finders
 import django.core.files.storage
 import django.core.management.base
 
-from ... import exceptions, registry, settings, utils
+from ... import (
+    build,
+    change_detectors,
+    compression,
+    dependency_graph,
+    discovery,
+    locks,
+    manifest,
+    registry,
+    settings,
+    utils,
+)
 from ...types import StrCollection
 
 
@@ -30,21 +42,22 @@ def get_scanned_dirs() -> List[str]:
     return sorted(dirs)
 
 
-def list_files(scanned_dirs: StrCollection) -> Iterable[str]:
-    for scanned_dir in scanned_dirs:
-        for dirname, _dirnames, filenames in os.walk(scanned_dir):
-            for filename in filenames:
-                path = os.path.join(dirname, filename)[len(scanned_dir) :]
-                path = path.lstrip(r"\/")
-                yield path
-
-
 def delete_stale_files(compiled_files: StrCollection) -> None:
     compiled_files = {
         os.path.join(settings.ROOT, utils.normalize_path(compiled_file)) for compiled_file in compiled_files
     }
+    # Files used by static_precompiler internally are not stale
+    compiled_files.add(os.path.join(settings.ROOT, settings.OUTPUT_DIR, change_detectors.HASHES_FILENAME))
+    compiled_files.add(manifest.get_manifest_path())
+    # Compressed copies of the compiled files
+    compiled_files.update(
+        [compiled_file + extension for compiled_file in list(compiled_files) for extension in compression.EXTENSIONS]
+    )
     actual_files = set()
-    for dirname, _dirnames, filenames in os.walk(os.path.join(settings.ROOT, settings.OUTPUT_DIR)):
+    output_dir = os.path.join(settings.ROOT, settings.OUTPUT_DIR)
+    for dirname, dirnames, filenames in os.walk(output_dir):
+        if dirname == output_dir and locks.LOCKS_DIRNAME in dirnames:
+            dirnames.remove(locks.LOCKS_DIRNAME)
         for filename in filenames:
             actual_files.add(os.path.join(dirname, filename))
     stale_files = actual_files - compiled_files
@@ -86,11 +99,22 @@ class Command(django.core.management.base.BaseCommand):
             default=True,
             help="Skip the initial scan of watched directories in --watch mode.",
         )
+        parser.add_argument(
+            "--jobs",
+            "-j",
+            type=int,
+            dest="jobs",
+            default=None,
+            help="Number of files to compile in parallel. Default: the number of CPUs.",
+        )
 
     def handle(self, *args: Any, **options: Any) -> None:
         if not options["watch"] and not options["initial_scan"]:
             sys.exit("--no-initial-scan option should be used with --watch.")
 
+        if options["jobs"] is not None and options["jobs"] < 1:
+            sys.exit("--jobs option should be a positive number.")
+
         scanned_dirs = get_scanned_dirs()
         verbosity = int(options["verbosity"])
         compilers = registry.get_compilers().values()
@@ -99,28 +123,31 @@ class Command(django.core.management.base.BaseCommand):
             for compiler in compilers:
                 compiler.supports_dependencies = False
 
-        if not options["watch"] or options["initial_scan"]:
-            # Scan the watched directories and compile everything
-            compiled_files = set()
-            for path in sorted(set(list_files(scanned_dirs))):
-                for compiler in compilers:
-                    if compiler.is_supported(path):
-                        break
-                else:
-                    continue
+        # The dependencies are loaded from the database once and saved after the files are compiled
+        dependencies = contextlib.nullcontext() if options["ignore_dependencies"] else dependency_graph.preload()
+
+        with dependencies:
+            if not options["watch"] or options["initial_scan"]:
+                # Scan the watched directories and compile everything
+                tasks = sorted(discovery.find_source_files(scanned_dirs), key=lambda task: task[1])
+
+                compiled_files = build.compile_paths(tasks, jobs=options["jobs"], verbosity=verbosity)
 
-                try:
-                    compiled_files.add(compiler.compile(path, from_management=True, verbosity=verbosity))
-                except (exceptions.StaticCompilationError, ValueError) as e:
-                    print(e)
+                manifest.write(
+                    {
+                        path: compiler.get_compiled_path(path)
+                        for compiler, path in tasks
+                        if compiler.get_output_path(path) in compiled_files
+                    }
+                )
 
-            if options["delete_stale_files"]:
-                delete_stale_files(list(compiled_files))
+                if options["delete_stale_files"]:
+                    delete_stale_files(list(compiled_files))
 
-        if options["watch"]:
-            from static_precompiler.watch import watch_dirs
+            if options["watch"]:
+                from static_precompiler.watch import watch_dirs
 
-            watch_dirs(scanned_dirs, verbosity)
+                watch_dirs(scanned_dirs, verbosity, jobs=options["jobs"])
 
 
 if django.VERSION < (3, 2):
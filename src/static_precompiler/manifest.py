@@ -0,0 +1,79 @@
+import json
+import os
+import threading
+from typing import Dict, Optional
+
+import django.core.exceptions
+
+from . import caching, settings, utils
+
+__all__ = (
+    "get_manifest_path",
+    "write",
+    "load",
+    "get_compiled_path",
+)
+
+# Name of the file in `OUTPUT_DIR` where `compilestatic` saves the compiled paths of the source files
+MANIFEST_FILENAME = "manifest.json"
+
+# Compiled paths by source path, loaded once per process
+compiled_paths: Optional[Dict[str, str]] = None
+compiled_paths_lock = threading.Lock()
+
+
+def get_manifest_path() -> str:
+    return os.path.join(settings.ROOT, settings.OUTPUT_DIR, MANIFEST_FILENAME)
+
+
+def write(entries: Dict[str, str]) -> None:
+    """Save the manifest of the compiled files along with the digests of their contents.
+        The compiled files that don't exist, e.g. the ones of the partials, are skipped.
+
+    :param entries: relative paths to the compiled files by relative paths to the source files
+    """
+    files = {}
+    for source_path, compiled_path in sorted(entries.items()):
+        try:
+            digest = caching.get_file_hexdigest(os.path.join(settings.ROOT, utils.normalize_path(compiled_path)))
+        except OSError:
+            continue
+        files[source_path] = {"path": compiled_path, "hash": digest}
+    manifest_path = get_manifest_path()
+    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+    utils.write_file(json.dumps({"files": files}, indent=2, sort_keys=True), manifest_path)
+
+
+def load() -> Dict[str, str]:
+    """Load the compiled paths from the manifest, on the first call only.
+
+    :returns: relative paths to the compiled files by relative paths to the source files
+    """
+    global compiled_paths
+    if compiled_paths is None:
+        with compiled_paths_lock:
+            if compiled_paths is None:
+                manifest_path = get_manifest_path()
+                try:
+                    with open(manifest_path, encoding="utf-8") as manifest_file:
+                        files = json.load(manifest_file)["files"]
+                except (OSError, ValueError, KeyError) as e:
+                    raise django.core.exceptions.ImproperlyConfigured(
+                        f'Can\'t load the manifest of compiled files from {manifest_path}: "{e}". '
+                        "Run compilestatic command to create it."
+                    ) from None
+                compiled_paths = {source_path: entry["path"] for source_path, entry in files.items()}
+    return compiled_paths
+
+
+def get_compiled_path(source_path: str) -> str:
+    """Return relative path to the compiled file from the manifest.
+        Raise ValueError if the source file isn't in the manifest.
+
+    :param source_path: relative path to a source file
+    :returns: relative path to the compiled file
+    """
+    try:
+        return load()[source_path]
+    except KeyError:
+        raise ValueError(f"'{source_path}' isn't listed in the manifest of compiled files") from None
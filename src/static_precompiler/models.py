@@ -1,5 +1,9 @@
+from typing import Any
+
 from django.db import models
 
+from . import caching
+
 
 class Dependency(models.Model):
     source = models.CharField(max_length=255, db_index=True)
@@ -8,5 +12,14 @@ class Dependency(models.Model):
     class Meta:
         unique_together = ("source", "depends_on")
 
+    def save(self, *args: Any, **kwargs: Any) -> None:
+        super().save(*args, **kwargs)
+        caching.invalidate_dependencies()
+
+    def delete(self, *args: Any, **kwargs: Any) -> Any:
+        result = super().delete(*args, **kwargs)
+        caching.invalidate_dependencies()
+        return result
+
     def __unicode__(self) -> str:
         return f"{self.source} depends on {self.depends_on}"
@@ -1,20 +1,94 @@
+import collections
+import functools
 import os
-from typing import Optional
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
 
 from . import caching, settings
 
+# Maximum number of entries in the per-process cache
+LOCAL_CACHE_SIZE = 4096
 
+# Per-process cache in front of the shared cache, {filename: (mtime, expiration time)}
+local_cache: "collections.OrderedDict[str, Tuple[float, float]]" = collections.OrderedDict()
+local_cache_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=LOCAL_CACHE_SIZE)
 def get_mtime_cachekey(filename: str) -> str:
     return caching.get_cache_key(f"mtime.{caching.get_hexdigest(filename)}")
 
 
 def get_mtime(filename: str) -> float:
-    if settings.MTIME_DELAY:
-        key = get_mtime_cachekey(filename)
+    return get_mtimes([filename])[0]
+
+
+def get_mtimes(filenames: List[str]) -> List[float]:
+    """Get the modification times of the given files.
+        The modification times are cached for `MTIME_DELAY` seconds, first in the process memory, then in the shared
+        cache. The files missing from the process memory are fetched from the shared cache with a single request and
+        kept in the process memory only until they expire in the shared cache.
+
+    :param filenames: full paths to the files
+    :returns: modification times, in the same order as the files
+    """
+    if not settings.MTIME_DELAY:
+        return [os.path.getmtime(filename) for filename in filenames]
+
+    mtimes: Dict[str, float] = {}
+    expirations: Dict[str, float] = {}
+    now = time.monotonic()
+
+    with local_cache_lock:
+        for filename in filenames:
+            cached = local_cache.get(filename)
+            if cached is not None and cached[1] > now:
+                local_cache.move_to_end(filename)
+                mtimes[filename] = cached[0]
+
+    keys = {get_mtime_cachekey(filename): filename for filename in filenames if filename not in mtimes}
+
+    if keys:
         cache = caching.get_cache()
-        mtime: Optional[float] = cache.get(key)
-        if mtime is None:
-            mtime = os.path.getmtime(filename)
-            cache.set(key, mtime, settings.MTIME_DELAY)
-        return mtime
-    return os.path.getmtime(filename)
+        cached_mtimes = cache.get_many(list(keys))
+        missing_mtimes = {}
+        wallclock_now = time.time()
+        for key, filename in keys.items():
+            # The shared cache stores the modification time with its expiration time, so that the process memory
+            # doesn't keep it for longer than the shared cache does
+            cached: Optional[Tuple[float, float]] = cached_mtimes.get(key)
+            if cached is None:
+                cached = (os.path.getmtime(filename), wallclock_now + settings.MTIME_DELAY)
+                missing_mtimes[key] = cached
+            mtimes[filename] = cached[0]
+            expirations[filename] = now + min(max(cached[1] - wallclock_now, 0), settings.MTIME_DELAY)
+        if missing_mtimes:
+            cache.set_many(missing_mtimes, settings.MTIME_DELAY)
+
+        with local_cache_lock:
+            for filename in keys.values():
+                local_cache[filename] = (mtimes[filename], expirations[filename])
+                local_cache.move_to_end(filename)
+            while len(local_cache) > LOCAL_CACHE_SIZE:
+                local_cache.popitem(last=False)
+
+    return [mtimes[filename] for filename in filenames]
+
+
+def forget(filenames: List[str]) -> None:
+    """Remove the cached modification times of the given files, e.g. when they are known to be modified.
+
+    :param filenames: full paths to the files
+    """
+    with local_cache_lock:
+        for filename in filenames:
+            local_cache.pop(filename, None)
+    if settings.MTIME_DELAY:
+        caching.get_cache().delete_many([get_mtime_cachekey(filename) for filename in filenames])
+
+
+def clear_local_cache() -> None:
+    """Clear the per-process cache of modification times."""
+    with local_cache_lock:
+        local_cache.clear()
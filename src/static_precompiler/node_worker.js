@@ -0,0 +1,188 @@
+"use strict";
+// Resident worker for the Node.js based compilers, see `static_precompiler/node_worker.py`.
+//
+// Requests and responses are JSON objects, one per line:
+//   -> {"id": 1, "method": "less", "params": {"source": "...", "filename": "..."}}
+//   <- {"id": 1, "result": {"code": "...", "map": "..."}}
+//   <- {"id": 1, "error": "..."}
+// The requests are handled one at a time.
+
+const fs = require("fs");
+const path = require("path");
+const readline = require("readline");
+const util = require("util");
+
+const respond = process.stdout.write.bind(process.stdout);
+
+// Anything the compilers print must not get mixed with the responses
+console.log = console.info = console.debug = (...args) => process.stderr.write(`${util.format(...args)}\n`);
+
+function load(name) {
+  // The packages installed in the project take precedence over the global ones
+  return require(require.resolve(name, { paths: [process.cwd(), ...(require.resolve.paths(name) || [])] }));
+}
+
+function linkSourceMap(code, sourceMapUrl, css) {
+  if (!sourceMapUrl) {
+    return code;
+  }
+  return css ? `${code}\n/*# sourceMappingURL=${sourceMapUrl} */\n` : `${code}\n//# sourceMappingURL=${sourceMapUrl}\n`;
+}
+
+const methods = {
+  ping() {
+    return "pong";
+  },
+
+  async babel({ source, filename, plugins, presets, sourceMapUrl }) {
+    const babel = load("@babel/core");
+    const result = await babel.transformAsync(source, {
+      filename,
+      plugins: plugins || undefined,
+      presets: presets || undefined,
+      sourceMaps: Boolean(sourceMapUrl),
+    });
+    return {
+      code: linkSourceMap(result.code, sourceMapUrl, false),
+      map: result.map ? JSON.stringify(result.map) : null,
+    };
+  },
+
+  coffeescript({ source, filename, sourceMapUrl }) {
+    const coffee = load("coffeescript");
+    if (!sourceMapUrl) {
+      return { code: coffee.compile(source, { filename }), map: null };
+    }
+    const result = coffee.compile(source, {
+      filename,
+      sourceMap: true,
+      sourceFiles: [path.basename(filename)],
+      generatedFile: path.basename(sourceMapUrl, ".map"),
+    });
+    return { code: linkSourceMap(result.js, sourceMapUrl, false), map: result.v3SourceMap };
+  },
+
+  livescript({ source, filename, sourceMapUrl }) {
+    const livescript = load("livescript");
+    if (!sourceMapUrl) {
+      return { code: livescript.compile(source, { filename }), map: null };
+    }
+    const result = livescript.compile(source, {
+      filename,
+      map: "linked",
+      outputFilename: path.basename(sourceMapUrl, ".map"),
+    });
+    return { code: linkSourceMap(result.code, sourceMapUrl, false), map: result.map.toString() };
+  },
+
+  async less({ source, filename, paths, cleanCss, globalVars, sourceMapUrl }) {
+    const less = load("less");
+    const options = { filename, paths: paths || [], globalVars: globalVars || undefined, plugins: [] };
+    if (cleanCss) {
+      const CleanCSS = load("less-plugin-clean-css");
+      options.plugins.push(new CleanCSS());
+    }
+    if (sourceMapUrl) {
+      options.sourceMap = { sourceMapURL: sourceMapUrl };
+    }
+    const output = await less.render(source, options);
+    return { code: output.css, map: output.map || null };
+  },
+
+  stylus({ source, filename, paths, sourceMapUrl }) {
+    const stylus = load("stylus");
+    const style = stylus(source).set("filename", filename || "stdin");
+    if (paths) {
+      style.set("paths", paths);
+    }
+    if (sourceMapUrl) {
+      style.set("sourcemap", { comment: false });
+    }
+    return new Promise((resolve, reject) => {
+      style.render((error, css) => {
+        if (error) {
+          reject(error);
+          return;
+        }
+        resolve({
+          code: linkSourceMap(css, sourceMapUrl, true),
+          map: style.sourcemap ? JSON.stringify(style.sourcemap) : null,
+        });
+      });
+    });
+  },
+
+  handlebars({ source, filename, extension, known, namespace, simple, sourceMapUrl }) {
+    // Run the same code as `handlebars` command line tool, capturing the output it prints
+    const precompiler = load("handlebars/dist/cjs/precompiler");
+    const options = {
+      extension: extension || "handlebars",
+      known: known || [],
+      namespace: namespace || "Handlebars.templates",
+      simple: Boolean(simple),
+      data: true,
+      map: sourceMapUrl || undefined,
+    };
+    if (filename) {
+      options.files = [filename];
+    } else {
+      options.string = source;
+    }
+    return new Promise((resolve, reject) => {
+      precompiler.loadTemplates(options, (error, loadedOptions) => {
+        if (error) {
+          reject(error);
+          return;
+        }
+        const output = [];
+        let map = null;
+        const log = console.log;
+        const writeFileSync = fs.writeFileSync;
+        console.log = (...args) => output.push(util.format(...args));
+        // The precompiler writes the sourcemap to the path it refers to, capture it instead, so it's returned along
+        // with the code
+        fs.writeFileSync = (path, data, ...args) => {
+          if (sourceMapUrl && path === sourceMapUrl) {
+            map = String(data);
+            return undefined;
+          }
+          return writeFileSync(path, data, ...args);
+        };
+        try {
+          precompiler.cli(loadedOptions);
+        } catch (e) {
+          reject(e);
+          return;
+        } finally {
+          console.log = log;
+          fs.writeFileSync = writeFileSync;
+        }
+        resolve({ code: `${output.join("\n")}\n`, map });
+      });
+    });
+  },
+};
+
+async function handle(line) {
+  let request;
+  try {
+    request = JSON.parse(line);
+  } catch (e) {
+    return { id: null, error: `Invalid request: ${e.message}` };
+  }
+  const method = Object.prototype.hasOwnProperty.call(methods, request.method) ? methods[request.method] : null;
+  if (method === null) {
+    return { id: request.id, error: `Unknown method: ${request.method}` };
+  }
+  try {
+    return { id: request.id, result: await method(request.params || {}) };
+  } catch (e) {
+    return { id: request.id, error: e && e.message ? String(e.message) : String(e) };
+  }
+}
+
+let queue = Promise.resolve();
+
+readline.createInterface({ input: process.stdin, terminal: false }).on("line", (line) => {
+  queue = queue.then(async () => respond(`${JSON.stringify(await handle(line))}\n`));
+});
@@ -0,0 +1,198 @@
+import atexit
+import contextlib
+import json
+import logging
+import os
+import queue
+import subprocess
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from . import exceptions, settings
+
+logger = logging.getLogger("static_precompiler")
+
+__all__ = (
+    "NodeWorker",
+    "NodeWorkerPool",
+    "get_pool",
+)
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(__file__), "node_worker.js")
+
+# Idle workers are pinged before they are reused after this many seconds
+HEALTH_CHECK_INTERVAL = 30
+HEALTH_CHECK_TIMEOUT = 5
+
+pool: Optional["NodeWorkerPool"] = None
+pool_lock = threading.Lock()
+
+
+class WorkerError(Exception):
+    """The worker process has crashed or stopped responding."""
+
+
+class NodeWorker:
+    """A resident Node.js process that compiles the sources sent to it over stdin, see `node_worker.js`."""
+
+    def __init__(self, executable: str) -> None:
+        self.process = subprocess.Popen(
+            [executable, WORKER_SCRIPT],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            encoding="utf-8",
+        )
+        self.jobs = 0
+        self.last_used = time.monotonic()
+        self.request_id = 0
+        self.responses: "queue.Queue[Optional[str]]" = queue.Queue()
+        # Read the responses in a separate thread, so a request can time out on every platform
+        threading.Thread(target=self.read_responses, daemon=True).start()
+
+    def read_responses(self) -> None:
+        assert self.process.stdout is not None
+        for line in self.process.stdout:
+            self.responses.put(line)
+        self.responses.put(None)
+
+    def is_alive(self) -> bool:
+        return self.process.poll() is None
+
+    def request(self, method: str, params: Dict[str, Any], timeout: float) -> Any:
+        """Send a request to the worker and wait for the response.
+            Raise StaticCompilationError if the compilation fails, WorkerError if the worker doesn't respond.
+
+        :param method: name of the method, see `node_worker.js`
+        :param params: method parameters
+        :param timeout: seconds to wait for the response
+        :returns: the result returned by the method
+        """
+        assert self.process.stdin is not None
+        self.request_id += 1
+        try:
+            self.process.stdin.write(json.dumps({"id": self.request_id, "method": method, "params": params}) + "\n")
+            self.process.stdin.flush()
+        except OSError as e:
+            raise WorkerError(f"Node worker has exited: {e}") from None
+
+        try:
+            line = self.responses.get(timeout=timeout)
+        except queue.Empty:
+            raise WorkerError(f"Node worker didn't respond in {timeout} seconds") from None
+        if line is None:
+            raise WorkerError(f"Node worker has exited with code {self.process.wait()}")
+
+        response = json.loads(line)
+        if response.get("id") != self.request_id:
+            raise WorkerError(f"Unexpected response from Node worker: {line}")
+        if "error" in response:
+            raise exceptions.StaticCompilationError(response["error"])
+        return response["result"]
+
+    def ping(self) -> bool:
+        try:
+            return self.request("ping", {}, HEALTH_CHECK_TIMEOUT) == "pong"
+        except WorkerError:
+            return False
+
+    def close(self) -> None:
+        if self.process.stdin is not None:
+            with contextlib.suppress(OSError):
+                self.process.stdin.close()
+        try:
+            self.process.wait(timeout=HEALTH_CHECK_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
+class NodeWorkerPool:
+    """A pool of Node.js workers. The workers are started on demand, replaced when they crash or stop responding and
+    recycled after `max_jobs` compilations.
+    """
+
+    def __init__(self, executable: str, size: int, max_jobs: int, timeout: float) -> None:
+        self.executable = executable
+        self.max_jobs = max_jobs
+        self.timeout = timeout
+        self.idle: List[NodeWorker] = []
+        self.lock = threading.Lock()
+        self.semaphore = threading.BoundedSemaphore(size)
+
+    def run(self, method: str, params: Dict[str, Any]) -> Any:
+        """Run a method in one of the workers.
+            May raise a StaticCompilationError if something goes wrong with compilation.
+
+        :param method: name of the method, see `node_worker.js`
+        :param params: method parameters
+        :returns: the result returned by the method
+        """
+        with self.semaphore:
+            worker = self.acquire()
+            try:
+                result = worker.request(method, params, self.timeout)
+            except WorkerError as e:
+                worker.process.kill()
+                worker.close()
+                raise exceptions.StaticCompilationError(str(e)) from None
+            except exceptions.StaticCompilationError:
+                self.release(worker)
+                raise
+            self.release(worker)
+            return result
+
+    def acquire(self) -> NodeWorker:
+        with self.lock:
+            worker = self.idle.pop() if self.idle else None
+        if worker is not None and not self.is_healthy(worker):
+            logger.warning("Restarting unresponsive Node worker")
+            worker.process.kill()
+            worker.close()
+            worker = None
+        if worker is None:
+            try:
+                worker = NodeWorker(self.executable)
+            except OSError as e:
+                raise exceptions.StaticCompilationError(f"Can't start Node worker: {e}") from None
+        return worker
+
+    # noinspection PyMethodMayBeStatic
+    def is_healthy(self, worker: NodeWorker) -> bool:
+        if not worker.is_alive():
+            return False
+        if time.monotonic() - worker.last_used > HEALTH_CHECK_INTERVAL:
+            return worker.ping()
+        return True
+
+    def release(self, worker: NodeWorker) -> None:
+        worker.jobs += 1
+        worker.last_used = time.monotonic()
+        if worker.jobs >= self.max_jobs or not worker.is_alive():
+            worker.close()
+            return
+        with self.lock:
+            self.idle.append(worker)
+
+    def close(self) -> None:
+        """Stop all idle workers."""
+        with self.lock:
+            workers, self.idle = self.idle, []
+        for worker in workers:
+            worker.close()
+
+
+def get_pool() -> NodeWorkerPool:
+    """Return the pool of Node.js workers shared by all compilers, start it on the first call."""
+    global pool
+    if pool is None:
+        with pool_lock:
+            if pool is None:
+                pool = NodeWorkerPool(
+                    settings.NODE_EXECUTABLE,
+                    settings.NODE_WORKERS,
+                    settings.NODE_WORKER_MAX_JOBS,
+                    settings.NODE_WORKER_TIMEOUT,
+                )
+                atexit.register(pool.close)
+    return pool
@@ -1,6 +1,7 @@
 import importlib
+import os
 import warnings
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Set, Tuple
 
 import django.apps
 import django.core.exceptions
@@ -10,14 +11,68 @@ from .compilers import BaseCompiler
 
 registry: Optional[Dict[str, BaseCompiler]] = None
 
+# Compilers by the extension of the source files, built for the compilers returned by `get_compilers`
+extension_index: Optional["ExtensionIndex"] = None
+
+
+class ExtensionIndex:
+    """Look up the compiler for a source file by its extension. The compilers that don't match the source files by
+    extension (see `BaseCompiler.matches_by_extension`) can't be indexed, they are checked one by one, keeping
+    the order of `STATIC_PRECOMPILER_COMPILERS` setting.
+    """
+
+    def __init__(self, compilers: Dict[str, BaseCompiler]) -> None:
+        self.compilers = compilers
+        # Compilers along with their positions in the registry
+        self.by_extension: Dict[str, Tuple[int, BaseCompiler]] = {}
+        self.other_compilers: List[Tuple[int, BaseCompiler]] = []
+        for position, compiler in enumerate(compilers.values()):
+            if not compiler.matches_by_extension:
+                self.other_compilers.append((position, compiler))
+                continue
+            for extension in compiler.get_input_extensions():
+                indexed = self.by_extension.setdefault(extension, (position, compiler))
+                if indexed[1] is not compiler:
+                    warnings.warn(
+                        f'Both compilers {indexed[1]} and {compiler} support ".{extension}" files, '
+                        f"{indexed[1]} is used.",
+                        stacklevel=2,
+                    )
+
+    def get_extensions(self) -> Optional[Set[str]]:
+        """Return the extensions of the supported source files, or None if some compilers don't tell the source files
+        by extension.
+        """
+        if self.other_compilers:
+            return None
+        return set(self.by_extension)
+
+    def find(self, path: str) -> Optional[BaseCompiler]:
+        indexed = self.by_extension.get(os.path.splitext(path)[1].lstrip("."))
+        for position, compiler in self.other_compilers:
+            if indexed is not None and position > indexed[0]:
+                break
+            if compiler.is_supported(path):
+                return compiler
+        return indexed[1] if indexed is not None else None
+
 
 def get_compilers() -> Dict[str, BaseCompiler]:
-    global registry
+    global registry, extension_index
     if registry is None:
         registry = build_compilers()
+        extension_index = ExtensionIndex(registry)
     return registry
 
 
+def get_extension_index() -> ExtensionIndex:
+    global extension_index
+    compilers = get_compilers()
+    if extension_index is None or extension_index.compilers is not compilers:
+        extension_index = ExtensionIndex(compilers)
+    return extension_index
+
+
 def build_compilers() -> Dict[str, BaseCompiler]:
     # noinspection PyShadowingNames
     compilers: Dict[str, BaseCompiler] = {}
@@ -67,9 +122,24 @@ def get_compiler_by_name(name: str) -> BaseCompiler:
         raise exceptions.CompilerNotFound(f"There is no compiler with name '{name}'.") from None
 
 
+def find_compiler(path: str) -> Optional[BaseCompiler]:
+    """Return the compiler that supports the given source file, or None if there is no such compiler.
+
+    :param path: relative path to a source file
+    """
+    return get_extension_index().find(path)
+
+
+def get_source_extensions() -> Optional[Set[str]]:
+    """Return the extensions (without the leading dot) of the source files supported by the compilers, or None if
+    some compilers don't tell the source files by extension.
+    """
+    return get_extension_index().get_extensions()
+
+
 def get_compiler_by_path(path: str) -> BaseCompiler:
-    for compiler in get_compilers().values():
-        if compiler.is_supported(path):
-            return compiler
+    compiler = find_compiler(path)
+    if compiler is not None:
+        return compiler
 
     raise exceptions.UnsupportedFile(f"The source file '{path}' is not supported by any of available compilers.")
@@ -1,4 +1,5 @@
 import os
+from typing import Any, Dict, List, Optional
 
 import django.core.exceptions
 from django.conf import settings
@@ -35,6 +36,10 @@ if not ROOT:
 
 OUTPUT_DIR = getattr(settings, "STATIC_PRECOMPILER_OUTPUT_DIR", "COMPILED")
 
+# Glob patterns of the files and directories skipped by `compilestatic` and its watch mode, matched against the names
+# and the paths relative to the scanned directories, e.g. ["node_modules", ".*"]. `OUTPUT_DIR` is always skipped
+IGNORE_PATTERNS: List[str] = list(getattr(settings, "STATIC_PRECOMPILER_IGNORE_PATTERNS", []))
+
 # Use cache for inline compilation
 USE_CACHE = getattr(settings, "STATIC_PRECOMPILER_USE_CACHE", True)
 
@@ -48,3 +53,49 @@ PREPEND_STATIC_URL = getattr(settings, "STATIC_PRECOMPILER_PREPEND_STATIC_URL",
 
 DISABLE_AUTO_COMPILE = getattr(settings, "STATIC_PRECOMPILER_DISABLE_AUTO_COMPILE", False)
 FINDER_LIST_FILES = getattr(settings, "STATIC_PRECOMPILER_FINDER_LIST_FILES", False)
+
+# Name the served compiled files with the digest of their content, e.g. "styles.3f9a1c2b4d5e.css"
+HASHED_FILENAMES: bool = getattr(settings, "STATIC_PRECOMPILER_HASHED_FILENAMES", False)
+
+# Write gzip (and brotli, if `brotli` package is installed) compressed copies next to the compiled files
+PRECOMPRESS: bool = getattr(settings, "STATIC_PRECOMPILER_PRECOMPRESS", False)
+
+# Look up the compiled files in the manifest saved by `compilestatic` instead of compiling them on request
+USE_MANIFEST: bool = getattr(settings, "STATIC_PRECOMPILER_USE_MANIFEST", False)
+
+# How to tell whether a source file has changed since it was compiled
+CHANGE_DETECTOR = getattr(
+    settings, "STATIC_PRECOMPILER_CHANGE_DETECTOR", "static_precompiler.change_detectors.MtimeChangeDetector"
+)
+
+# Directory where the compiled files are cached by the digest of their sources, it can be shared between hosts
+BUILD_CACHE_DIR: Optional[str] = getattr(settings, "STATIC_PRECOMPILER_BUILD_CACHE_DIR", None)
+
+# Storage class (dotted path) used for the build cache instead of `BUILD_CACHE_DIR`, and its keyword arguments
+BUILD_CACHE_STORAGE: Optional[str] = getattr(settings, "STATIC_PRECOMPILER_BUILD_CACHE_STORAGE", None)
+BUILD_CACHE_STORAGE_OPTIONS: Dict[str, Any] = getattr(settings, "STATIC_PRECOMPILER_BUILD_CACHE_STORAGE_OPTIONS", {})
+
+# Node.js executable used to run the resident workers of the compilers with `use_worker` option enabled
+NODE_EXECUTABLE: str = getattr(settings, "STATIC_PRECOMPILER_NODE_EXECUTABLE", "node")
+
+# Maximum number of Node.js workers running at the same time
+NODE_WORKERS: int = getattr(settings, "STATIC_PRECOMPILER_NODE_WORKERS", os.cpu_count() or 1)
+
+# Number of compilations after which a Node.js worker is restarted
+NODE_WORKER_MAX_JOBS: int = getattr(settings, "STATIC_PRECOMPILER_NODE_WORKER_MAX_JOBS", 500)
+
+# Seconds to wait for a Node.js worker to compile a file before it's considered crashed
+NODE_WORKER_TIMEOUT: float = getattr(settings, "STATIC_PRECOMPILER_NODE_WORKER_TIMEOUT", 60)
+
+# How to make sure a file is compiled by one process at a time on request: "file" locks a file in `OUTPUT_DIR`,
+# "cache" adds a key to the Django cache shared between hosts, None disables locking
+LOCK_BACKEND: Optional[str] = getattr(settings, "STATIC_PRECOMPILER_LOCK_BACKEND", "file")
+
+# Seconds to wait for another process to compile the file if there is no previously compiled file to use
+LOCK_TIMEOUT: float = getattr(settings, "STATIC_PRECOMPILER_LOCK_TIMEOUT", 10)
+
+# Seconds the error of a failed compilation is raised on request without running the compiler again, as long as
+# the source file and its dependencies don't change. Doubled after every failed retry, up to `FAILURE_BACKOFF_MAX`.
+# 0 disables caching the failures
+FAILURE_BACKOFF: float = getattr(settings, "STATIC_PRECOMPILER_FAILURE_BACKOFF", 1)
+FAILURE_BACKOFF_MAX: float = getattr(settings, "STATIC_PRECOMPILER_FAILURE_BACKOFF_MAX", 60)
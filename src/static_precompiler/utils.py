@@ -1,7 +1,9 @@
+import contextlib
 import json
 import os
 import posixpath
 import subprocess
+import threading
 from typing import Any, Dict, List, Optional, Tuple
 
 from django.utils import encoding
@@ -22,14 +24,59 @@ def read_file(path: str) -> str:
         return file_object.read()
 
 
-def write_file(content: str, path: str) -> None:
-    """Write text content to a file."""
+def write_file(content: str, path: str) -> bool:
+    """Write text content to a file, see `write_binary_file`.
+
+    :returns: whether the file has been written
+    """
 
     # Convert to unicode
     content = encoding.force_str(content)
 
-    with open(path, "w+", encoding="utf-8") as file_object:
-        file_object.write(content)
+    return write_binary_file(content.encode("utf-8"), path)
+
+
+def write_binary_file(content: bytes, path: str) -> bool:
+    """Write content to a file, unless the file already has the same content, so its modification time is kept.
+    The content is written to a temporary file first, which then replaces the file, so the readers never see
+    a partially written file.
+
+    :returns: whether the file has been written
+    """
+    if has_content(path, content):
+        return False
+
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temp_path, "wb") as file_object:
+            file_object.write(content)
+        os.replace(temp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(temp_path)
+        raise
+    return True
+
+
+def has_content(path: str, content: bytes) -> bool:
+    """Return True iff the file exists and has the given content. The file is read only if the sizes match."""
+    try:
+        if os.stat(path).st_size != len(content):
+            return False
+        with open(path, "rb") as file_object:
+            return file_object.read() == content
+    except OSError:
+        return False
+
+
+def get_mtime_ns(path: str) -> Optional[int]:
+    """Return the modification time of a file in nanoseconds, or None if the file doesn't exist.
+    Unlike `mtime.get_mtime` it isn't cached.
+    """
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
 
 
 def normalize_whitespace(text: str) -> str:
@@ -64,19 +111,29 @@ def run_command(args: List[str], input: Optional[str] = None, cwd: Optional[str]
 
 
 def compile_static(path: str) -> str:
+    if settings.USE_MANIFEST:
+        from . import manifest
+
+        return manifest.get_compiled_path(path)
+
     from . import registry
 
     return registry.get_compiler_by_path(path).compile(path)
 
 
 def compile_static_lazy(path: str) -> str:
+    if settings.USE_MANIFEST:
+        from . import manifest
+
+        return manifest.get_compiled_path(path)
+
     from . import registry
 
     return registry.get_compiler_by_path(path).compile_lazy(path)
 
 
-def fix_sourcemap(sourcemap_full_path: str, source_path: str, compiled_full_path: str) -> None:
-    sourcemap = json.loads(read_file(sourcemap_full_path))
+def fix_sourcemap_content(content: str, source_path: str, compiled_full_path: str) -> str:
+    sourcemap = json.loads(content)
 
     # Stylus, unlike SASS, can't add correct relative paths in source map when the compiled file
     # is not in the same dir as the source file. We fix it here.
@@ -84,4 +141,10 @@ def fix_sourcemap(sourcemap_full_path: str, source_path: str, compiled_full_path
     sourcemap["sources"] = [os.path.basename(source) for source in sourcemap["sources"]]
     sourcemap["file"] = posixpath.basename(os.path.basename(compiled_full_path))
 
-    write_file(json.dumps(sourcemap), sourcemap_full_path)
+    return json.dumps(sourcemap)
+
+
+def fix_sourcemap(sourcemap_full_path: str, source_path: str, compiled_full_path: str) -> None:
+    write_file(
+        fix_sourcemap_content(read_file(sourcemap_full_path), source_path, compiled_full_path), sourcemap_full_path
+    )
@@ -1,60 +1,287 @@
+import contextlib
+import os
+import threading
 import time
-from typing import Any, Collection, Iterable
+from typing import Any, ContextManager, Dict, Iterable, List, Optional, Set, Tuple
 
 from watchdog import events, observers
 
-from . import exceptions, registry
+from . import build, dependency_graph, discovery, file_index, mtime, registry
 from .compilers import BaseCompiler
 
+# Seconds without changes after which the changed files are compiled, editors make several changes per save
+DEBOUNCE_DELAY = 0.3
+
+# Seconds between the checks for the changed files
+POLL_INTERVAL = 0.1
+
+
+class ChangeQueue:
+    """Collect the changed source files and hand them over in a single batch once they stop changing."""
+
+    def __init__(self, delay: float = DEBOUNCE_DELAY) -> None:
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.paths: Set[str] = set()
+        self.last_change = 0.0
+
+    def add(self, path: str) -> None:
+        with self.lock:
+            self.paths.add(path)
+            self.last_change = time.monotonic()
+
+    def pop(self) -> List[str]:
+        """Return the changed files, if none of them has changed for `delay` seconds, and empty the queue.
+
+        :returns: relative paths to the changed source files
+        """
+        with self.lock:
+            if not self.paths or time.monotonic() - self.last_change < self.delay:
+                return []
+            paths, self.paths = self.paths, set()
+        return sorted(paths)
+
+
+def get_watched_extensions() -> Optional[Set[str]]:
+    """Return the extensions of the source files and the files they depend on, or None if one of the compilers
+    doesn't tell the source files by extension.
+    """
+    extensions: Set[str] = set()
+    for compiler in registry.get_compilers().values():
+        if not compiler.matches_by_extension:
+            return None
+        extensions.update(compiler.get_input_extensions())
+        extensions.update(compiler.get_dependency_extensions())
+    return extensions
+
+
+def get_watches(full_path: str, path_filter: discovery.PathFilter) -> List[Tuple[str, bool]]:
+    """Get the directories to watch. A directory is watched recursively unless some of its subdirectories are
+    skipped, then it's watched on its own and its subdirectories are checked one by one.
+
+    :param full_path: full path to a directory
+    :param path_filter: filter of the skipped directories
+    :returns: full paths to the watched directories along with whether they are watched recursively
+    """
+    try:
+        entries = list(os.scandir(full_path))
+    except OSError:
+        return []
+    recursive = True
+    watches = []
+    for entry in entries:
+        if not entry.is_dir(follow_symlinks=False):
+            continue
+        if path_filter.is_ignored_dir(entry.path):
+            recursive = False
+            continue
+        entry_watches = get_watches(entry.path, path_filter)
+        if entry_watches != [(entry.path, True)]:
+            recursive = False
+        watches.extend(entry_watches)
+    if recursive:
+        return [(full_path, True)]
+    return [(full_path, False), *watches]
+
 
 class EventHandler(events.FileSystemEventHandler):
     # noinspection PyShadowingNames
-    def __init__(self, scanned_dir: str, verbosity: int, compilers: Collection[BaseCompiler]) -> None:
+    def __init__(
+        self,
+        scanned_dir: str,
+        queue: ChangeQueue,
+        path_filter: Optional[discovery.PathFilter] = None,
+        observer: Optional[Any] = None,
+    ) -> None:
         self.scanned_dir = scanned_dir
-        self.verbosity = verbosity
-        self.compilers = compilers
+        self.queue = queue
+        self.path_filter = path_filter
+        self.observer = observer
+        # The directories watched without their subdirectories, see `get_watches`
+        self.watches: Dict[str, Any] = {}
         super().__init__()
 
+    def get_path(self, full_path: str) -> str:
+        return full_path[len(self.scanned_dir) :].lstrip(r"\/")
+
+    def is_ignored(self, full_path: str, is_directory: bool) -> bool:
+        return self.path_filter is not None and self.path_filter.is_ignored_path(full_path, is_directory)
+
+    def schedule(self, full_path: str) -> None:
+        """Watch the directory and its subdirectories, except for the skipped ones.
+
+        :param full_path: full path to a directory
+        """
+        assert self.observer is not None and self.path_filter is not None
+        for path, recursive in get_watches(os.path.normpath(full_path), self.path_filter):
+            watch = self.observer.schedule(self, path=path, recursive=recursive)
+            if not recursive:
+                self.watches[path] = watch
+
+    def unschedule(self, full_path: str) -> None:
+        """Stop watching the removed directory and its subdirectories watched on their own.
+
+        :param full_path: full path to a directory
+        """
+        assert self.observer is not None
+        for path in list(self.watches):
+            if path == full_path or path.startswith(full_path + os.sep):
+                self.observer.unschedule(self.watches.pop(path))
+
     def on_any_event(self, e: Any) -> None:
-        if e.is_directory or e.event_type not in ("created", "modified"):
+        src_ignored = self.is_ignored(e.src_path, e.is_directory)
+        dest_ignored = e.event_type != "moved" or self.is_ignored(e.dest_path, e.is_directory)
+        if src_ignored and dest_ignored:
+            return
+        if e.event_type in ("created", "deleted", "moved"):
+            file_index.reset()
+        if e.is_directory:
+            if self.observer is not None:
+                self.update_watches(e, src_ignored, dest_ignored)
             return
-        path = e.src_path[len(self.scanned_dir) :]
-        if path.startswith("/"):
-            path = path[1:]
-        for compiler in self.compilers:
-            if compiler.is_supported(path):
-                if self.verbosity > 1:
-                    print(f"Modified: '{path}'")
-                try:
-                    compiler.compile(path, from_management=True, verbosity=self.verbosity)
-                    if compiler.supports_dependencies:
-                        for dependent in compiler.get_dependents(path):
-                            compiler.compile(path, from_management=True, verbosity=self.verbosity)
-                            compiler.compile(dependent, from_management=True, verbosity=self.verbosity)
-                except (exceptions.StaticCompilationError, ValueError) as e:
-                    print(e)
-                break
-
-
-def watch_dirs(scanned_dirs: Iterable[str], verbosity: int) -> None:
+        if e.event_type in ("created", "modified"):
+            self.queue.add(self.get_path(e.src_path))
+        elif e.event_type == "moved" and not dest_ignored:
+            # Editors that save the files atomically move a temporary file over the source file
+            self.queue.add(self.get_path(e.dest_path))
+
+    def update_watches(self, e: Any, src_ignored: bool, dest_ignored: bool) -> None:
+        # The new directories are watched by the recursive watches of their parents, if there are any
+        if e.event_type in ("deleted", "moved") and not src_ignored:
+            self.unschedule(e.src_path)
+        if e.event_type == "created" and os.path.dirname(e.src_path) in self.watches:
+            self.schedule(e.src_path)
+        elif e.event_type == "moved" and not dest_ignored and os.path.dirname(e.dest_path) in self.watches:
+            self.schedule(e.dest_path)
+
+
+def get_dependency_compilers(path: str) -> List[BaseCompiler]:
+    """Return the compilers whose source files may depend on the given file, see
+    `BaseCompiler.get_dependency_extensions`.
+
+    :param path: relative path to a file
+    """
+    extension = os.path.splitext(path)[1].lstrip(".")
+    return [
+        compiler
+        for compiler in registry.get_compilers().values()
+        if compiler.supports_dependencies and extension in compiler.get_dependency_extensions()
+    ]
+
+
+def get_tasks(paths: Iterable[str], verbosity: int) -> List[build.CompileTask]:
+    """Get the tasks to compile the changed source files and the files that depend on them, each file once.
+    The changed files that aren't source files, e.g. CSS files imported by SCSS files, are compiled only through
+    their dependents.
+
+    :param paths: relative paths to the changed files
+    :param verbosity: verbosity level
+    :returns: pairs of compiler and relative path to a source file
+    """
+    tasks: List[build.CompileTask] = []
+    changed_paths: Set[str] = set()
+    # Compilers whose source files may depend on the changed files
+    compilers: Dict[BaseCompiler, None] = {}
+    for path in paths:
+        compiler = registry.find_compiler(path)
+        if compiler is None:
+            dependency_compilers = get_dependency_compilers(path)
+            if not dependency_compilers:
+                continue
+            compilers.update(dict.fromkeys(dependency_compilers))
+        else:
+            tasks.append((compiler, path))
+            if compiler.supports_dependencies:
+                compilers[compiler] = None
+        if verbosity > 1:
+            print(f"Modified: '{path}'")
+        changed_paths.add(path)
+
+    for compiler in compilers:
+        for dependent in compiler.get_dependents_many(sorted(changed_paths)):
+            if dependent not in changed_paths:
+                changed_paths.add(dependent)
+                tasks.append((registry.find_compiler(dependent) or compiler, dependent))
+    return tasks
+
+
+def compile_changes(
+    paths: Iterable[str],
+    jobs: Optional[int],
+    verbosity: int,
+    saver: Optional[dependency_graph.BackgroundSaver] = None,
+) -> None:
+    """Compile the changed source files and the files that depend on them.
+
+    :param paths: relative paths to the changed source files
+    :param jobs: number of files to compile in parallel
+    :param verbosity: verbosity level
+    :param saver: saves the updated dependencies in the background, they are saved before returning without it
+    """
+    paths = list(paths)
+    tasks = get_tasks(paths, verbosity)
+    # The cached modification times of the changed files are outdated
+    full_paths = []
+    for compiler, path in tasks:
+        with contextlib.suppress(ValueError):
+            full_paths.append(compiler.get_full_source_path(path))
+    task_paths = {path for _compiler, path in tasks}
+    for path in paths:
+        # The changed files that aren't source files
+        full_path = file_index.find(path) if path not in task_paths else None
+        if full_path is not None:
+            full_paths.append(full_path)
+    mtime.forget(full_paths)
+    if tasks:
+        build.compile_paths(tasks, jobs=jobs, verbosity=verbosity)
+    # Save the dependencies updated in the preloaded graph
+    if saver is not None:
+        saver.request()
+    else:
+        dependency_graph.flush()
+
+
+def preload_dependencies() -> ContextManager[Optional[dependency_graph.DependencyGraph]]:
+    """Keep the dependencies in memory while the directories are watched, unless they are preloaded already or none
+    of the compilers supports dependencies.
+    """
+    graph = dependency_graph.get_graph()
+    if graph is not None or not any(compiler.supports_dependencies for compiler in registry.get_compilers().values()):
+        return contextlib.nullcontext(graph)
+    return dependency_graph.preload()
+
+
+def watch_dirs(scanned_dirs: Iterable[str], verbosity: int, jobs: Optional[int] = None) -> None:
     print("Watching directories:")
     for scanned_dir in scanned_dirs:
         print(scanned_dir)
     print("\nPress Control+C to exit.\n")
 
-    compilers = registry.get_compilers().values()
+    queue = ChangeQueue()
     observer = observers.Observer()
+    extensions = get_watched_extensions()
 
     for scanned_dir in scanned_dirs:
-        handler = EventHandler(scanned_dir, verbosity, compilers)
-        observer.schedule(handler, path=scanned_dir, recursive=True)  # type: ignore
+        handler = EventHandler(scanned_dir, queue, discovery.PathFilter(scanned_dir, extensions), observer)
+        handler.schedule(scanned_dir)
 
     observer.start()  # type: ignore
 
-    try:
-        while True:
-            time.sleep(1)
-    except KeyboardInterrupt:
-        observer.stop()  # type: ignore
+    # The dependents of the changed files are looked up in memory, and the dependencies updated by the compilers are
+    # saved to the database without holding up the next compilation
+    with preload_dependencies() as graph:
+        saver = dependency_graph.BackgroundSaver(graph) if graph is not None else None
+        try:
+            while True:
+                time.sleep(POLL_INTERVAL)
+                paths = queue.pop()
+                if paths:
+                    compile_changes(paths, jobs, verbosity, saver)
+        except KeyboardInterrupt:
+            observer.stop()  # type: ignore
+        finally:
+            if saver is not None:
+                saver.stop()
+                saver.graph.flush()
 
     observer.join()
@@ -1,5 +1,6 @@
 import os
 
+import pytest
 from django.conf import settings
 
 
@@ -34,3 +35,13 @@ def pytest_configure():
         MTIME_DELAY=2,
         STATIC_PRECOMPILER_USE_CACHE=False,
     )
+
+
+@pytest.fixture(autouse=True)
+def _reset_process_caches():
+    from static_precompiler import caching, file_index, mtime
+
+    file_index.reset()
+    mtime.clear_local_cache()
+    # The database is rolled back after each test, so are the dependencies cached along with it
+    caching.get_cache().clear()
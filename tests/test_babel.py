@@ -73,3 +73,30 @@ def test_get_extra_args():
         "--presets",
         "baz",
     ]
+
+
+def test_compile_file_temp_output(mocker: MockFixture, tmpdir):
+    mocker.patch("static_precompiler.settings.ROOT", tmpdir.strpath)
+
+    def run_command(args):
+        temp_output_path = args[args.index("-o") + 1]
+        assert os.path.dirname(temp_output_path) != os.path.dirname(full_output_path)
+        with open(temp_output_path, "w") as compiled:
+            compiled.write("COMPILED\n//# sourceMappingURL=test.js.map")
+        with open(temp_output_path + ".map", "w") as sourcemap:
+            sourcemap.write(json.dumps({"sources": [args[-1]]}))
+        return 0, "", ""
+
+    mocker.patch("static_precompiler.utils.run_command", side_effect=run_command)
+
+    compiler = compilers.Babel(sourcemap_enabled=True)
+    full_output_path = compiler.get_full_output_path("scripts/test.es6")
+
+    assert compiler.compile_file("scripts/test.es6") == "COMPILED/scripts/test.js"
+
+    with open(full_output_path) as compiled:
+        assert compiled.read() == "COMPILED\n//# sourceMappingURL=test.js.map"
+    with open(full_output_path + ".map") as sourcemap:
+        sourcemap_json = json.load(sourcemap)
+    assert sourcemap_json["sources"] == ["test.es6"]
+    assert sourcemap_json["file"] == "test.js"
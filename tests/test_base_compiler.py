@@ -1,10 +1,12 @@
+import hashlib
+import json
 import os
 
 import pytest
 from django.utils import encoding
 from pytest_mock import MockFixture
 
-from static_precompiler import compilers, models, settings
+from static_precompiler import caching, compilers, dependency_graph, exceptions, models, settings
 
 
 def test_is_supported(mocker: MockFixture):
@@ -98,7 +100,7 @@ def test_should_compile(mocker: MockFixture):
         "C": 5,
     }
 
-    mocker.patch.object(compiler, "get_source_mtime", side_effect=lambda x: mtimes[x])
+    mocker.patch.object(compiler, "get_source_mtimes", side_effect=lambda paths: [mtimes[x] for x in paths])
     mocker.patch.object(compiler, "get_output_mtime", return_value=None)
 
     assert compiler.should_compile("A") is True
@@ -142,7 +144,48 @@ def test_compile_source():
         compiler.compile_source("source")
 
 
-def test_compile(mocker: MockFixture):
+def test_write_output(mocker: MockFixture, tmpdir):
+    mocker.patch("static_precompiler.settings.ROOT", tmpdir.strpath)
+    compiler = compilers.BaseCompiler()
+    mocker.patch.object(compiler, "get_output_filename", return_value="test.css")
+
+    sourcemap = json.dumps({"sources": ["/abs/styles/test.scss"], "file": "tmp.css"})
+    compiler.write_output("styles/test.scss", "p { background: url(bg.png) }", sourcemap, convert_urls=True)
+
+    output_dir = tmpdir.join("COMPILED", "styles")
+    assert output_dir.join("test.css").read() == "p { background: url(/static/styles/bg.png) }"
+    assert json.loads(output_dir.join("test.css.map").read()) == {
+        "sourceRoot": "../../styles",
+        "sources": ["test.scss"],
+        "file": "test.css",
+    }
+    # No temporary files are left behind
+    assert sorted(os.listdir(output_dir.strpath)) == ["test.css", "test.css.map"]
+
+
+def test_get_compiled_path(mocker: MockFixture, tmpdir):
+    mocker.patch("static_precompiler.settings.ROOT", tmpdir.strpath)
+    compiler = compilers.BaseCompiler()
+    mocker.patch.object(compiler, "get_output_filename", return_value="test.css")
+
+    assert compiler.get_compiled_path("styles/test.scss") == "COMPILED/styles/test.css"
+    mocker.patch("static_precompiler.settings.HASHED_FILENAMES", True)
+    # The file hasn't been compiled yet
+    assert compiler.get_compiled_path("styles/test.scss") == "COMPILED/styles/test.css"
+
+    compiler.write_output("styles/test.scss", "p {}")
+    digest = hashlib.sha256(b"p {}").hexdigest()[:12]
+    assert compiler.get_compiled_path("styles/test.scss") == f"COMPILED/styles/test.{digest}.css"
+    assert tmpdir.join("COMPILED", "styles", f"test.{digest}.css").read() == "p {}"
+
+    compiler.write_output("styles/test.scss", "a {}")
+    digest = hashlib.sha256(b"a {}").hexdigest()[:12]
+    assert compiler.get_compiled_path("styles/test.scss") == f"COMPILED/styles/test.{digest}.css"
+    assert tmpdir.join("COMPILED", "styles", f"test.{digest}.css").read() == "a {}"
+
+
+def test_compile(mocker: MockFixture, tmpdir):
+    mocker.patch("static_precompiler.settings.ROOT", tmpdir.strpath)
     compiler = compilers.BaseCompiler()
 
     compile_file = mocker.patch.object(compiler, "compile_file", return_value="dummy.js")
@@ -175,6 +218,87 @@ def test_compile(mocker: MockFixture):
     update_dependencies.assert_called_once_with("dummy.coffee", ["A", "B"])
 
 
+def test_compile_failure(mocker: MockFixture, tmpdir):
+    mocker.patch("static_precompiler.settings.ROOT", tmpdir.strpath)
+    mocker.patch("static_precompiler.settings.FAILURE_BACKOFF", 10)
+    mocker.patch("static_precompiler.settings.FAILURE_BACKOFF_MAX", 15)
+    now = mocker.patch("time.time", return_value=1000)
+    compiler = compilers.BaseCompiler()
+    mocker.patch.object(compiler, "get_output_path", return_value="dummy.js")
+    mocker.patch.object(compiler, "is_supported", return_value=True)
+    mocker.patch.object(compiler, "should_compile", return_value=True)
+    get_source_mtimes = mocker.patch.object(compiler, "get_source_mtimes", return_value=[1])
+    compile_file = mocker.patch.object(
+        compiler, "compile_file", side_effect=exceptions.StaticCompilationError("Syntax error")
+    )
+
+    with pytest.raises(exceptions.StaticCompilationError, match="Syntax error"):
+        compiler.compile("dummy.coffee")
+    assert compile_file.call_count == 1
+
+    # The error is raised again without running the compiler
+    with pytest.raises(exceptions.StaticCompilationError, match="Syntax error"):
+        compiler.compile("dummy.coffee")
+    assert compile_file.call_count == 1
+
+    # The management command compiles the file anyway
+    with pytest.raises(exceptions.StaticCompilationError):
+        compiler.compile("dummy.coffee", from_management=True)
+    assert compile_file.call_count == 2
+
+    # The file is compiled again after the backoff, the next backoff is doubled up to the maximum
+    now.return_value = 1010
+    with pytest.raises(exceptions.StaticCompilationError):
+        compiler.compile("dummy.coffee")
+    assert compile_file.call_count == 3
+    now.return_value = 1024
+    with pytest.raises(exceptions.StaticCompilationError):
+        compiler.compile("dummy.coffee")
+    assert compile_file.call_count == 3
+
+    # The file is compiled again as soon as it's modified
+    get_source_mtimes.return_value = [2]
+    compile_file.side_effect = None
+    compile_file.return_value = "dummy.js"
+    assert compiler.compile("dummy.coffee") == "dummy.js"
+    assert compile_file.call_count == 4
+    get_source_mtimes.reset_mock()
+    compiler.compile("dummy.coffee")
+    assert compile_file.call_count == 5
+    # There is no recorded failure to compare the inputs with
+    get_source_mtimes.assert_not_called()
+
+
+def test_compile_failure_new_import(mocker: MockFixture, tmpdir):
+    mocker.patch("static_precompiler.settings.ROOT", tmpdir.strpath)
+    compiler = compilers.BaseCompiler()
+    compiler.supports_dependencies = True
+    mocker.patch.object(compiler, "get_output_path", return_value="dummy.js")
+    mocker.patch.object(compiler, "is_supported", return_value=True)
+    mocker.patch.object(compiler, "should_compile", return_value=True)
+    mocker.patch.object(compiler, "get_source_mtimes", side_effect=lambda paths: [1] * len(paths))
+    mocker.patch.object(compiler, "get_dependencies", return_value=[])
+    find_dependencies = mocker.patch.object(
+        compiler, "find_dependencies", side_effect=exceptions.StaticCompilationError("Can't locate _new.scss")
+    )
+    compile_file = mocker.patch.object(
+        compiler, "compile_file", side_effect=exceptions.StaticCompilationError("Can't locate _new.scss")
+    )
+
+    with pytest.raises(exceptions.StaticCompilationError):
+        compiler.compile("dummy.scss")
+    with pytest.raises(exceptions.StaticCompilationError):
+        compiler.compile("dummy.scss")
+    assert compile_file.call_count == 1
+
+    # The newly imported file isn't among the saved dependencies, it's compiled again once the file is added
+    find_dependencies.side_effect = None
+    find_dependencies.return_value = ["_new.scss"]
+    with pytest.raises(exceptions.StaticCompilationError):
+        compiler.compile("dummy.scss")
+    assert compile_file.call_count == 2
+
+
 def test_compile_lazy(mocker: MockFixture):
     compiler = compilers.BaseCompiler()
 
@@ -219,6 +343,52 @@ def test_get_dependencies(mocker: MockFixture):
     assert list(models.Dependency.objects.all()) == [dependency_1]
 
 
+@pytest.mark.django_db
+def test_get_dependencies_cache(django_assert_num_queries, mocker: MockFixture):
+    compiler = compilers.BaseCompiler()
+    compiler.update_dependencies("spam.scss", ["ham.scss", "eggs.scss"])
+    get_full_source_path = mocker.patch.object(compiler, "get_full_source_path", side_effect=lambda path: path)
+
+    with django_assert_num_queries(1):
+        assert compiler.get_dependencies("spam.scss") == ["eggs.scss", "ham.scss"]
+    with django_assert_num_queries(0):
+        assert compiler.get_dependencies("spam.scss") == ["eggs.scss", "ham.scss"]
+
+    def get_full_source_path_(source_path):
+        # File "eggs.scss" has been removed
+        if source_path == "eggs.scss":
+            raise ValueError()
+        return source_path
+
+    get_full_source_path.side_effect = get_full_source_path_
+    assert compiler.get_dependencies("spam.scss") == ["ham.scss"]
+    assert list(models.Dependency.objects.values_list("depends_on", flat=True)) == ["ham.scss"]
+    with django_assert_num_queries(0):
+        assert compiler.get_dependencies("spam.scss") == ["ham.scss"]
+
+
+@pytest.mark.django_db
+def test_get_dependencies_generation(django_assert_num_queries, mocker: MockFixture):
+    compiler = compilers.BaseCompiler()
+    mocker.patch.object(compiler, "get_full_source_path", side_effect=lambda path: path)
+    compiler.update_dependencies("spam.scss", ["ham.scss"])
+    assert compiler.get_dependencies("spam.scss") == ["ham.scss"]
+
+    # Another process saves the dependencies, the lists cached by all processes aren't used anymore
+    graph = dependency_graph.DependencyGraph([("spam.scss", "ham.scss")])
+    graph.update("spam.scss", ["eggs.scss"])
+    graph.flush()
+    with django_assert_num_queries(1):
+        assert compiler.get_dependencies("spam.scss") == ["eggs.scss"]
+    with django_assert_num_queries(0):
+        assert compiler.get_dependencies("spam.scss") == ["eggs.scss"]
+
+    # The generation evicted from the cache isn't repeated
+    generation = caching.get_dependencies_generation()
+    caching.get_cache().delete(caching.DEPENDENCIES_GENERATION_KEY)
+    assert caching.get_dependencies_generation() > generation
+
+
 @pytest.mark.django_db
 def test_get_dependents(mocker: MockFixture):
     compiler = compilers.BaseCompiler()
@@ -247,7 +417,25 @@ def test_get_dependents(mocker: MockFixture):
 
 
 @pytest.mark.django_db
-def test_update_dependencies():
+def test_get_dependents_many(django_assert_num_queries, mocker: MockFixture):
+    compiler = compilers.BaseCompiler()
+    # The dependencies of a source file include the indirect ones
+    compiler.update_dependencies("A", ["_B", "_C", "_D"])
+    compiler.update_dependencies("E", ["_D"])
+    compiler.update_dependencies("F", ["_G"])
+    compiler.update_dependencies("removed", ["_C", "_G"])
+    mocker.patch.object(compiler, "is_located", side_effect=lambda path: path != "removed")
+
+    with django_assert_num_queries(1):
+        assert compiler.get_dependents_many(["_B", "_D"]) == ["A", "E"]
+
+    assert compiler.get_dependents_many(["_C", "_G", "_H"]) == ["A", "F"]
+    # The dependencies of the file that can't be located are removed
+    assert not models.Dependency.objects.filter(source="removed").exists()
+
+
+@pytest.mark.django_db
+def test_update_dependencies(django_assert_num_queries):
     compiler = compilers.BaseCompiler()
 
     assert not models.Dependency.objects.exists()
@@ -266,3 +454,52 @@ def test_update_dependencies():
 
     compiler.update_dependencies("A", [])
     assert sorted(models.Dependency.objects.values_list("source", "depends_on")) == [("B", "C")]
+
+    # The dependencies are compared with the saved ones, then deleted and inserted in bulk
+    with django_assert_num_queries(1):
+        compiler.update_dependencies("B", ["C"])
+    with django_assert_num_queries(3):
+        compiler.update_dependencies("B", [f"_{i}" for i in range(80)])
+    assert models.Dependency.objects.filter(source="B").count() == 80
+
+
+def test_find_dependencies_import_graph(caplog, mocker: MockFixture, tmpdir):
+    class ImportingCompiler(compilers.BaseCompiler):
+        def find_imports(self, source):
+            return source.split()
+
+        def find_imported_files(self, source_path):
+            return [path for path in self.get_imports(source_path) if tmpdir.join(path).exists()]
+
+    compiler = ImportingCompiler()
+
+    imports = {
+        "A": "B C",
+        "B": "D",
+        "C": "D",
+        "D": "E X",
+        "E": "B",
+    }
+    for path, source in imports.items():
+        tmpdir.join(path).write(source)
+
+    mocker.patch.object(compiler, "get_full_source_path", side_effect=lambda path: tmpdir.join(path).strpath)
+    find_imports = mocker.spy(compiler, "find_imports")
+
+    assert compiler.find_dependencies("A") == ["B", "C", "D", "E"]
+    assert "Circular import detected: A -> B -> D -> E -> B" in caplog.messages
+
+    # Each file is parsed only once
+    assert sorted(call.args[0] for call in find_imports.mock_calls) == ["B", "B C", "D", "D", "E X"]
+
+    # The imports are cached until the file is modified, the imported files are located on every lookup
+    find_imports.reset_mock()
+    tmpdir.join("X").write("")
+    assert compiler.find_dependencies("C") == ["B", "D", "E", "X"]
+    find_imports.assert_called_once_with("")
+
+    find_imports.reset_mock()
+    tmpdir.join("D").write("")
+    os.utime(tmpdir.join("D").strpath, ns=(0, 0))
+    assert compiler.find_dependencies("C") == ["D"]
+    find_imports.assert_called_once_with("")
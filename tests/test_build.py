@@ -0,0 +1,181 @@
+import hashlib
+import threading
+
+import pytest
+from pytest_mock import MockFixture
+
+from static_precompiler import build, exceptions, models
+from static_precompiler.compilers import BaseCompiler
+
+
+class FakeCompiler(BaseCompiler):
+    name = "fake"
+    supports_dependencies = True
+    input_extension = "fake"
+    output_extension = "out"
+
+    def __init__(self):
+        self.threads = set()
+        super().__init__()
+
+    def compile_file(self, source_path: str) -> str:
+        self.threads.add(threading.get_ident())
+        if source_path.startswith("broken"):
+            raise exceptions.StaticCompilationError(f"Can't compile {source_path}")
+        return self.get_output_path(source_path)
+
+    def find_dependencies(self, source_path: str):
+        return [f"_{source_path}"]
+
+
+@pytest.mark.django_db
+def test_compile_paths(capsys, mocker: MockFixture):
+    compiler = FakeCompiler()
+    compiler.custom_should_compile = True
+    mocker.patch.object(compiler, "should_compile", side_effect=lambda path, from_management: path != "fresh.fake")
+    update_dependencies = mocker.spy(compiler, "update_dependencies")
+
+    tasks = [(compiler, path) for path in ("a.fake", "broken.fake", "b.fake", "fresh.fake")]
+    compiled_files = build.compile_paths(tasks, jobs=4, verbosity=1)
+
+    assert compiled_files == {"COMPILED/a.out", "COMPILED/b.out", "COMPILED/fresh.out"}
+    assert threading.get_ident() not in compiler.threads
+
+    stdout, _ = capsys.readouterr()
+    assert stdout == (
+        "Compiled 'a.fake' to 'COMPILED/a.out'\n"
+        "Can't compile broken.fake\n"
+        "Compiled 'b.fake' to 'COMPILED/b.out'\n"
+    )
+
+    assert update_dependencies.mock_calls == [
+        mocker.call("a.fake", ["_a.fake"]),
+        mocker.call("b.fake", ["_b.fake"]),
+    ]
+    assert sorted(models.Dependency.objects.values_list("source", "depends_on")) == [
+        ("a.fake", "_a.fake"),
+        ("b.fake", "_b.fake"),
+    ]
+
+
+@pytest.mark.django_db
+def test_compile_paths_unchanged(capsys, mocker: MockFixture, tmpdir):
+    mocker.patch("static_precompiler.settings.ROOT", tmpdir.strpath)
+    compiler = FakeCompiler()
+    compiler.custom_should_compile = True
+    mocker.patch.object(compiler, "should_compile", return_value=True)
+    mocker.patch.object(
+        compiler, "compile_file", side_effect=lambda path: compiler.write_output(path, "compiled") or path
+    )
+
+    build.compile_paths([(compiler, "a.fake")], jobs=1, verbosity=1)
+    build.compile_paths([(compiler, "a.fake")], jobs=1, verbosity=1)
+
+    stdout, _ = capsys.readouterr()
+    assert stdout == "Compiled 'a.fake' to 'a.fake'\nCompiled 'a.fake', 'a.fake' is unchanged\n"
+
+
+@pytest.mark.django_db
+def test_compile_paths_hashed_filenames(capsys, mocker: MockFixture, tmpdir):
+    mocker.patch("static_precompiler.settings.ROOT", tmpdir.strpath)
+    mocker.patch("static_precompiler.settings.HASHED_FILENAMES", True)
+    compiler = FakeCompiler()
+    compiler.custom_should_compile = True
+    mocker.patch.object(compiler, "should_compile", return_value=True)
+    mocker.patch.object(
+        compiler, "compile_file", side_effect=lambda path: compiler.write_output(path, "compiled") or path
+    )
+
+    compiled_files = build.compile_paths([(compiler, "a.fake")], jobs=1, verbosity=1)
+    hashed_path = f"COMPILED/a.{hashlib.sha256(b'compiled').hexdigest()[:12]}.out"
+    assert compiled_files == {"COMPILED/a.out", hashed_path}
+    assert compiler.compile("a.fake") == hashed_path
+
+
+def test_compile_paths_should_compile_error(capsys, mocker: MockFixture):
+    compiler = FakeCompiler()
+    compiler.custom_should_compile = True
+    mocker.patch.object(compiler, "should_compile", side_effect=ValueError("Can't find staticfile named: a.fake"))
+    build_ = mocker.spy(compiler, "build")
+
+    assert build.compile_paths([(compiler, "a.fake")], jobs=1) == set()
+    build_.assert_not_called()
+
+    stdout, _ = capsys.readouterr()
+    assert stdout == "Can't find staticfile named: a.fake\n"
+
+
+@pytest.mark.django_db
+def test_build_planner(django_assert_num_queries, mocker: MockFixture):
+    compiler = FakeCompiler()
+    mocker.patch.object(compiler, "is_partial", side_effect=lambda path: path.startswith("_"))
+
+    models.Dependency.objects.create(source="a.fake", depends_on="_shared.fake")
+    models.Dependency.objects.create(source="b.fake", depends_on="_shared.fake")
+    models.Dependency.objects.create(source="c.fake", depends_on="_removed.fake")
+
+    source_mtimes = {"a.fake": 1, "b.fake": 1, "c.fake": 1, "d.fake": 1, "_shared.fake": 5}
+    output_mtimes = {"a.fake": 6, "b.fake": 4, "c.fake": 6, "d.fake": 6}
+
+    def get_source_mtimes(paths):
+        for path in paths:
+            if path not in source_mtimes:
+                raise ValueError(f"Can't find staticfile named: {path}")
+        return [source_mtimes[path] for path in paths]
+
+    mocker.patch.object(compiler, "get_source_mtimes", side_effect=get_source_mtimes)
+    mocker.patch.object(compiler, "get_output_mtime", side_effect=lambda path: output_mtimes.get(path))
+
+    tasks = [(compiler, path) for path in ("_shared.fake", "a.fake", "b.fake", "c.fake", "d.fake", "e.fake")]
+
+    with django_assert_num_queries(1):
+        stale_tasks, up_to_date_files = build.BuildPlanner().plan(tasks)
+
+    # "b.fake" is older than the shared dependency, "c.fake" depends on a removed file,
+    # "e.fake" hasn't been compiled yet.
+    assert stale_tasks == [(compiler, "b.fake"), (compiler, "c.fake"), (compiler, "e.fake")]
+    assert up_to_date_files == {"COMPILED/_shared.out", "COMPILED/a.out", "COMPILED/d.out"}
+
+
+class BatchCompiler(FakeCompiler):
+    supports_batch = True
+
+    def __init__(self):
+        self.batches = []
+        super().__init__()
+
+    def compile_many(self, source_paths):
+        self.batches.append(source_paths)
+        return super().compile_many(source_paths)
+
+
+def test_split_tasks():
+    compiler = FakeCompiler()
+    batch_compiler = BatchCompiler()
+    tasks = [(batch_compiler, f"{i}.fake") for i in range(5)] + [(compiler, "a.fake"), (compiler, "b.fake")]
+
+    assert build.split_tasks(tasks, jobs=2) == [
+        (batch_compiler, ["0.fake", "1.fake", "2.fake"]),
+        (batch_compiler, ["3.fake", "4.fake"]),
+        (compiler, ["a.fake"]),
+        (compiler, ["b.fake"]),
+    ]
+
+
+@pytest.mark.django_db
+def test_compile_paths_in_batches(capsys, mocker: MockFixture):
+    compiler = BatchCompiler()
+    compiler.custom_should_compile = True
+    mocker.patch.object(compiler, "should_compile", return_value=True)
+
+    tasks = [(compiler, path) for path in ("a.fake", "broken.fake", "b.fake", "c.fake")]
+    assert build.compile_paths(tasks, jobs=2, verbosity=1) == {"COMPILED/a.out", "COMPILED/b.out", "COMPILED/c.out"}
+    assert sorted(compiler.batches) == [["a.fake", "broken.fake"], ["b.fake", "c.fake"]]
+
+    stdout, _ = capsys.readouterr()
+    assert stdout == (
+        "Compiled 'a.fake' to 'COMPILED/a.out'\n"
+        "Can't compile broken.fake\n"
+        "Compiled 'b.fake' to 'COMPILED/b.out'\n"
+        "Compiled 'c.fake' to 'COMPILED/c.out'\n"
+    )
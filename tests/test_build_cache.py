@@ -0,0 +1,96 @@
+import os
+
+import django.core.exceptions
+import pytest
+from django.core.files import storage
+from pytest_mock import MockFixture
+
+from static_precompiler import build_cache
+from static_precompiler.compilers import BaseCompiler
+
+
+class FakeCompiler(BaseCompiler):
+    name = "fake"
+    supports_dependencies = True
+    input_extension = "fake"
+    output_extension = "out"
+
+    def __init__(self, sourcemap_enabled: bool = True):
+        self.is_sourcemap_enabled = sourcemap_enabled
+        super().__init__()
+
+    def compile_file(self, source_path: str) -> str:
+        full_output_path = self.get_full_output_path(source_path)
+        os.makedirs(os.path.dirname(full_output_path), exist_ok=True)
+        with open(self.get_full_source_path(source_path)) as source_file:
+            compiled = source_file.read().upper()
+        for dependency in self.find_dependencies(source_path):
+            with open(self.get_full_source_path(dependency)) as dependency_file:
+                compiled += dependency_file.read().upper()
+        with open(full_output_path, "w") as output_file:
+            output_file.write(compiled)
+        with open(full_output_path + ".map", "w") as sourcemap_file:
+            sourcemap_file.write(f"map of {source_path}")
+        return self.get_output_path(source_path)
+
+    def find_imported_files(self, source_path: str):
+        return ["_b.fake"] if source_path == "a.fake" else []
+
+
+def test_get_build_cache(mocker: MockFixture, tmpdir):
+    mocker.patch.object(build_cache, "build_cache", None)
+    assert build_cache.get_build_cache() is None
+
+    mocker.patch("static_precompiler.settings.BUILD_CACHE_DIR", tmpdir.strpath)
+    cache = build_cache.get_build_cache()
+    assert isinstance(cache, build_cache.BuildCache)
+    assert isinstance(cache.storage, storage.FileSystemStorage)
+    assert cache.storage.location == tmpdir.strpath
+    assert build_cache.get_build_cache() is cache
+
+    mocker.patch("static_precompiler.settings.BUILD_CACHE_STORAGE", "django.core.files.storage.FileSystemStorage")
+    mocker.patch("static_precompiler.settings.BUILD_CACHE_STORAGE_OPTIONS", {"location": tmpdir.join("other").strpath})
+    assert build_cache.build_cache_storage().location == tmpdir.join("other").strpath
+
+    mocker.patch("static_precompiler.settings.BUILD_CACHE_STORAGE", "non_existing_module.Storage")
+    with pytest.raises(django.core.exceptions.ImproperlyConfigured):
+        build_cache.build_cache_storage()
+
+
+def test_build_from_cache(mocker: MockFixture, tmpdir):
+    root = tmpdir.mkdir("root")
+    source_dir = tmpdir.mkdir("source")
+    source_dir.join("a.fake").write("a")
+    source_dir.join("_b.fake").write("b")
+    mocker.patch("static_precompiler.settings.ROOT", root.strpath)
+    mocker.patch.object(FakeCompiler, "get_full_source_path", side_effect=lambda path: source_dir.join(path).strpath)
+    cache = build_cache.BuildCache(storage.FileSystemStorage(location=tmpdir.join("cache").strpath))
+    mocker.patch.object(build_cache, "build_cache", cache)
+    compile_file = mocker.spy(FakeCompiler, "compile_file")
+
+    compiler = FakeCompiler()
+    assert compiler.build("a.fake") == ("COMPILED/a.out", ["_b.fake"])
+    assert compile_file.call_count == 1
+    assert root.join("COMPILED", "a.out").read() == "AB"
+
+    # Another host with the same sources restores the compiled files from the cache
+    root.remove()
+    assert FakeCompiler().build("a.fake") == ("COMPILED/a.out", ["_b.fake"])
+    assert compile_file.call_count == 1
+    assert root.join("COMPILED", "a.out").read() == "AB"
+    assert root.join("COMPILED", "a.out.map").read() == "map of a.fake"
+
+    # Changes to the dependencies or the compiler options make a new key
+    source_dir.join("_b.fake").write("c")
+    assert FakeCompiler().build("a.fake") == ("COMPILED/a.out", ["_b.fake"])
+    assert compile_file.call_count == 2
+    assert root.join("COMPILED", "a.out").read() == "AC"
+
+    root.join("COMPILED", "a.out.map").remove()
+    FakeCompiler(sourcemap_enabled=False).build("a.fake")
+    assert compile_file.call_count == 3
+
+    # Only complete entries are restored
+    key = cache.get_key(compiler, "a.fake")
+    cache.storage.delete(cache.get_entry_path(key, build_cache.INDEX_FILENAME))
+    assert cache.restore(key, compiler, "a.fake") is False
@@ -0,0 +1,124 @@
+import json
+import os
+
+import django.core.exceptions
+import pytest
+from pytest_mock import MockFixture
+
+from static_precompiler import change_detectors
+from static_precompiler.compilers import BaseCompiler
+
+
+class FakeCompiler(BaseCompiler):
+    name = "fake"
+    supports_dependencies = True
+    input_extension = "fake"
+    output_extension = "out"
+
+    def __init__(self, option: str = "foo"):
+        self.option = option
+        super().__init__()
+
+
+def test_build_change_detector(mocker: MockFixture):
+    assert isinstance(change_detectors.build_change_detector(), change_detectors.MtimeChangeDetector)
+
+    mocker.patch(
+        "static_precompiler.settings.CHANGE_DETECTOR", "static_precompiler.change_detectors.HashChangeDetector"
+    )
+    assert isinstance(change_detectors.build_change_detector(), change_detectors.HashChangeDetector)
+
+    for invalid in ("invalid", "non_existing_module.ClassName", "static_precompiler.change_detectors.Foo"):
+        mocker.patch("static_precompiler.settings.CHANGE_DETECTOR", invalid)
+        with pytest.raises(django.core.exceptions.ImproperlyConfigured):
+            change_detectors.build_change_detector()
+
+
+def test_mtime_change_detector(mocker: MockFixture):
+    compiler = FakeCompiler()
+    source_mtimes = {"A.fake": 10, "_B.fake": 20}
+    mocker.patch.object(compiler, "get_source_mtimes", side_effect=lambda paths: [source_mtimes[p] for p in paths])
+    get_output_mtime = mocker.patch.object(compiler, "get_output_mtime", return_value=15)
+    get_dependencies = mocker.MagicMock(return_value=["_B.fake"])
+
+    detector = change_detectors.MtimeChangeDetector()
+    assert detector.is_changed(compiler, "A.fake", 15, get_dependencies) is True
+    assert detector.is_changed(compiler, "A.fake", 25, get_dependencies) is False
+
+    # The compiled file hasn't been rewritten because its content is the same, the time of compilation is used
+    mocker.patch("time.time", return_value=30)
+    detector.record(compiler, "A.fake", ["_B.fake"])
+    assert detector.is_changed(compiler, "A.fake", 15, get_dependencies) is False
+    # The time of compilation is saved to the cache, so another process sees it too
+    assert change_detectors.MtimeChangeDetector().is_changed(compiler, "A.fake", 15, get_dependencies) is False
+    source_mtimes["_B.fake"] = 35
+    assert detector.is_changed(compiler, "A.fake", 15, get_dependencies) is True
+
+    # The compiled file has been modified by something else since
+    source_mtimes["_B.fake"] = 20
+    get_output_mtime.return_value = 12
+    detector.record(compiler, "A.fake", ["_B.fake"])
+    assert detector.is_changed(compiler, "A.fake", 15, get_dependencies) is True
+
+
+def test_hash_change_detector(mocker: MockFixture, tmpdir):
+    mocker.patch("static_precompiler.settings.ROOT", tmpdir.strpath)
+    source_dir = tmpdir.mkdir("source")
+    for name in ("A.fake", "_B.fake", "_C.fake"):
+        source_dir.join(name).write(name)
+
+    compiler = FakeCompiler()
+    mocker.patch.object(FakeCompiler, "get_full_source_path", side_effect=lambda path: source_dir.join(path).strpath)
+    get_dependencies = mocker.MagicMock(side_effect=AssertionError("Saved dependencies are used"))
+
+    detector = change_detectors.HashChangeDetector()
+    assert detector.is_changed(compiler, "A.fake", 0, get_dependencies) is True
+
+    with detector.batch():
+        detector.record(compiler, "A.fake", ["_B.fake"])
+        assert not os.path.exists(detector.get_hashes_path())
+    assert detector.is_changed(compiler, "A.fake", 0, get_dependencies) is False
+
+    with open(detector.get_hashes_path()) as hashes_file:
+        assert json.load(hashes_file)["A.fake"]["dependencies"] == ["_B.fake"]
+
+    # The modification time doesn't matter
+    os.utime(source_dir.join("_B.fake").strpath, (0, 0))
+    another_detector = change_detectors.HashChangeDetector()
+    assert another_detector.is_changed(compiler, "A.fake", 0, get_dependencies) is False
+
+    # The contents of the dependencies and the compiler options do
+    source_dir.join("_B.fake").write("changed")
+    assert another_detector.is_changed(compiler, "A.fake", 0, get_dependencies) is True
+    source_dir.join("_B.fake").write("_B.fake")
+    assert another_detector.is_changed(compiler, "A.fake", 0, get_dependencies) is False
+    assert another_detector.is_changed(FakeCompiler(), "A.fake", 0, get_dependencies) is False
+    assert another_detector.is_changed(FakeCompiler(option="bar"), "A.fake", 0, get_dependencies) is True
+
+    # The records made by another process are loaded
+    another_detector.record(compiler, "A.fake", ["_C.fake"])
+    detector.record(compiler, "_C.fake", [])
+    with open(detector.get_hashes_path()) as hashes_file:
+        assert sorted(json.load(hashes_file)) == ["A.fake", "_C.fake"]
+
+
+def test_hash_change_detector_removed_dependency(mocker: MockFixture, tmpdir):
+    mocker.patch("static_precompiler.settings.ROOT", tmpdir.strpath)
+    source_dir = tmpdir.mkdir("source")
+    for name in ("A.fake", "_B.fake"):
+        source_dir.join(name).write(name)
+
+    def get_full_source_path(path):
+        if not source_dir.join(path).exists():
+            raise ValueError(f"Can't find staticfile named: {path}")
+        return source_dir.join(path).strpath
+
+    compiler = FakeCompiler()
+    mocker.patch.object(compiler, "get_full_source_path", side_effect=get_full_source_path)
+    detector = change_detectors.HashChangeDetector()
+    detector.record(compiler, "A.fake", ["_B.fake"])
+    assert detector.is_changed(compiler, "A.fake", 0, mocker.MagicMock()) is False
+
+    # The source file is compiled again to update its dependencies
+    source_dir.join("_B.fake").remove()
+    assert detector.is_changed(compiler, "A.fake", 0, mocker.MagicMock()) is True
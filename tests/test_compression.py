@@ -0,0 +1,52 @@
+import gzip
+import os
+
+from pytest_mock import MockFixture
+
+from static_precompiler import compression
+from static_precompiler.compilers import BaseCompiler
+
+
+def test_compress_file(mocker: MockFixture, tmpdir):
+    mocker.patch.object(compression, "brotli", None)
+    path = tmpdir.join("test.css")
+    compression.compress_file(path.strpath)
+    assert tmpdir.listdir() == []
+
+    path.write("p {}")
+    compression.compress_file(path.strpath)
+    assert sorted(os.listdir(tmpdir.strpath)) == ["test.css", "test.css.gz"]
+    assert gzip.decompress(tmpdir.join("test.css.gz").read_binary()) == b"p {}"
+
+    # The compressed copy is written only when the file changes
+    write_binary_file = mocker.spy(compression.utils, "write_binary_file")
+    compression.compress_file(path.strpath)
+    write_binary_file.assert_not_called()
+
+    # The file written again with the same content isn't compressed again
+    path.write("p {}")
+    os.utime(path.strpath, ns=(0, os.stat(path.strpath).st_mtime_ns + 10**9))
+    gzip_compress = mocker.spy(compression.gzip, "compress")
+    compression.compress_file(path.strpath)
+    gzip_compress.assert_not_called()
+
+    path.write("a {}")
+    os.utime(path.strpath, ns=(0, os.stat(path.strpath).st_mtime_ns + 10**9))
+    compression.compress_file(path.strpath)
+    assert gzip.decompress(tmpdir.join("test.css.gz").read_binary()) == b"a {}"
+
+
+def test_compress_output(mocker: MockFixture, tmpdir):
+    mocker.patch("static_precompiler.settings.ROOT", tmpdir.strpath)
+    mocker.patch("static_precompiler.settings.HASHED_FILENAMES", True)
+    mocker.patch.object(compression, "brotli", None)
+    compiler = BaseCompiler()
+    compiler.output_extension = "css"
+    compiler.write_output("test.scss", "p {}")
+
+    compiler.compress_output("test.scss")
+    compiled_path = compiler.get_compiled_path("test.scss")
+    assert sorted(tmpdir.join("COMPILED").listdir()) == sorted(
+        tmpdir.join(path)
+        for path in ("COMPILED/test.css", "COMPILED/test.css.gz", compiled_path, compiled_path + ".gz")
+    )
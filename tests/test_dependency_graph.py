@@ -0,0 +1,90 @@
+import threading
+
+import pytest
+from django.db import DatabaseError
+from pytest_mock import MockFixture
+
+from static_precompiler import dependency_graph, models
+from static_precompiler.compilers import BaseCompiler
+
+
+@pytest.mark.django_db
+def test_dependency_graph(django_assert_num_queries):
+    models.Dependency.objects.create(source="A", depends_on="B")
+    models.Dependency.objects.create(source="A", depends_on="C")
+    models.Dependency.objects.create(source="D", depends_on="C")
+
+    with django_assert_num_queries(1):
+        graph = dependency_graph.DependencyGraph.load()
+
+    with django_assert_num_queries(0):
+        assert graph.get_dependencies("A") == ["B", "C"]
+        assert graph.get_dependencies("B") == []
+        assert graph.get_dependents("C") == ["A", "D"]
+
+        graph.update("A", ["C", "E"])
+        graph.update("D", [])
+        graph.update("F", ["C"])
+        # The same dependencies aren't saved again
+        graph.update("G", [])
+
+        assert graph.get_dependencies("A") == ["C", "E"]
+        assert graph.get_dependents("B") == []
+        assert graph.get_dependents("C") == ["A", "F"]
+        assert graph.pending == {"A", "D", "F"}
+
+    graph.flush()
+    assert sorted(models.Dependency.objects.values_list("source", "depends_on")) == [
+        ("A", "C"),
+        ("A", "E"),
+        ("F", "C"),
+    ]
+
+    with django_assert_num_queries(0):
+        graph.flush()
+
+
+@pytest.mark.django_db
+def test_preload(django_assert_num_queries, mocker: MockFixture):
+    models.Dependency.objects.create(source="A", depends_on="B")
+    models.Dependency.objects.create(source="C", depends_on="B")
+    compiler = BaseCompiler()
+    mocker.patch.object(compiler, "get_full_source_path", side_effect=lambda path: path)
+
+    with dependency_graph.preload():
+        with django_assert_num_queries(0):
+            assert compiler.get_dependencies("A") == ["B"]
+            assert compiler.get_dependents("B") == ["A", "C"]
+            compiler.update_dependencies("A", ["D"])
+            assert compiler.get_dependents("B") == ["C"]
+        assert models.Dependency.objects.filter(source="A", depends_on="B").exists()
+
+    assert dependency_graph.get_graph() is None
+    assert sorted(models.Dependency.objects.values_list("source", "depends_on")) == [("A", "D"), ("C", "B")]
+
+
+@pytest.mark.django_db
+def test_flush_error(mocker: MockFixture):
+    graph = dependency_graph.DependencyGraph()
+    graph.update("A", ["B"])
+    mocker.patch.object(graph, "save", side_effect=DatabaseError)
+
+    with pytest.raises(DatabaseError):
+        graph.flush()
+    # The dependencies are saved by the next flush
+    assert graph.pending == {"A"}
+
+
+def test_background_saver(mocker: MockFixture):
+    graph = dependency_graph.DependencyGraph()
+    flushed = threading.Event()
+    flush = mocker.patch.object(graph, "flush", side_effect=lambda: flushed.set())
+    close_all = mocker.patch("django.db.connections.close_all")
+
+    saver = dependency_graph.BackgroundSaver(graph)
+    saver.request()
+    assert flushed.wait(timeout=5)
+    saver.stop()
+    assert not saver.thread.is_alive()
+    flush.assert_called_once_with()
+    close_all.assert_called_once_with()
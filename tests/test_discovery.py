@@ -0,0 +1,78 @@
+import os
+
+from pytest_mock import MockFixture
+
+from static_precompiler import discovery
+from static_precompiler.compilers import SCSS, CoffeeScript
+
+
+def test_path_filter(mocker: MockFixture):
+    mocker.patch("static_precompiler.settings.ROOT", "/static")
+    mocker.patch("static_precompiler.settings.OUTPUT_DIR", "COMPILED")
+    path_filter = discovery.PathFilter("/static", extensions=["scss"], ignore_patterns=["node_modules", "vendor/*"])
+
+    assert not path_filter.is_ignored_dir("/static")
+    assert not path_filter.is_ignored_dir("/static/styles")
+    assert path_filter.is_ignored_dir("/static/COMPILED")
+    assert path_filter.is_ignored_dir("/static/node_modules")
+    assert path_filter.is_ignored_dir("/static/app/node_modules")
+    assert path_filter.is_ignored_dir("/static/vendor/bootstrap")
+    assert not path_filter.is_ignored_dir("/static/app/vendor")
+
+    assert not path_filter.is_ignored_file("/static/styles/a.scss")
+    assert path_filter.is_ignored_file("/static/styles/a.css")
+    assert path_filter.is_ignored_file("/static/vendor/a.scss")
+    # The parent directories are checked by `is_ignored_path` only
+    assert not path_filter.is_ignored_file("/static/node_modules/lib/a.scss")
+    assert path_filter.is_ignored_path("/static/node_modules/lib/a.scss")
+    assert path_filter.is_ignored_path(os.path.join("/static", "COMPILED", "styles", "a.scss"))
+    assert path_filter.is_ignored_path("/static/node_modules/lib", is_directory=True)
+    assert not path_filter.is_ignored_path("/static/styles/lib", is_directory=True)
+
+    # The scanned directory itself is never ignored
+    assert not discovery.PathFilter("/static/.styles", ignore_patterns=[".*"]).is_ignored_path("/static/.styles/a.scss")
+
+
+def test_walk_files(tmpdir, mocker: MockFixture):
+    mocker.patch("static_precompiler.settings.ROOT", str(tmpdir))
+    for path in (
+        "a.scss",
+        "b.png",
+        "styles/c.scss",
+        "styles/.d.scss",
+        "node_modules/lib/e.scss",
+        "vendor/f.scss",
+        "COMPILED/styles/c.scss",
+    ):
+        tmpdir.join(path).ensure()
+    path_filter = discovery.PathFilter(str(tmpdir), {"scss"}, ["node_modules", ".*", "vendor/*"])
+
+    assert sorted(discovery.walk_files(str(tmpdir), path_filter)) == ["a.scss", "styles/c.scss"]
+
+
+def test_find_source_files(tmpdir, mocker: MockFixture):
+    scss = SCSS()
+    coffeescript = CoffeeScript()
+    mocker.patch("static_precompiler.registry.get_compilers", return_value={"scss": scss, "coffeescript": coffeescript})
+    for path in (
+        "first/a.scss",
+        "first/b.coffee",
+        "first/c.js",
+        "second/a.scss",
+        "second/styles/d.scss",
+        "second/node_modules/e.scss",
+    ):
+        tmpdir.join(path).ensure()
+    walk_files = mocker.spy(discovery, "walk_files")
+
+    # The files found in the first directory aren't yielded again, no directories are ignored by default
+    assert sorted(
+        discovery.find_source_files([str(tmpdir.join("first")), str(tmpdir.join("second"))]), key=lambda task: task[1]
+    ) == [
+        (scss, "a.scss"),
+        (coffeescript, "b.coffee"),
+        (scss, "node_modules/e.scss"),
+        (scss, "styles/d.scss"),
+    ]
+    # Only the source files are listed
+    assert walk_files.call_args[0][1].extensions == {"scss", "coffee"}
@@ -0,0 +1,89 @@
+import os
+
+from pytest_mock import MockFixture
+
+from static_precompiler import file_index
+
+ROOT = os.path.dirname(__file__)
+
+
+def test_build_index():
+    index = file_index.build_index()
+
+    assert index.paths["another_test.coffee"] == os.path.join(ROOT, "staticfiles_dir", "another_test.coffee")
+    assert index.paths["prefix/another_test.coffee"] == os.path.join(
+        ROOT, "staticfiles_dir_with_prefix", "another_test.coffee"
+    )
+    assert index.paths["scss/_imported.scss"] == os.path.join(ROOT, "compilestatic", "scss", "_imported.scss")
+    assert index.other_finders == []
+
+
+def test_find(mocker: MockFixture):
+    build_index = mocker.spy(file_index, "build_index")
+    finders_find = mocker.spy(file_index.finders, "find")
+
+    assert file_index.find("scripts/test.coffee") == os.path.join(ROOT, "static", "scripts", "test.coffee")
+    build_index.assert_not_called()
+
+    assert file_index.find("/prefix/another_test.coffee") == os.path.join(
+        ROOT, "staticfiles_dir_with_prefix", "another_test.coffee"
+    )
+    build_index.assert_called_once_with()
+
+    # The index is authoritative for the indexed storages, the misses aren't looked up with the finders
+    assert file_index.find("scripts/does-not-exist.coffee") is None
+    assert file_index.find("scss/imported.sass") is None
+    finders_find.assert_not_called()
+    build_index.assert_called_once_with()
+
+
+def test_find_other_finders(mocker: MockFixture):
+    other_finder = mocker.MagicMock()
+    other_finder.find.side_effect = lambda path: "/other/" + path if path == "other.coffee" else None
+    mocker.patch.object(file_index.finders, "get_finders", return_value=[other_finder])
+
+    # Only the finders that can't be indexed are asked for the files missing from the index
+    assert file_index.find("other.coffee") == "/other/other.coffee"
+    assert file_index.find("missing.coffee") is None
+    assert other_finder.find.call_count == 2
+
+
+def test_find_changed_files(mocker: MockFixture, tmpdir):
+    index = file_index.FileIndex()
+    index.locations = [("", tmpdir.strpath)]
+    index.paths = {"removed.coffee": tmpdir.join("removed.coffee").strpath}
+    mocker.patch.object(file_index, "index", index)
+    monotonic = mocker.patch("time.monotonic", return_value=100)
+    find_in_locations = mocker.spy(index, "find_in_locations")
+
+    # The misses are remembered for `MTIME_DELAY` seconds
+    assert file_index.find("added.coffee") is None
+    added_path = tmpdir.join("added.coffee")
+    added_path.write("")
+    assert file_index.find("added.coffee") is None
+    assert find_in_locations.call_count == 1
+
+    # The files added after the index is built are found and indexed
+    monotonic.return_value = 100 + file_index.settings.MTIME_DELAY
+    assert file_index.find("added.coffee") == added_path.strpath
+    assert file_index.find("added.coffee") == added_path.strpath
+    assert find_in_locations.call_count == 2
+
+    # The removed files are removed from the index
+    assert file_index.find("removed.coffee") is None
+    assert index.paths == {"added.coffee": added_path.strpath}
+
+
+def test_get_index(mocker: MockFixture):
+    build_index = mocker.patch.object(file_index, "build_index", return_value=file_index.FileIndex())
+    monotonic = mocker.patch("time.monotonic", return_value=100)
+
+    file_index.get_index()
+    # The index isn't rebuilt when it gets older
+    monotonic.return_value = 100 + file_index.settings.MTIME_DELAY + 1
+    file_index.get_index()
+    assert build_index.call_count == 1
+
+    file_index.reset()
+    file_index.get_index()
+    assert build_index.call_count == 2
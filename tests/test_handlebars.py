@@ -75,6 +75,36 @@ def test_sourcemap(mocker: MockFixture, tmpdir):
     assert sourcemap["file"] == "test.js"
 
 
+def test_compile_file_temp_output(mocker: MockFixture, tmpdir):
+    mocker.patch("static_precompiler.settings.ROOT", tmpdir.strpath)
+
+    def run_command(args, cwd=None):
+        # Same as the tool, the sourcemap is referred to by the path it's written to
+        output_path = args[args.index("-f") + 1]
+        sourcemap_path = args[args.index("--map") + 1]
+        with open(os.path.join(cwd, output_path), "w") as compiled:
+            compiled.write(f"COMPILED\n//# sourceMappingURL={sourcemap_path}\n")
+        with open(os.path.join(cwd, sourcemap_path), "w") as sourcemap:
+            sourcemap.write(json.dumps({"sources": [args[1]]}))
+        return 0, "", ""
+
+    run_command_mock = mocker.patch("static_precompiler.utils.run_command", side_effect=run_command)
+
+    compiler = compilers.Handlebars(sourcemap_enabled=True)
+    full_output_path = Path(compiler.get_full_output_path("scripts/test.hbs"))
+
+    assert compiler.compile_file("scripts/test.hbs") == "COMPILED/scripts/test.js"
+    assert full_output_path.read_text() == "COMPILED\n//# sourceMappingURL=test.js.map\n"
+    sourcemap = json.loads(Path(str(full_output_path) + ".map").read_text())
+    assert sourcemap["sources"] == ["test.hbs"]
+    assert not os.path.exists(run_command_mock.call_args[1]["cwd"])
+
+    # The output is the same on every run, so it isn't rewritten
+    os.utime(full_output_path, (0, 0))
+    compiler.compile_file("scripts/test.hbs")
+    assert os.path.getmtime(full_output_path) == 0
+
+
 def test_compile_source():
     compiler = compilers.Handlebars()
 
@@ -4,19 +4,19 @@ import os
 import pytest
 from pytest_mock import MockFixture
 
-from static_precompiler import compilers, exceptions, utils
+from static_precompiler import compilers, exceptions, url_converter, utils
 
 
 def test_compile_file(mocker: MockFixture, tmpdir):
     mocker.patch("static_precompiler.settings.ROOT", tmpdir.strpath)
-    convert_urls = mocker.patch("static_precompiler.url_converter.convert_urls", return_value=None)
+    convert = mocker.spy(url_converter, "convert")
 
     compiler = compilers.LESS()
 
     assert compiler.compile_file("styles/less/test.less") == "COMPILED/styles/less/test.css"
 
     full_output_path = compiler.get_full_output_path("styles/less/test.less")
-    convert_urls.assert_called_once_with(full_output_path, "styles/less/test.less")
+    convert.assert_called_once_with(mocker.ANY, "styles/less/test.less")
 
     assert os.path.exists(full_output_path)
 
@@ -38,7 +38,6 @@ h1 {
 
 def test_sourcemap(mocker: MockFixture, tmpdir):
     mocker.patch("static_precompiler.settings.ROOT", tmpdir.strpath)
-    mocker.patch("static_precompiler.url_converter.convert_urls", return_value=None)
 
     compiler = compilers.LESS(sourcemap_enabled=False)
     compiler.compile_file("styles/less/test.less")
@@ -154,7 +153,6 @@ def test_find_dependencies(mocker: MockFixture):
 
 def test_global_vars(mocker: MockFixture, tmpdir):
     mocker.patch("static_precompiler.settings.ROOT", tmpdir.strpath)
-    mocker.patch("static_precompiler.url_converter.convert_urls", return_value=None)
 
     compiler = compilers.LESS()
 
@@ -190,7 +188,6 @@ p a {
 
 def test_include_path(mocker: MockFixture, tmpdir, settings):
     mocker.patch("static_precompiler.settings.ROOT", tmpdir.strpath)
-    mocker.patch("static_precompiler.url_converter.convert_urls", return_value=None)
 
     compiler = compilers.LESS()
     with pytest.raises(exceptions.StaticCompilationError):
@@ -0,0 +1,74 @@
+import django.core.exceptions
+import pytest
+from pytest_mock import MockFixture
+
+from static_precompiler import exceptions, locks
+from static_precompiler.compilers import BaseCompiler
+
+
+@pytest.mark.parametrize("lock_class", (locks.FileLock, locks.CacheLock))
+def test_lock(lock_class, mocker: MockFixture, tmpdir):
+    mocker.patch("static_precompiler.settings.ROOT", tmpdir.strpath)
+
+    lock = lock_class("COMPILED/styles/app.css")
+    another_lock = lock_class("COMPILED/styles/app.css")
+
+    assert lock.acquire(timeout=0) is True
+    assert another_lock.try_acquire() is False
+    assert another_lock.acquire(timeout=0.1) is False
+    assert lock_class("COMPILED/styles/other.css").acquire(timeout=0) is True
+
+    lock.release()
+    assert another_lock.acquire(timeout=0) is True
+    another_lock.release()
+
+
+def test_acquire(mocker: MockFixture, tmpdir):
+    mocker.patch("static_precompiler.settings.ROOT", tmpdir.strpath)
+    mocker.patch("static_precompiler.settings.LOCK_TIMEOUT", 0.1)
+
+    with locks.acquire("COMPILED/app.css") as acquired:
+        assert acquired is True
+        with locks.acquire("COMPILED/app.css") as acquired_again:
+            assert acquired_again is False
+    with locks.acquire("COMPILED/app.css") as acquired:
+        assert acquired is True
+
+    mocker.patch("static_precompiler.settings.LOCK_BACKEND", None)
+    assert locks.get_lock("COMPILED/app.css") is None
+    with locks.acquire("COMPILED/app.css") as acquired:
+        assert acquired is True
+
+    mocker.patch("static_precompiler.settings.LOCK_BACKEND", "foo")
+    with pytest.raises(django.core.exceptions.ImproperlyConfigured):
+        locks.get_lock("COMPILED/app.css")
+
+
+def test_compile_while_locked(mocker: MockFixture, tmpdir):
+    mocker.patch("static_precompiler.settings.ROOT", tmpdir.strpath)
+    mocker.patch("static_precompiler.settings.LOCK_TIMEOUT", 0.1)
+
+    compiler = BaseCompiler()
+    mocker.patch.object(compiler, "is_supported", return_value=True)
+    mocker.patch.object(compiler, "get_output_filename", return_value="app.css")
+    mocker.patch.object(compiler, "should_compile", return_value=True)
+    build = mocker.patch.object(compiler, "build", return_value=("COMPILED/app.css", []))
+
+    lock = locks.FileLock("COMPILED/app.css")
+    assert lock.acquire(timeout=0)
+
+    # There's no compiled file to serve yet, the file isn't compiled concurrently after the timeout
+    with pytest.raises(exceptions.StaticCompilationError, match="is being compiled by another process"):
+        compiler.compile("app.scss")
+    build.assert_not_called()
+
+    # Another process is compiling the file, the previously compiled file is served without waiting
+    tmpdir.join("COMPILED", "app.css").write("compiled", ensure=True)
+    acquire = mocker.spy(locks.FileLock, "acquire")
+    assert compiler.compile("app.scss") == "COMPILED/app.css"
+    build.assert_not_called()
+    assert acquire.call_args[0][1] == 0
+
+    lock.release()
+    assert compiler.compile("app.scss") == "COMPILED/app.css"
+    assert build.call_count == 1
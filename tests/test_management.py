@@ -48,6 +48,7 @@ def test_compilestatic_command(verbosity, capsys, mocker: MockFixture, tmpdir):
     assert compiled_files == [
         "coffee/test.js",
         "less/test.css",
+        "manifest.json",
         "scss/test.css",
     ]
 
@@ -106,8 +107,34 @@ def test_delete_stale_files(mocker: MockFixture, tmpdir):
     assert compiled_files == [
         "coffee/test.js",
         "less/test.css",
+        "manifest.json",
         "scss/test.css",
     ]
 
     # Files outside `COMPILED` directory are untouched
     assert os.path.exists(unmanaged_file)
+
+
+@pytest.mark.django_db
+def test_jobs_option(mocker: MockFixture, tmpdir):
+    with pytest.raises(SystemExit):
+        management.call_command("compilestatic", jobs=0)
+
+    mocker.patch("static_precompiler.settings.ROOT", tmpdir.strpath)
+
+    compile_paths = mocker.patch("static_precompiler.build.compile_paths", return_value=set())
+    mocker.patch(
+        "static_precompiler.management.commands.compilestatic.get_scanned_dirs",
+        side_effect=lambda: (os.path.join(os.path.dirname(__file__), "compilestatic"),),
+    )
+
+    management.call_command("compilestatic", jobs=3)
+
+    (tasks,), kwargs = compile_paths.call_args
+    assert [path for _compiler, path in tasks] == [
+        "coffee/test.coffee",
+        "less/test.less",
+        "scss/_imported.scss",
+        "scss/test.scss",
+    ]
+    assert kwargs == {"jobs": 3, "verbosity": 1}
@@ -0,0 +1,43 @@
+import django.core.exceptions
+import pytest
+from pytest_mock import MockFixture
+
+from static_precompiler import manifest, utils
+
+
+@pytest.fixture(autouse=True)
+def reset_manifest(mocker: MockFixture, tmpdir):
+    mocker.patch("static_precompiler.settings.ROOT", tmpdir.strpath)
+    mocker.patch.object(manifest, "compiled_paths", None)
+
+
+def test_write_load(tmpdir):
+    tmpdir.mkdir("COMPILED").join("a.css").write("compiled")
+
+    manifest.write({"a.scss": "COMPILED/a.css", "_b.scss": "COMPILED/_b.css"})
+
+    # The compiled files that don't exist are skipped
+    assert manifest.load() == {"a.scss": "COMPILED/a.css"}
+    assert manifest.get_compiled_path("a.scss") == "COMPILED/a.css"
+    with pytest.raises(ValueError):
+        manifest.get_compiled_path("_b.scss")
+
+
+def test_load_missing():
+    with pytest.raises(django.core.exceptions.ImproperlyConfigured):
+        manifest.load()
+
+
+def test_compile_static(mocker: MockFixture, tmpdir):
+    tmpdir.mkdir("COMPILED").join("a.css").write("compiled")
+    manifest.write({"a.scss": "COMPILED/a.css"})
+    mocker.patch("static_precompiler.settings.USE_MANIFEST", True)
+    get_compiler_by_path = mocker.patch("static_precompiler.registry.get_compiler_by_path")
+
+    assert utils.compile_static("a.scss") == "COMPILED/a.css"
+    assert utils.compile_static_lazy("a.scss") == "COMPILED/a.css"
+
+    # The manifest is loaded once
+    tmpdir.join("COMPILED", manifest.MANIFEST_FILENAME).remove()
+    assert utils.compile_static("a.scss") == "COMPILED/a.css"
+    get_compiler_by_path.assert_not_called()
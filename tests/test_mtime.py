@@ -0,0 +1,61 @@
+import os
+import time
+
+from pytest_mock import MockFixture
+
+from static_precompiler import caching, mtime, settings
+
+
+def test_get_mtimes(mocker: MockFixture, tmpdir):
+    filenames = []
+    for i, name in enumerate(("a", "b", "c")):
+        path = tmpdir.join(name).strpath
+        with open(path, "w+") as f:
+            f.write(name)
+        os.utime(path, (i, i))
+        filenames.append(path)
+
+    cache = caching.get_cache()
+    cache.clear()
+    get_many = mocker.spy(cache, "get_many")
+    set_many = mocker.spy(cache, "set_many")
+    mocker.patch("static_precompiler.caching.get_cache", return_value=cache)
+
+    assert mtime.get_mtimes(filenames) == [0, 1, 2]
+    get_many.assert_called_once()
+    set_many.assert_called_once()
+
+    # The modification times are served from the process memory
+    os.utime(filenames[0], (10, 10))
+    assert mtime.get_mtime(filenames[0]) == 0
+    assert mtime.get_mtimes(filenames[::-1]) == [2, 1, 0]
+    get_many.assert_called_once()
+
+    # Then from the shared cache
+    mtime.clear_local_cache()
+    assert mtime.get_mtime(filenames[0]) == 0
+    assert get_many.call_count == 2
+    set_many.assert_called_once()
+
+    # The process memory keeps the modification times only for the time left in the shared cache
+    mtime.clear_local_cache()
+    mocker.patch("time.time", return_value=time.time() + settings.MTIME_DELAY - 1)
+    now = time.monotonic()
+    assert mtime.get_mtime(filenames[0]) == 0
+    assert mtime.local_cache[filenames[0]][1] <= now + 1 + 0.1
+
+    # The cache is bypassed when MTIME_DELAY is 0
+    mocker.patch("static_precompiler.settings.MTIME_DELAY", 0)
+    assert mtime.get_mtimes(filenames) == [10, 1, 2]
+    assert get_many.call_count == 3
+
+
+def test_local_cache_size(mocker: MockFixture, tmpdir):
+    mocker.patch("static_precompiler.mtime.LOCAL_CACHE_SIZE", 2)
+    filenames = [tmpdir.join(name).strpath for name in ("a", "b", "c")]
+    for path in filenames:
+        with open(path, "w+") as f:
+            f.write("")
+
+    mtime.get_mtimes(filenames)
+    assert list(mtime.local_cache) == filenames[1:]
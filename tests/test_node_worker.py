@@ -0,0 +1,142 @@
+import json
+import os
+import shutil
+import subprocess
+
+import pytest
+from pytest_mock import MockFixture
+
+from static_precompiler import exceptions, node_worker
+from static_precompiler.compilers import LESS, Babel, CoffeeScript, Handlebars, LiveScript, Stylus
+
+
+def has_node_package(name: str) -> bool:
+    """Return True iff Node.js is installed and can load the package the same way the worker does."""
+    if shutil.which("node") is None:
+        return False
+    script = (
+        f"require.resolve({json.dumps(name)}, "
+        f"{{paths: [process.cwd(), ...(require.resolve.paths({json.dumps(name)}) || [])]}})"
+    )
+    return subprocess.run(["node", "-e", script], capture_output=True).returncode == 0
+
+
+@pytest.fixture
+def pool():
+    worker_pool = node_worker.NodeWorkerPool("node", size=2, max_jobs=3, timeout=10)
+    yield worker_pool
+    worker_pool.close()
+
+
+def test_run(pool: node_worker.NodeWorkerPool):
+    assert pool.run("ping", {}) == "pong"
+    worker = pool.idle[0]
+
+    # The worker is reused until it's recycled
+    assert pool.run("ping", {}) == "pong"
+    assert pool.idle == [worker]
+    assert pool.run("ping", {}) == "pong"
+    assert pool.idle == []
+    assert worker.is_alive() is False
+
+    # Compilation errors don't affect the worker
+    with pytest.raises(exceptions.StaticCompilationError, match="Unknown method: foo"):
+        pool.run("foo", {})
+    assert len(pool.idle) == 1
+
+
+def test_crashed_worker(pool: node_worker.NodeWorkerPool, mocker: MockFixture):
+    pool.run("ping", {})
+    worker = pool.idle[0]
+    worker.process.kill()
+    worker.process.wait()
+
+    # The crashed worker is replaced
+    assert pool.run("ping", {}) == "pong"
+    assert pool.idle[0] is not worker
+
+    # The worker that stops responding is killed
+    mocker.patch.object(pool, "timeout", 0.01)
+    mocker.patch.object(node_worker.NodeWorker, "request", side_effect=node_worker.WorkerError("Timed out"))
+    worker = pool.idle[0]
+    with pytest.raises(exceptions.StaticCompilationError, match="Timed out"):
+        pool.run("ping", {})
+    assert worker.is_alive() is False
+    assert pool.idle == []
+
+
+def test_health_check(pool: node_worker.NodeWorkerPool, mocker: MockFixture):
+    pool.run("ping", {})
+    worker = pool.idle[0]
+    ping = mocker.patch.object(worker, "ping", return_value=False)
+
+    worker.last_used -= node_worker.HEALTH_CHECK_INTERVAL + 1
+    pool.run("ping", {})
+    ping.assert_called_once_with()
+    assert worker.is_alive() is False
+    assert pool.idle[0] is not worker
+
+
+def test_compile_source(mocker: MockFixture):
+    run = mocker.patch.object(node_worker.NodeWorkerPool, "run", return_value={"code": "compiled", "map": None})
+
+    assert CoffeeScript(use_worker=True).compile_source("source") == "compiled"
+    run.assert_called_once_with("coffeescript", {"source": "source"})
+
+    run.reset_mock()
+    assert LESS(use_worker=True, include_path=["foo"]).compile_source("source") == "compiled"
+    (method, params), _ = run.call_args
+    assert method == "less"
+    assert params["source"] == "source"
+    assert params["paths"][0].endswith("foo")
+
+
+def test_less_include_path(mocker: MockFixture, tmpdir):
+    mocker.patch("static_precompiler.settings.ROOT", tmpdir.strpath)
+    run = mocker.patch.object(node_worker.NodeWorkerPool, "run", return_value={"code": "compiled", "map": None})
+
+    # The include paths are resolved relative to the static directory, same as `lessc` is run in
+    LESS(use_worker=True, include_path=["styles/less/extra-path"]).compile_file("styles/less/include-path.less")
+    (method, params), _ = run.call_args
+    static_root = os.path.dirname(os.path.dirname(os.path.dirname(params["filename"])))
+    assert params["paths"] == [os.path.join(static_root, "styles", "less", "extra-path")]
+
+
+@pytest.mark.parametrize(
+    "compiler_class, options, source_path, executable, package",
+    [
+        (LESS, {"include_path": ["styles/less/extra-path"]}, "styles/less/include-path.less", "lessc", "less"),
+        (Babel, {}, "scripts/test.es6", "babel", "@babel/core"),
+        (Stylus, {}, "styles/stylus/A.styl", "stylus", "stylus"),
+        (Handlebars, {}, "scripts/test.hbs", "handlebars", "handlebars"),
+        (CoffeeScript, {}, "scripts/test.coffee", "coffee", "coffeescript"),
+        (LiveScript, {}, "scripts/test.ls", "lsc", "livescript"),
+    ],
+)
+def test_worker_equivalence(compiler_class, options, source_path, executable, package, mocker: MockFixture, tmpdir):
+    if shutil.which(executable) is None or not has_node_package(package):
+        pytest.skip(f"{executable} or {package} package is not installed")
+
+    worker_pool = node_worker.NodeWorkerPool("node", size=1, max_jobs=10, timeout=30)
+    mocker.patch.object(node_worker, "get_pool", return_value=worker_pool)
+    outputs = []
+    try:
+        for use_worker in (False, True):
+            mocker.patch("static_precompiler.settings.ROOT", tmpdir.join(str(use_worker)).strpath)
+            compiler = compiler_class(sourcemap_enabled=True, use_worker=use_worker, **options)
+            compiler.compile_file(source_path)
+            full_output_path = compiler.get_full_output_path(source_path)
+            with open(full_output_path) as compiled:
+                code = compiled.read()
+            with open(full_output_path + ".map") as sourcemap:
+                sources = json.load(sourcemap)["sources"]
+            try:
+                compiled_source = compiler.compile_source(compiler.get_source(source_path))
+            except exceptions.StaticCompilationError:
+                compiled_source = None
+            outputs.append((code, sources, compiled_source))
+    finally:
+        worker_pool.close()
+
+    # The worker compiles the files the same as the command line tool
+    assert outputs[0] == outputs[1]
@@ -58,8 +58,10 @@ def test_get_compiler_by_name(mocker: MockFixture):
 
 def test_get_compiler_by_path(mocker: MockFixture):
     coffeescript_compiler = mocker.MagicMock(spec=compilers.BaseCompiler)
+    coffeescript_compiler.matches_by_extension = False
     coffeescript_compiler.is_supported.side_effect = lambda source_path: source_path.endswith(".coffee")
     less_compiler = mocker.MagicMock(spec=compilers.BaseCompiler)
+    less_compiler.matches_by_extension = False
     less_compiler.is_supported.side_effect = lambda source_path: source_path.endswith(".less")
 
     mocker.patch(
@@ -75,3 +77,49 @@ def test_get_compiler_by_path(mocker: MockFixture):
 
     assert registry.get_compiler_by_path("test.coffee") is coffeescript_compiler
     assert registry.get_compiler_by_path("test.less") is less_compiler
+
+
+def test_extension_index(mocker: MockFixture):
+    custom_compiler = mocker.MagicMock(spec=compilers.BaseCompiler)
+    custom_compiler.matches_by_extension = False
+    custom_compiler.is_supported.side_effect = lambda source_path: source_path.endswith(".min.less")
+    mocker.patch(
+        "static_precompiler.registry.get_compilers",
+        return_value={
+            "handlebars": compilers.Handlebars(),
+            "custom": custom_compiler,
+            "less": compilers.LESS(),
+            "scss": compilers.SCSS(),
+        },
+    )
+
+    assert isinstance(registry.find_compiler("templates/test.hbs"), compilers.Handlebars)
+    assert isinstance(registry.find_compiler("templates/test.handlebars"), compilers.Handlebars)
+    assert isinstance(registry.find_compiler("styles/test.less"), compilers.LESS)
+    assert isinstance(registry.find_compiler("styles/test.scss"), compilers.SCSS)
+
+    # The compilers that can't be indexed are checked in the order they are listed
+    assert registry.find_compiler("styles/test.min.less") is custom_compiler
+    custom_compiler.is_supported.reset_mock()
+    assert isinstance(registry.find_compiler("templates/test.hbs"), compilers.Handlebars)
+    custom_compiler.is_supported.assert_not_called()
+
+    assert registry.find_compiler("test.txt") is None
+    assert registry.find_compiler("test") is None
+    # The custom compiler doesn't tell the source files by extension
+    assert registry.get_source_extensions() is None
+
+
+def test_get_source_extensions(mocker: MockFixture):
+    mocker.patch(
+        "static_precompiler.registry.get_compilers",
+        return_value={"handlebars": compilers.Handlebars(), "scss": compilers.SCSS()},
+    )
+    assert registry.get_source_extensions() == {"hbs", "handlebars", "scss"}
+
+
+def test_extension_index_conflict():
+    with pytest.warns(UserWarning, match='support ".scss" files'):
+        scss = compilers.SCSS()
+        index = registry.ExtensionIndex({"scss": scss, "other": compilers.SCSS(executable="other")})
+    assert index.find("test.scss") is scss
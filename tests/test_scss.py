@@ -5,7 +5,7 @@ import re
 import pytest
 from pytest_mock import MockFixture
 
-from static_precompiler import exceptions, utils
+from static_precompiler import build, exceptions, url_converter, utils
 from static_precompiler.compilers import dart_sass, libsass
 
 
@@ -38,14 +38,14 @@ def test_get_full_source_path(compiler_factory):
 
 def test_compile_file(compiler_factory, mocker: MockFixture, tmpdir):
     mocker.patch("static_precompiler.settings.ROOT", tmpdir.strpath)
-    convert_urls = mocker.patch("static_precompiler.url_converter.convert_urls", return_value=None)
+    convert = mocker.spy(url_converter, "convert")
 
     compiler = compiler_factory("scss")
 
     assert compiler.compile_file("styles/sass/test.scss") == "COMPILED/styles/sass/test.css"
 
     full_output_path = compiler.get_full_output_path("styles/sass/test.scss")
-    convert_urls.assert_called_once_with(full_output_path, "styles/sass/test.scss")
+    convert.assert_called_once_with(mocker.ANY, "styles/sass/test.scss")
 
     assert os.path.exists(full_output_path)
 
@@ -58,7 +58,6 @@ def test_compile_file(compiler_factory, mocker: MockFixture, tmpdir):
 
 def test_sourcemap(compiler_factory, mocker: MockFixture, tmpdir):
     mocker.patch("static_precompiler.settings.ROOT", tmpdir.strpath)
-    mocker.patch("static_precompiler.url_converter.convert_urls", return_value=None)
 
     compiler = compiler_factory("scss", sourcemap_enabled=False)
     compiler.compile_file("styles/sass/test.scss")
@@ -259,7 +258,6 @@ def test_get_extra_args():
 
 def test_load_paths(compiler_factory, mocker: MockFixture, tmpdir, settings):
     mocker.patch("static_precompiler.settings.ROOT", tmpdir.strpath)
-    mocker.patch("static_precompiler.url_converter.convert_urls", return_value=None)
 
     compiler = compiler_factory("scss")
     with pytest.raises(exceptions.StaticCompilationError):
@@ -281,7 +279,6 @@ def test_precision(precision, mocker: MockFixture, tmpdir):
     expected_precision = 5 if precision is None else precision
 
     mocker.patch("static_precompiler.settings.ROOT", tmpdir.strpath)
-    mocker.patch("static_precompiler.url_converter.convert_urls", return_value=None)
 
     compiler = libsass.SCSS(precision=precision)
 
@@ -300,7 +297,6 @@ def test_precision(precision, mocker: MockFixture, tmpdir):
 
 def test_output_style(compiler_factory, mocker: MockFixture, tmpdir):
     mocker.patch("static_precompiler.settings.ROOT", tmpdir.strpath)
-    mocker.patch("static_precompiler.url_converter.convert_urls", return_value=None)
 
     compiler = compiler_factory("scss", output_style="compressed")
 
@@ -311,3 +307,52 @@ def test_output_style(compiler_factory, mocker: MockFixture, tmpdir):
 
     with open(full_output_path) as compiled:
         assert compiled.read() == "p{font-size:15px}p a{color:red}\n"
+
+
+def test_compile_many(mocker: MockFixture, tmpdir):
+    mocker.patch("static_precompiler.settings.ROOT", tmpdir.strpath)
+
+    def run_command(args, cwd=None):
+        if "--no-error-css" not in args:
+            return 65, "", f"Can't compile {args[-2]}"
+        for pair in args[args.index("--no-error-css") + 1 :]:
+            full_source_path, full_output_path = pair.split(":")
+            if "invalid" not in full_source_path:
+                with open(full_output_path, "w") as output_file:
+                    output_file.write("compiled")
+        return 65, "", "Error"
+
+    run_command = mocker.patch("static_precompiler.utils.run_command", side_effect=run_command)
+
+    compiler = dart_sass.SCSS()
+    results = compiler.compile_many(
+        ["styles/sass/test.scss", "styles/sass/invalid-syntax.scss", "styles/sass/does-not-exist.scss"]
+    )
+
+    assert results["styles/sass/test.scss"] == "COMPILED/styles/sass/test.css"
+    assert isinstance(results["styles/sass/invalid-syntax.scss"], exceptions.StaticCompilationError)
+    assert str(results["styles/sass/invalid-syntax.scss"]).startswith("Can't compile")
+    assert isinstance(results["styles/sass/does-not-exist.scss"], ValueError)
+
+    # The valid files are compiled with a single process, the broken file is compiled again to get its error
+    assert run_command.call_count == 2
+
+
+def test_libsass_compile_many(mocker: MockFixture, tmpdir):
+    mocker.patch("static_precompiler.settings.ROOT", tmpdir.strpath)
+    run_command = mocker.patch("static_precompiler.utils.run_command")
+
+    compiler = libsass.SCSS()
+    assert not compiler.supports_batch
+    results = compiler.compile_many(["styles/sass/test.scss", "styles/sass/invalid-syntax.scss"])
+
+    # The files are compiled one by one in the process
+    assert results["styles/sass/test.scss"] == "COMPILED/styles/sass/test.css"
+    assert isinstance(results["styles/sass/invalid-syntax.scss"], exceptions.StaticCompilationError)
+    assert os.path.exists(compiler.get_full_output_path("styles/sass/test.scss"))
+    run_command.assert_not_called()
+
+    assert build.split_tasks([(compiler, "a.scss"), (compiler, "b.scss")], jobs=1) == [
+        (compiler, ["a.scss"]),
+        (compiler, ["b.scss"]),
+    ]
@@ -4,19 +4,19 @@ import os
 import pytest
 from pytest_mock import MockFixture
 
-from static_precompiler import compilers, exceptions, utils
+from static_precompiler import compilers, exceptions, url_converter, utils
 
 
 def test_compile_file(mocker: MockFixture, tmpdir):
     mocker.patch("static_precompiler.settings.ROOT", tmpdir.strpath)
-    convert_urls = mocker.patch("static_precompiler.url_converter.convert_urls", return_value=None)
+    convert = mocker.spy(url_converter, "convert")
 
     compiler = compilers.Stylus()
 
     assert compiler.compile_file("styles/stylus/A.styl") == "COMPILED/styles/stylus/A.css"
 
     full_output_path = compiler.get_full_output_path("styles/stylus/A.styl")
-    convert_urls.assert_called_once_with(full_output_path, "styles/stylus/A.styl")
+    convert.assert_called_once_with(mocker.ANY, "styles/stylus/A.styl")
 
     assert os.path.exists(full_output_path)
 
@@ -32,7 +32,6 @@ def test_compile_file(mocker: MockFixture, tmpdir):
 
 def test_sourcemap(mocker: MockFixture, tmpdir):
     mocker.patch("static_precompiler.settings.ROOT", tmpdir.strpath)
-    mocker.patch("static_precompiler.url_converter.convert_urls", return_value=None)
 
     compiler = compilers.Stylus(sourcemap_enabled=False)
     compiler.compile_file("styles/stylus/A.styl")
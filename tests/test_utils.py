@@ -16,6 +16,18 @@ def test_write_read_file(tmpdir, settings):
     assert isinstance(read_content, str)
     assert read_content == "Привет, Мир!"
 
+    # The file is replaced at once, no temporary files are left behind
+    utils.write_file("Hello, World!", path)
+    assert utils.read_file(path) == "Hello, World!"
+    assert [name for name in os.listdir(tmpdir.dirname) if name.startswith("foo.txt")] == ["foo.txt"]
+
+    # The file with the same content isn't rewritten
+    os.utime(path, (0, 0))
+    assert utils.write_file("Hello, World!", path) is False
+    assert os.path.getmtime(path) == 0
+    assert utils.write_file("Hello, World?", path) is True
+    assert utils.read_file(path) == "Hello, World?"
+
 
 def test_compile_static(mocker: MockFixture):
     compiler = mocker.MagicMock(spec=BaseCompiler)
@@ -0,0 +1,155 @@
+import pytest
+from pytest_mock import MockFixture
+from watchdog import events
+
+from static_precompiler import dependency_graph, discovery, watch
+from static_precompiler.compilers import LESS, SCSS, CoffeeScript
+
+
+def test_change_queue(mocker: MockFixture):
+    monotonic = mocker.patch("time.monotonic", return_value=10)
+    queue = watch.ChangeQueue(delay=1)
+    assert queue.pop() == []
+
+    handler = watch.EventHandler("/static", queue)
+    handler.on_any_event(events.FileCreatedEvent("/static/styles/b.scss"))
+    handler.on_any_event(events.FileModifiedEvent("/static/styles/b.scss"))
+    handler.on_any_event(events.DirModifiedEvent("/static/styles"))
+    handler.on_any_event(events.FileDeletedEvent("/static/styles/c.scss"))
+    monotonic.return_value = 10.5
+    # Atomic save
+    handler.on_any_event(events.FileMovedEvent("/static/styles/a.scss.tmp", "/static/styles/a.scss"))
+
+    # The files are still changing
+    monotonic.return_value = 11
+    assert queue.pop() == []
+
+    monotonic.return_value = 11.5
+    assert queue.pop() == ["styles/a.scss", "styles/b.scss"]
+    assert queue.pop() == []
+
+
+@pytest.mark.django_db
+def test_get_tasks(mocker: MockFixture):
+    scss = SCSS()
+    coffeescript = CoffeeScript()
+    mocker.patch("static_precompiler.registry.get_compilers", return_value={"scss": scss, "coffeescript": coffeescript})
+    scss.update_dependencies("a.scss", ["_b.scss", "_c.scss"])
+    scss.update_dependencies("d.scss", ["_c.scss"])
+    mocker.patch.object(scss, "is_located", return_value=True)
+
+    # Each affected file is compiled once
+    assert watch.get_tasks(["_b.scss", "_c.scss", "a.scss", "e.coffee", "f.txt"], verbosity=0) == [
+        (scss, "_b.scss"),
+        (scss, "_c.scss"),
+        (scss, "a.scss"),
+        (coffeescript, "e.coffee"),
+        (scss, "d.scss"),
+    ]
+
+    # The dependents of the files that are imported but not compiled are compiled too
+    scss.update_dependencies("g.scss", ["_h.sass"])
+    assert watch.get_tasks(["_h.sass", "i.css"], verbosity=0) == [(scss, "g.scss")]
+
+
+def test_compile_changes(mocker: MockFixture):
+    compiler = SCSS()
+    mocker.patch.object(watch, "get_tasks", return_value=[(compiler, "a.scss")])
+    mocker.patch.object(compiler, "get_full_source_path", return_value="/static/a.scss")
+    forget = mocker.patch("static_precompiler.mtime.forget")
+    compile_paths = mocker.patch("static_precompiler.build.compile_paths")
+
+    flush = mocker.patch("static_precompiler.dependency_graph.flush")
+
+    watch.compile_changes(["a.scss"], jobs=2, verbosity=1)
+    forget.assert_called_once_with(["/static/a.scss"])
+    compile_paths.assert_called_once_with([(compiler, "a.scss")], jobs=2, verbosity=1)
+    flush.assert_called_once_with()
+
+    # The dependencies are saved in the background
+    saver = mocker.Mock()
+    watch.compile_changes(["a.scss"], jobs=2, verbosity=1, saver=saver)
+    saver.request.assert_called_once_with()
+    flush.assert_called_once_with()
+
+
+@pytest.mark.django_db
+def test_preload_dependencies(mocker: MockFixture):
+    mocker.patch("static_precompiler.registry.get_compilers", return_value={"coffeescript": CoffeeScript()})
+    with watch.preload_dependencies() as graph:
+        assert graph is None
+
+    mocker.patch("static_precompiler.registry.get_compilers", return_value={"scss": SCSS()})
+    with watch.preload_dependencies() as graph:
+        assert graph is not None
+        assert dependency_graph.get_graph() is graph
+        # The graph preloaded by compilestatic is used
+        with watch.preload_dependencies() as preloaded_graph:
+            assert preloaded_graph is graph
+        assert dependency_graph.get_graph() is graph
+    assert dependency_graph.get_graph() is None
+
+
+def test_get_watched_extensions(mocker: MockFixture):
+    mocker.patch("static_precompiler.registry.get_compilers", return_value={"scss": SCSS(), "less": LESS()})
+    assert watch.get_watched_extensions() == {"scss", "sass", "less", "css"}
+
+    mocker.patch.object(LESS, "matches_by_extension", False)
+    mocker.patch("static_precompiler.registry.get_compilers", return_value={"scss": SCSS(), "less": LESS()})
+    assert watch.get_watched_extensions() is None
+
+
+def test_get_watches(tmpdir, mocker: MockFixture):
+    mocker.patch("static_precompiler.settings.ROOT", str(tmpdir))
+    for path in ("styles/lib", "app/node_modules/lib", "app/scripts", "app/vendor", "COMPILED/styles"):
+        tmpdir.join(path).ensure(dir=True)
+    path_filter = discovery.PathFilter(str(tmpdir), ignore_patterns=["node_modules"])
+
+    assert sorted(watch.get_watches(str(tmpdir), path_filter)) == [
+        (str(tmpdir), False),
+        (str(tmpdir.join("app")), False),
+        (str(tmpdir.join("app", "scripts")), True),
+        (str(tmpdir.join("app", "vendor")), True),
+        (str(tmpdir.join("styles")), True),
+    ]
+
+
+def test_event_handler_filter(tmpdir, mocker: MockFixture):
+    mocker.patch("static_precompiler.settings.ROOT", str(tmpdir))
+    tmpdir.join("app").ensure(dir=True)
+    tmpdir.join("node_modules").ensure(dir=True)
+    scanned_dir = str(tmpdir)
+    queue = watch.ChangeQueue(delay=0)
+    observer = mocker.Mock()
+    handler = watch.EventHandler(
+        scanned_dir, queue, discovery.PathFilter(scanned_dir, {"scss"}, ["node_modules", ".*"]), observer
+    )
+    handler.schedule(scanned_dir)
+    assert observer.schedule.call_args_list == [
+        mocker.call(handler, path=scanned_dir, recursive=False),
+        mocker.call(handler, path=str(tmpdir.join("app")), recursive=True),
+    ]
+
+    reset = mocker.patch("static_precompiler.file_index.reset")
+    handler.on_any_event(events.FileModifiedEvent(str(tmpdir.join("COMPILED", "a.css"))))
+    handler.on_any_event(events.FileCreatedEvent(str(tmpdir.join("node_modules", "lib", "b.scss"))))
+    handler.on_any_event(events.FileModifiedEvent(str(tmpdir.join("app", "c.png"))))
+    handler.on_any_event(events.FileCreatedEvent(str(tmpdir.join("app", ".d.scss.swp"))))
+    assert queue.pop() == []
+    reset.assert_not_called()
+
+    handler.on_any_event(events.FileModifiedEvent(str(tmpdir.join("app", "e.scss"))))
+    handler.on_any_event(events.FileMovedEvent(str(tmpdir.join("app", ".f.scss")), str(tmpdir.join("app", "f.scss"))))
+    assert queue.pop() == ["app/e.scss", "app/f.scss"]
+
+    # A new directory next to the skipped one is watched on its own
+    observer.schedule.reset_mock()
+    tmpdir.join("lib").ensure(dir=True)
+    handler.on_any_event(events.DirCreatedEvent(str(tmpdir.join("lib"))))
+    handler.on_any_event(events.DirCreatedEvent(str(tmpdir.join("app", "lib"))))
+    observer.schedule.assert_called_once_with(handler, path=str(tmpdir.join("lib")), recursive=True)
+
+    # A removed directory is not watched anymore
+    handler.on_any_event(events.DirDeletedEvent(scanned_dir))
+    observer.unschedule.assert_called_once()
+    assert handler.watches == {}